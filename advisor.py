@@ -0,0 +1,435 @@
+'''Advise on database settings.
+'''
+
+import os
+import math
+import shutil
+from constants import DEFAULT_BUFFER_SIZE
+from constants import DURATIONS
+from constants import MAX_BUFFER_SIZE
+
+# Part of the available memory and free disk space we allow the buffer to
+# use before we warn. More than the available memory or disk space is refused.
+BUFFER_MEMORY_BUDGET = 0.5
+BUFFER_DISK_BUDGET = 0.8
+
+# Room for the number of series to grow on this server.
+SERIES_HEADROOM = 1.5
+
+# Rough estimates for the stored size of a point. Timestamps compress less
+# with a higher time precision, log values are stored as compressed strings.
+NUMBER_POINT_SIZE = {'s': 6, 'ms': 8, 'us': 10, 'ns': 12}
+LOG_POINT_SIZE = 48
+
+# SiriDB stores points in chunks of at most this number of points. A shard
+# should at least fill a chunk for each series, otherwise queries and the
+# optimize task spend their time on index entries instead of points.
+CHUNK_POINTS = 800
+
+# Each shard is a data and an index file. The optimize task rewrites a
+# complete shard, larger shards are not recommended.
+SHARD_FILES = 2
+MAX_SHARD_SIZE = 2 ** 30  # 1GB
+
+# Fraction of max_open_files we allow the shards in the retention window to
+# use before the plan is marked as a problem.
+OPEN_FILES_BUDGET = 0.5
+
+# SiriDB uses this max_open_files when it is not set in siridb.conf.
+SIRIDB_MAX_OPEN_FILES = 512
+
+# Rough rates for planning a new pool or replica, the real rates depend on
+# the hardware and the load of the cluster. (reindex-status measures the
+# re-index rate of a cluster)
+REINDEX_SERIES_PER_SECOND = 200
+SYNC_SERIES_PER_SECOND = 1000
+
+# Above this average number of series per pool a new pool is recommended,
+# below it a replica for the largest pool without one.
+POOL_SERIES_TARGET = 1000000
+
+# Relative difference between the largest pool and the average above which
+# the cluster is considered to be imbalanced.
+IMBALANCE_THRESHOLD = 0.25
+
+
+def read_mem_available(fn='/proc/meminfo'):
+    '''Returns the available memory in bytes or None if unknown.'''
+    try:
+        with open(fn, 'r') as f:
+            meminfo = dict(
+                line.split(':', 1) for line in f.read().splitlines() if line)
+    except (OSError, ValueError):
+        return None
+
+    def kb(key):
+        return int(meminfo[key].split()[0]) * 1024
+
+    try:
+        return kb('MemAvailable')
+    except (KeyError, ValueError):
+        pass
+    try:
+        return kb('MemFree') + kb('Cached')
+    except (KeyError, ValueError):
+        return None
+
+
+def existing_path(path):
+    '''Returns path or the nearest parent which exists.'''
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        path = os.path.dirname(path)
+    return path
+
+
+def read_disk_free(path):
+    '''Returns the free space in bytes for path (or the nearest parent).'''
+    return shutil.disk_usage(existing_path(path)).free
+
+
+def projected_series(pools, pool, new_pool):
+    '''Returns the expected number of series for the new server.
+
+    A replica gets all series from its pool, a new pool gets its share of
+    all series once the re-index is finished.
+    '''
+    if new_pool:
+        total = sum(p[2] for p in pools)
+        return total // (len(pools) + 1)
+    for p in pools:
+        if p[0] == pool:
+            return p[2]
+    return 0
+
+
+def buffer_candidates():
+    size = 512
+    while size < MAX_BUFFER_SIZE:
+        yield size
+        size *= 2
+    yield MAX_BUFFER_SIZE
+
+
+class BufferAdvice:
+
+    def __init__(self, series, buffer_path):
+        self.series = int(series * SERIES_HEADROOM)
+        self.mem_available = read_mem_available()
+        self.disk_free = read_disk_free(buffer_path)
+        self.rows = [
+            (size, self.footprint(size), self.fits(size))
+            for size in buffer_candidates()]
+        fitting = [size for size, _, fits in self.rows if fits]
+        if not self.series:
+            # nothing to base an advice on
+            self.recommended = DEFAULT_BUFFER_SIZE
+        else:
+            self.recommended = fitting[-1] if fitting else 512
+
+    def footprint(self, buffer_size):
+        '''Returns the projected buffer file size and memory usage.
+
+        Each series has a fixed buffer_size slot in the buffer file and
+        keeps the same amount of points in memory.
+        '''
+        return self.series * buffer_size, self.series * buffer_size
+
+    def fits(self, buffer_size, budget=True):
+        disk, memory = self.footprint(buffer_size)
+        mem_budget = BUFFER_MEMORY_BUDGET if budget else 1.0
+        disk_budget = BUFFER_DISK_BUDGET if budget else 1.0
+        return (self.mem_available is None or
+                memory <= self.mem_available * mem_budget) and \
+            (self.disk_free is None or
+             disk <= self.disk_free * disk_budget)
+
+    def check(self, buffer_size):
+        '''Raises ValueError when buffer_size would overcommit this host.
+
+        Returns a warning message when the buffer size is larger than the
+        budget, or None.
+        '''
+        if not self.fits(buffer_size, budget=False):
+            disk, memory = self.footprint(buffer_size)
+            raise ValueError(
+                'A buffer size of {} would overcommit this host: {} series '
+                'need {} of memory ({} available) and {} of disk space '
+                '({} free). Please use a buffer size of at most {}'.format(
+                    buffer_size,
+                    self.series,
+                    format_bytes(memory),
+                    format_bytes(self.mem_available),
+                    format_bytes(disk),
+                    format_bytes(self.disk_free),
+                    self.recommended))
+        if not self.fits(buffer_size):
+            return (
+                'A buffer size of {} uses more than {:.0%} of the available '
+                'memory or {:.0%} of the free disk space, the recommended '
+                'buffer size is {}'.format(
+                    buffer_size,
+                    BUFFER_MEMORY_BUDGET,
+                    BUFFER_DISK_BUDGET,
+                    self.recommended))
+        return None
+
+    def as_text(self):
+        lines = [
+            'Projected series: {} (available memory: {}, free disk '
+            'space: {})'.format(self.series,
+                                format_bytes(self.mem_available),
+                                format_bytes(self.disk_free)),
+            '{}{}{}{}'.format('size'.ljust(12),
+                              'file'.ljust(12),
+                              'memory'.ljust(12),
+                              'fits')]
+        for size, (disk, memory), fits in self.rows:
+            lines.append('{}{}{}{}'.format(
+                str(size).ljust(12),
+                format_bytes(disk).ljust(12),
+                format_bytes(memory).ljust(12),
+                'yes' if fits else 'no'))
+        return '\n'.join(lines)
+
+
+class ShardPlan:
+
+    def __init__(self,
+                 series,
+                 points_per_second,
+                 log_ratio,
+                 time_precision,
+                 retention,
+                 max_open_files=None):
+        '''Estimate shards for each duration.
+
+        series and points_per_second are totals for the database, log_ratio
+        is the part of both which is for log (string) series and retention
+        is the period in seconds for which points are kept.
+        '''
+        if series < 0:
+            raise ValueError('The number of series cannot be negative')
+        if points_per_second <= 0:
+            raise ValueError('The points per second must be more than 0')
+        if not 0 <= log_ratio <= 1:
+            raise ValueError('The log ratio must be a value between 0 and 1')
+        if retention <= 0:
+            raise ValueError('The retention must be more than 0')
+        self.time_precision = time_precision
+        self.retention = retention
+        self.max_open_files_default = max_open_files is None
+        self.max_open_files = max_open_files or SIRIDB_MAX_OPEN_FILES
+        self.number = self._estimate(
+            series * (1 - log_ratio),
+            points_per_second * (1 - log_ratio),
+            NUMBER_POINT_SIZE[time_precision])
+        self.log = self._estimate(
+            series * log_ratio,
+            points_per_second * log_ratio,
+            LOG_POINT_SIZE)
+        # Number shards get the files left by the log shards with the fewest
+        # files, log shards get what is left by the number shards.
+        budget = self.max_open_files * OPEN_FILES_BUDGET
+        self.duration_num = self._recommend(
+            self.number,
+            default='1w',
+            max_files=budget - min(self._files(row) for row in self.log))
+        self.duration_log = self._recommend(
+            self.log,
+            default='1d',
+            max_files=budget - self._files(next(
+                row for row in self.number
+                if row['duration'] == self.duration_num)))
+
+    def _estimate(self, series, points_per_second, point_size):
+        rows = []
+        for key, (duration, _) in DURATIONS.items():
+            points = points_per_second * duration
+            rows.append({
+                'duration': key,
+                'points_per_series': points / series if series else 0,
+                'shard_size': points * point_size,
+                'shards': math.ceil(self.retention / duration) + 1
+                if series else 0})
+        return rows
+
+    @staticmethod
+    def _files(row):
+        return SHARD_FILES * row['shards']
+
+    @classmethod
+    def _recommend(cls, rows, default, max_files):
+        '''Returns the shortest duration which fills a chunk for each series.
+
+        Durations with more than max_files shard files in the retention
+        window are excluded, unless no duration is left, then the longest
+        duration is used. Durations with a shard larger than MAX_SHARD_SIZE
+        are only used when no other duration is left.
+        '''
+        if not any(row['points_per_series'] for row in rows):
+            return default
+        rows = [row for row in rows if cls._files(row) <= max_files] or \
+            rows[-1:]
+        fitting = [row for row in rows if row['shard_size'] <= MAX_SHARD_SIZE]
+        if not fitting:
+            return rows[0]['duration']
+        for row in fitting:
+            if row['points_per_series'] >= CHUNK_POINTS:
+                return row['duration']
+        return fitting[-1]['duration']
+
+    def open_files(self, duration_num, duration_log):
+        '''Returns the number of shard files in the retention window.'''
+        shards = {row['duration']: row['shards'] for row in self.number}
+        log_shards = {row['duration']: row['shards'] for row in self.log}
+        return SHARD_FILES * (shards[duration_num] + log_shards[duration_log])
+
+    def check_open_files(self, duration_num, duration_log):
+        '''Returns a warning message when too many files would be open.'''
+        n = self.open_files(duration_num, duration_log)
+        if n > self.max_open_files * OPEN_FILES_BUDGET:
+            return (
+                'The shards in the retention window use {} files which is '
+                'more than {:.0%} of max_open_files ({}{})'.format(
+                    n,
+                    OPEN_FILES_BUDGET,
+                    self.max_open_files,
+                    ', the SiriDB default'
+                    if self.max_open_files_default else ''))
+        return None
+
+    def as_text(self):
+        lines = []
+        for title, rows in (('Number shards', self.number),
+                            ('Log shards', self.log)):
+            lines.append('{} (time precision: {}):'.format(
+                title, self.time_precision))
+            lines.append('{}{}{}{}{}'.format(
+                'duration'.ljust(10),
+                'size'.ljust(12),
+                'points/series'.ljust(16),
+                'shards'.ljust(8),
+                'files'))
+            for row in rows:
+                lines.append('{}{}{}{}{}'.format(
+                    row['duration'].ljust(10),
+                    format_bytes(row['shard_size']).ljust(12),
+                    '{:.0f}'.format(row['points_per_series']).ljust(16),
+                    str(row['shards']).ljust(8),
+                    SHARD_FILES * row['shards']))
+        lines.append('Recommended: --duration-num {} --duration-log {} '
+                     '({} open shard files{})'.format(
+                         self.duration_num,
+                         self.duration_log,
+                         self.open_files(self.duration_num,
+                                         self.duration_log),
+                         ', max_open_files: {}{}'.format(
+                             self.max_open_files,
+                             ' (SiriDB default)'
+                             if self.max_open_files_default else '')))
+        warning = self.check_open_files(self.duration_num, self.duration_log)
+        if warning:
+            lines.append(warning)
+        return '\n'.join(lines)
+
+
+def imbalance(series):
+    '''Returns how much the largest value is above the average (0 = even).'''
+    if not series or not sum(series):
+        return 0.0
+    mean = sum(series) / len(series)
+    return (max(series) - mean) / mean
+
+
+class ClusterAdvice:
+
+    def __init__(self, pools):
+        '''Compare a new pool with a replica for each pool without one.
+
+        pools is the result of `list pools pool, servers, series`.
+        '''
+        self.pools = sorted(pools)
+        self.total = sum(p[2] for p in pools)
+        self.mean = self.total / len(pools) if pools else 0
+        self.imbalance = imbalance([p[2] for p in pools])
+
+        # A new pool takes its share of the series from all other pools
+        n = len(pools)
+        moved = self.total // (n + 1)
+        self.new_pool = {
+            'pool': n,
+            'moved': moved,
+            'eta': moved / REINDEX_SERIES_PER_SECOND,
+            'imbalance': imbalance(
+                [p[2] * n / (n + 1) for p in pools] + [moved])}
+
+        # A replica synchronizes all series of its pool and doubles the
+        # servers available for reading those series
+        self.replicas = [{
+            'pool': p[0],
+            'series': p[2],
+            'read_share': p[2] / self.total if self.total else 0.0,
+            'eta': p[2] / SYNC_SERIES_PER_SECOND}
+            for p in sorted(pools, key=lambda p: -p[2]) if p[1] == 1]
+
+        if not self.replicas:
+            self.recommended = 'pool'
+            self.reason = 'all pools already have a replica'
+        elif self.mean >= POOL_SERIES_TARGET:
+            self.recommended = 'pool'
+            self.reason = 'the pools have {:.0f} series on average, more ' \
+                'than {}'.format(self.mean, POOL_SERIES_TARGET)
+        elif self.imbalance >= IMBALANCE_THRESHOLD:
+            self.recommended = 'replica'
+            self.reason = 'the pools are imbalanced, a replica relieves ' \
+                'the largest pool'
+        else:
+            self.recommended = 'replica'
+            self.reason = 'the pools are small enough, a replica adds ' \
+                'read capacity without a re-index'
+
+        self.replica_pool = self.replicas[0]['pool'] \
+            if self.replicas else None
+
+    def as_text(self):
+        lines = [
+            'Series: {} in {} pool(s), imbalance: {:.0%}'.format(
+                self.total, len(self.pools), self.imbalance),
+            'New pool {}: {} series move during the re-index (estimated '
+            '{}), imbalance afterwards: {:.0%}'.format(
+                self.new_pool['pool'],
+                self.new_pool['moved'],
+                format_duration(self.new_pool['eta']),
+                self.new_pool['imbalance'])]
+        for replica in self.replicas:
+            lines.append(
+                'Replica for pool {}: {} series to synchronize (estimated '
+                '{}), reads for {:.0%} of the series get a second '
+                'server'.format(replica['pool'],
+                                replica['series'],
+                                format_duration(replica['eta']),
+                                replica['read_share']))
+        lines.append('Recommended: {} ({})'.format(
+            'new pool' if self.recommended == 'pool'
+            else 'replica for pool {}'.format(self.replica_pool),
+            self.reason))
+        return '\n'.join(lines)
+
+
+def format_duration(seconds):
+    if seconds < 60:
+        return '{:.0f}s'.format(seconds)
+    if seconds < 3600:
+        return '{:.0f}m {:.0f}s'.format(*divmod(seconds, 60))
+    return '{:.0f}h {:.0f}m'.format(seconds // 3600, seconds % 3600 // 60)
+
+
+def format_bytes(n):
+    if n is None:
+        return 'unknown'
+    for unit in ('B', 'KB', 'MB', 'GB', 'TB'):
+        if n < 1024 or unit == 'TB':
+            return '{:.0f}{}'.format(n, unit) if unit == 'B' \
+                else '{:.1f}{}'.format(n, unit)
+        n /= 1024
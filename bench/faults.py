@@ -0,0 +1,188 @@
+#!/usr/bin/python3
+'''Run siridb-manage flows against slow and unreliable stub servers.
+
+Each scenario file describes one scenario, or a list of scenarios:
+
+    {
+        "name": "slow-register",
+        "flow": "create-pool",
+        "cluster": {"pools": 4, "users": 10},
+        "args": ["--load-timeout", "5"],
+        "local": {"dblist_delay": 2.0},
+        "remote": {"latency": {"default": 0.01, "register_server": 1.0},
+                   "jitter": 0.2,
+                   "bandwidth": 65536,
+                   "drop": {"register_server": 0.2},
+                   "seed": 42},
+        "repeat": 10,
+        "timeout": 60
+    }
+
+"local" and "remote" are the arguments for siridbstub.Faults. Runs use the
+seed plus the run number, so a scenario gives the same faults every time it
+runs. The result is a timing and outcome matrix, printed as a table and
+written as JSON.
+
+Usage: python3 bench/faults.py [scenario files, default: bench/scenarios/]
+                               [--output bench/results/faults.json]
+'''
+
+import os
+import sys
+import json
+import glob
+import time
+import asyncio
+import argparse
+import platform
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flows import run_flow  # noqa: E402
+from siridbstub import Faults  # noqa: E402
+from version import __version__  # noqa: E402
+
+SCENARIO_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             'scenarios')
+
+DEFAULT_REPEAT = 5
+DEFAULT_TIMEOUT = 120
+
+
+def read_scenarios(fn):
+    with open(fn, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    if os.path.splitext(fn)[1].lower() in ('.yml', '.yaml'):
+        import yaml
+        scenarios = yaml.safe_load(content)
+    else:
+        scenarios = json.loads(content)
+
+    if isinstance(scenarios, dict):
+        scenarios = [scenarios]
+
+    for scenario in scenarios:
+        if 'name' not in scenario or 'flow' not in scenario:
+            raise ValueError(
+                'Each scenario in {!r} needs a name and a flow'.format(fn))
+    return scenarios
+
+
+def faults(spec, run):
+    if not spec:
+        return None
+    spec = dict(spec)
+    if spec.get('seed') is not None:
+        spec['seed'] += run
+    return Faults(**spec)
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[int(round(p * (len(values) - 1)))]
+
+
+def outcome(exit_code):
+    if exit_code is None:
+        return 'timeout'
+    return 'ok' if exit_code == 0 else 'exit_{}'.format(exit_code)
+
+
+async def run_scenario(scenario):
+    runs = []
+    for run in range(scenario.get('repeat', DEFAULT_REPEAT)):
+        runs.append(await run_flow(
+            scenario['flow'],
+            local_faults=faults(scenario.get('local'), run),
+            remote_faults=faults(scenario.get('remote'), run),
+            extra_args=scenario.get('args', []),
+            timeout=scenario.get('timeout', DEFAULT_TIMEOUT),
+            **scenario.get('cluster', {})))
+
+    outcomes = {}
+    for run in runs:
+        key = outcome(run['exit_code'])
+        outcomes[key] = outcomes.get(key, 0) + 1
+
+    totals = [run['total'] for run in runs]
+    names = []
+    for run in runs:
+        names.extend(name for name in run['phases'] if name not in names)
+
+    errors = sorted(set(
+        run['output'].strip().splitlines()[-1]
+        for run in runs if run['exit_code'] and run['output'].strip()))
+
+    return {
+        'name': scenario['name'],
+        'flow': scenario['flow'],
+        'runs': len(runs),
+        'outcomes': outcomes,
+        'total': {
+            'p50': round(percentile(totals, 0.5), 6),
+            'p99': round(percentile(totals, 0.99), 6),
+            'max': round(max(totals), 6)},
+        'phases_p50': {
+            name: round(percentile(
+                [run['phases'].get(name, 0.0) for run in runs], 0.5), 6)
+            for name in names},
+        'errors': errors}
+
+
+async def main(scenarios):
+    print('{}{}{}{}{}{}'.format('scenario'.ljust(24),
+                                'flow'.ljust(16),
+                                'p50'.ljust(10),
+                                'p99'.ljust(10),
+                                'max'.ljust(10),
+                                'outcomes'))
+    results = []
+    for scenario in scenarios:
+        result = await run_scenario(scenario)
+        results.append(result)
+        print('{}{}{}{}{}{}'.format(
+            result['name'].ljust(24),
+            result['flow'].ljust(16),
+            '{:.3f}s'.format(result['total']['p50']).ljust(10),
+            '{:.3f}s'.format(result['total']['p99']).ljust(10),
+            '{:.3f}s'.format(result['total']['max']).ljust(10),
+            ' '.join('{}={}'.format(k, v)
+                     for k, v in sorted(result['outcomes'].items()))))
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        'scenarios',
+        nargs='*',
+        help='scenario files (JSON or YAML), by default all files in '
+        'bench/scenarios/')
+    parser.add_argument(
+        '--output',
+        type=str,
+        default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             'results',
+                             'faults.json'))
+    args = parser.parse_args()
+
+    fns = args.scenarios or sorted(
+        glob.glob(os.path.join(SCENARIO_PATH, '*.json')) +
+        glob.glob(os.path.join(SCENARIO_PATH, '*.yml')) +
+        glob.glob(os.path.join(SCENARIO_PATH, '*.yaml')))
+    scenarios = [scenario for fn in fns for scenario in read_scenarios(fn)]
+
+    results = asyncio.run(main(scenarios))
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump({
+            'version': __version__,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'results': results}, f, indent=2, sort_keys=True)
+        f.write('\n')
+    print('Results written to {}'.format(args.output))
@@ -0,0 +1,250 @@
+#!/usr/bin/python3
+'''Benchmark the siridb-manage flows against stub SiriDB servers.
+
+Every run starts fresh stub servers (see siridbstub.py) and a temporary
+database path, and runs siridb-manage as a sub-process the way an operator
+would. The total time is measured around the process, the phases are
+derived from the requests the stub servers receive:
+
+    startup      process start until the first request
+    connect      first request until files are fetched or a database loads
+    fetch_files  fetching servers.dat, users.dat and groups.dat
+    load         loading the new database
+    register     registering the new server until the process exits
+
+The median of each value over the repeated runs is written as JSON so a
+changed baseline shows up in review.
+
+Usage: python3 bench/flows.py [--pools 1,16,256] [--users 1,1000]
+                              [--databases 1,4] [--repeat 5]
+                              [--output bench/results/flows.json]
+'''
+
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import platform
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from siridbstub import StubCluster  # noqa: E402
+from siridbstub import StubServer  # noqa: E402
+from version import __version__  # noqa: E402
+
+MANAGE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'siridb-manage.py')
+
+CONFIG = '''[siridb]
+listen_client_port = {port}
+server_name = 127.0.0.1:9010
+ip_support = ALL
+default_db_path = {path}
+'''
+
+PHASES = [
+    ('fetch_files', lambda request: request.startswith('file_')),
+    ('load', lambda request: request == 'loaddb'),
+    ('register', lambda request: request == 'register_server')]
+
+
+def phases(start, end, events):
+    '''Returns the phase durations for one run.
+
+    Each phase starts at the first request which belongs to it (startup at
+    the process start) and ends where the next phase starts.
+    '''
+    events = sorted(events)
+    marks = [('startup', start)]
+    if events:
+        marks.append(('connect', events[0][0]))
+    for name, match in PHASES:
+        for event in events:
+            if match(event[3]):
+                marks.append((name, event[0]))
+                break
+    marks.append((None, end))
+    return {name: marks[i + 1][1] - t
+            for i, (name, t) in enumerate(marks[:-1])}
+
+
+def request_counts(events):
+    counts = {}
+    for event in events:
+        counts[event[3]] = counts.get(event[3], 0) + 1
+    return counts
+
+
+async def run_flow(flow,
+                   pools=1,
+                   users=1,
+                   databases=1,
+                   local_faults=None,
+                   remote_faults=None,
+                   extra_args=(),
+                   timeout=None):
+    '''Run one flow against fresh stub servers.
+
+    The exit code is None when the process is killed after timeout seconds.
+    '''
+    path = tempfile.mkdtemp(prefix='siridb-manage-bench-')
+    local = await StubServer(port=0, faults=local_faults).start()
+    cluster = StubCluster(pools=pools,
+                          servers_per_pool=1 if flow == 'create-replica'
+                          else 2,
+                          users=users,
+                          groups=users)
+    remote = await StubServer(port=0,
+                              cluster=cluster,
+                              faults=remote_faults).start()
+    try:
+        dbpath = os.path.join(path, 'db')
+        os.mkdir(dbpath)
+        config = os.path.join(path, 'siridb.conf')
+        with open(config, 'w') as f:
+            f.write(CONFIG.format(port=local.port, path=dbpath))
+
+        args = [sys.executable, MANAGE, '-n', '-c', config, flow]
+        if flow == 'create-new':
+            args += ['--dbname', 'dbnew']
+        elif flow == 'create-many':
+            manifest = os.path.join(path, 'manifest.json')
+            with open(manifest, 'w') as f:
+                json.dump([{'dbname': 'db{}'.format(i)}
+                           for i in range(databases)], f)
+            args += ['--manifest', manifest]
+        else:
+            args += ['--dbname', cluster.dbname,
+                     '--remote-address', '127.0.0.1:{}'.format(remote.port),
+                     '--user', 'iris',
+                     '--password', 'siri']
+            if flow == 'create-replica':
+                args += ['--pool', '0']
+        args += list(extra_args)
+
+        start = time.perf_counter()
+        process = await asyncio.create_subprocess_exec(
+            *args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT)
+        try:
+            output, _ = await asyncio.wait_for(process.communicate(), timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            output, _ = await process.communicate()
+            returncode = None
+        else:
+            returncode = process.returncode
+        end = time.perf_counter()
+
+        if returncode and local_faults is None and remote_faults is None:
+            sys.stderr.write(output.decode('utf-8', 'replace'))
+
+        events = local.events + remote.events
+        return {
+            'exit_code': returncode,
+            'output': output.decode('utf-8', 'replace'),
+            'total': end - start,
+            'phases': phases(start, end, events),
+            'requests': request_counts(events)}
+    finally:
+        await local.stop()
+        await remote.stop()
+        shutil.rmtree(path)
+
+
+def median_of(runs):
+    names = []
+    for run in runs:
+        names.extend(name for name in run['phases'] if name not in names)
+    return {
+        'exit_codes': sorted(set(run['exit_code'] for run in runs)),
+        'total': round(statistics.median(run['total'] for run in runs), 6),
+        'phases': {
+            name: round(statistics.median(
+                run['phases'].get(name, 0.0) for run in runs), 6)
+            for name in names},
+        'requests': runs[-1]['requests']}
+
+
+def scenarios(args):
+    yield 'create-new', {}
+    for databases in args.databases:
+        yield 'create-many', {'databases': databases}
+    for flow in ('create-pool', 'create-replica'):
+        for pools in args.pools:
+            for users in args.users:
+                yield flow, {'pools': pools, 'users': users}
+
+
+async def main(args):
+    results = []
+    for flow, params in scenarios(args):
+        runs = [await run_flow(flow, **params) for _ in range(args.repeat)]
+        result = dict(flow=flow, params=params, **median_of(runs))
+        results.append(result)
+        print('{}{}{}{}'.format(
+            flow.ljust(16),
+            ' '.join('{}={}'.format(k, v) for k, v in params.items())
+            .ljust(24),
+            '{:.3f}s'.format(result['total']).ljust(10),
+            ' '.join('{}={:.3f}'.format(k, v)
+                     for k, v in result['phases'].items())))
+    return results
+
+
+def _list(s):
+    return [int(i) for i in s.split(',')]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--pools',
+        type=_list,
+        default=[1, 16, 256],
+        help='comma separated number of pools in the remote cluster')
+    parser.add_argument(
+        '--users',
+        type=_list,
+        default=[1, 1000],
+        help='comma separated number of users and groups in the remote '
+        'cluster')
+    parser.add_argument(
+        '--databases',
+        type=_list,
+        default=[1, 4],
+        help='comma separated number of databases for create-many')
+    parser.add_argument(
+        '--repeat',
+        type=int,
+        default=5,
+        help='number of runs per scenario, the median is reported')
+    parser.add_argument(
+        '--output',
+        type=str,
+        default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             'results',
+                             'flows.json'))
+    args = parser.parse_args()
+
+    results = asyncio.run(main(args))
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump({
+            'version': __version__,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'repeat': args.repeat,
+            'results': results}, f, indent=2, sort_keys=True)
+        f.write('\n')
+    print('Results written to {}'.format(args.output))
@@ -0,0 +1,92 @@
+#!/usr/bin/python3
+'''Benchmark adding a server to servers.dat.
+
+Compares unpacking, appending and re-packing the complete file (the way
+servers.dat was updated before) with the in-place editor in serversdat.py
+for synthetic server lists. The time for a full validation of the file is
+reported as well.
+
+Usage: python3 bench/servers_dat.py [--sizes 10,1000,50000] [--repeat 5]
+'''
+
+import os
+import sys
+import time
+import uuid
+import shutil
+import argparse
+import tempfile
+import qpack
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serversdat  # noqa: E402
+
+
+def make_servers(n):
+    return [[uuid.uuid1().bytes,
+             'server{}.siridb.local'.format(i).encode('utf-8'),
+             9010,
+             i // 2] for i in range(n)]
+
+
+def repack(fn, server):
+    with open(fn, 'rb') as f:
+        servers_obj = qpack.unpackb(f.read())
+    servers_obj.append(server)
+    with open(fn, 'wb') as f:
+        f.write(qpack.packb(servers_obj))
+
+
+def validate(fn, server):
+    serversdat.validate(fn)
+
+
+def timeit(func, fn, content, repeat):
+    best = None
+    for _ in range(repeat):
+        with open(fn, 'wb') as f:
+            f.write(content)
+        server = [uuid.uuid1().bytes, b'new.siridb.local', 9010, 0]
+        start = time.perf_counter()
+        func(fn, server)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--sizes',
+        type=str,
+        default='10,100,1000,10000,50000',
+        help='comma separated number of servers to test with')
+    parser.add_argument(
+        '--repeat',
+        type=int,
+        default=5,
+        help='number of runs per size, the best run is reported')
+    args = parser.parse_args()
+
+    path = tempfile.mkdtemp()
+    fn = os.path.join(path, 'servers.dat')
+    try:
+        print('{}{}{}{}{}'.format('servers'.ljust(10),
+                                  'bytes'.ljust(12),
+                                  'repack (ms)'.ljust(14),
+                                  'in place (ms)'.ljust(16),
+                                  'validate (ms)'))
+        for n in map(int, args.sizes.split(',')):
+            content = qpack.packb(make_servers(n))
+            t_repack = timeit(repack, fn, content, args.repeat)
+            t_inplace = timeit(serversdat.set_server, fn, content, args.repeat)
+            t_validate = timeit(validate, fn, content, args.repeat)
+            print('{}{}{}{}{}'.format(
+                str(n).ljust(10),
+                str(len(content)).ljust(12),
+                '{:.3f}'.format(t_repack * 1000).ljust(14),
+                '{:.3f}'.format(t_inplace * 1000).ljust(16),
+                '{:.3f}'.format(t_validate * 1000)))
+    finally:
+        shutil.rmtree(path)
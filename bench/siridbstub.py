@@ -0,0 +1,340 @@
+#!/usr/bin/python3
+'''Stand-in SiriDB server for benchmarking siridb-manage.
+
+Speaks enough of the SiriDB client protocol for the manage tool: server
+info, authentication, loading a database, the queries used for joining a
+cluster, fetching servers.dat, users.dat and groups.dat and registering a
+server. No points are stored, the goal is to measure the manage flows
+without a live SiriDB.
+
+A local server reports the databases it has loaded, a remote server is
+part of a StubCluster which already has a database with pools, servers,
+users and groups. Both can be slowed down or made unreliable with Faults.
+
+Usage: python3 bench/siridbstub.py [--local-port 9000] [--remote-port 9001]
+'''
+
+import os
+import sys
+import time
+import uuid
+import random
+import struct
+import asyncio
+import logging
+import argparse
+import qpack
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from version import __version__  # noqa: E402
+from siridb.connector.lib import protomap  # noqa: E402
+
+HEADER = struct.Struct('<IHBB')
+
+REQUEST_NAMES = {
+    protomap.CPROTO_REQ_QUERY: 'query',
+    protomap.CPROTO_REQ_AUTH: 'auth',
+    protomap.CPROTO_REQ_INFO: 'info',
+    protomap.CPROTO_REQ_LOADDB: 'loaddb',
+    protomap.CPROTO_REQ_REGISTER_SERVER: 'register_server',
+    protomap.CPROTO_REQ_FILE_SERVERS: 'file_servers',
+    protomap.CPROTO_REQ_FILE_USERS: 'file_users',
+    protomap.CPROTO_REQ_FILE_GROUPS: 'file_groups'}
+
+
+class StubCluster:
+
+    def __init__(self,
+                 dbname='dbtest',
+                 pools=1,
+                 servers_per_pool=1,
+                 series_per_pool=1000,
+                 users=1,
+                 groups=0,
+                 version=__version__):
+        self.dbname = dbname
+        self.version = version
+        self.servers = [
+            [uuid.uuid1().bytes,
+             'server{}.siridb.local'.format(i),
+             9010,
+             i // servers_per_pool]
+            for i in range(pools * servers_per_pool)]
+        self.series = {pool: series_per_pool for pool in range(pools)}
+        self.users = [
+            ['iris' if i == 0 else 'user{}'.format(i),
+             'x' * 60,
+             'full' if i == 0 else 'read']
+            for i in range(users)]
+        self.groups = [
+            ['group{}'.format(i), '/series{}.*/'.format(i)]
+            for i in range(groups)]
+        self.props = {
+            'timezone': 'NAIVE',
+            'time_precision': 'ms',
+            'duration_log': 86400000,
+            'duration_num': 604800000,
+            'dbname': dbname,
+            'drop_threshold': 1.0}
+
+    def pools(self):
+        return [[pool,
+                 sum(server[3] == pool for server in self.servers),
+                 series]
+                for pool, series in sorted(self.series.items())]
+
+    def register(self, server):
+        server = list(server)
+        if server[3] not in self.series:
+            self.series[server[3]] = 0
+        self.servers.append(server)
+
+    def query(self, q):
+        if q.startswith('show version'):
+            return {'data': [{'name': 'version', 'value': self.version}]}
+        if q.startswith('show'):
+            return {'data': [{'name': name, 'value': value}
+                             for name, value in self.props.items()]}
+        if q.startswith('list users'):
+            return {'columns': ['name', 'access'],
+                    'users': [[user[0], user[2]] for user in self.users]}
+        if q.startswith('list pools'):
+            return {'columns': ['pool', 'servers', 'series'],
+                    'pools': self.pools()}
+        if q.startswith('list servers'):
+            return {'columns': ['name', 'status'],
+                    'servers': [['{}:{}'.format(server[1], server[2]),
+                                 'running'] for server in self.servers]}
+        raise ValueError('Query not supported by the stub: {!r}'.format(q))
+
+    def file(self, tp):
+        if tp == protomap.CPROTO_REQ_FILE_SERVERS:
+            return qpack.packb(self.servers)
+        if tp == protomap.CPROTO_REQ_FILE_USERS:
+            return qpack.packb([1] + self.users)
+        return qpack.packb([1] + self.groups)
+
+
+class Faults:
+    '''Latency and failures for the requests handled by a stub server.
+
+    latency:      seconds before a request is handled, a mapping from request
+                  name (see REQUEST_NAMES) to seconds; 'default' is used for
+                  requests which are not in the mapping.
+    jitter:       a random 0..jitter seconds is added to the latency.
+    bandwidth:    bytes per second for sending responses. (the delay is
+                  based on the response size, responses do not share the
+                  bandwidth)
+    drop:         mapping from request name (or 'default') to the chance
+                  the connection is closed instead of answering a request.
+    dblist_delay: seconds before a loaded database is visible in the
+                  database list of the server info.
+    seed:         seed for the random generator so runs can be repeated.
+    '''
+
+    def __init__(self,
+                 latency=None,
+                 jitter=0.0,
+                 bandwidth=None,
+                 drop=None,
+                 dblist_delay=0.0,
+                 seed=None):
+        self.latency = latency or {}
+        self.jitter = jitter
+        self.bandwidth = bandwidth
+        self.drop = drop or {}
+        self.dblist_delay = dblist_delay
+        self._random = random.Random(seed)
+
+    def delay(self, request):
+        latency = self.latency.get(request, self.latency.get('default', 0.0))
+        if self.jitter:
+            latency += self._random.uniform(0, self.jitter)
+        return latency
+
+    def send_delay(self, size):
+        return size / self.bandwidth if self.bandwidth else 0.0
+
+    def should_drop(self, request):
+        chance = self.drop.get(request, self.drop.get('default', 0.0))
+        return chance > 0 and self._random.random() < chance
+
+
+class StubProtocol(asyncio.Protocol):
+
+    def __init__(self, server):
+        self.server = server
+        self._buffer = b''
+        self._transport = None
+
+    def connection_made(self, transport):
+        self._transport = transport
+        self.server.connections.add(self)
+
+    def connection_lost(self, exc):
+        self._transport = None
+        self.server.connections.discard(self)
+
+    def close(self):
+        if self._transport is not None:
+            self._transport.close()
+
+    def data_received(self, data):
+        self._buffer += data
+        while len(self._buffer) >= HEADER.size:
+            size, pid, tp, check = HEADER.unpack_from(self._buffer)
+            if check != tp ^ 255:
+                self._transport.close()
+                return
+            end = HEADER.size + size
+            if len(self._buffer) < end:
+                return
+            body = self._buffer[HEADER.size:end]
+            self._buffer = self._buffer[end:]
+            asyncio.ensure_future(self._handle(pid, tp, body))
+
+    def send(self, pid, tp, data=b''):
+        if self._transport is not None:
+            self._transport.write(
+                HEADER.pack(len(data), pid, tp, tp ^ 255) + data)
+
+    async def _handle(self, pid, tp, body):
+        start = time.perf_counter()
+        request = tp
+        faults = self.server.faults
+        name = REQUEST_NAMES.get(tp, str(tp))
+
+        if faults.should_drop(name):
+            self.close()
+            self.server.log(request, start, dropped=True)
+            return
+
+        delay = faults.delay(name)
+        if delay:
+            await asyncio.sleep(delay)
+        try:
+            tp, data = await self.server.handle(tp, body)
+        except Exception as e:
+            tp = protomap.CPROTO_ERR_MSG
+            data = qpack.packb({'error_msg': str(e)})
+
+        delay = faults.send_delay(HEADER.size + len(data))
+        if delay:
+            await asyncio.sleep(delay)
+        self.send(pid, tp, data)
+        self.server.log(request, start)
+
+
+class StubServer:
+
+    def __init__(self,
+                 host='127.0.0.1',
+                 port=9000,
+                 cluster=None,
+                 faults=None):
+        self.host = host
+        self.port = port
+        self.cluster = cluster
+        self.faults = faults or Faults()
+        self.dblist = [] if cluster is None else [cluster.dbname]
+        self.events = []
+        self.connections = set()
+        self._server = None
+
+    def log(self, tp, start, dropped=False):
+        '''Keep the start and end time for each handled request.'''
+        name = REQUEST_NAMES.get(tp, str(tp))
+        self.events.append((start,
+                            time.perf_counter(),
+                            self.port,
+                            'dropped_{}'.format(name) if dropped else name))
+
+    async def handle(self, tp, body):
+        '''Returns the response type and packed data for a request.'''
+        if tp == protomap.CPROTO_REQ_INFO:
+            version = __version__ if self.cluster is None \
+                else self.cluster.version
+            return protomap.CPROTO_RES_INFO, qpack.packb(
+                [version, self.dblist])
+        if tp == protomap.CPROTO_REQ_AUTH:
+            return protomap.CPROTO_RES_AUTH_SUCCESS, b''
+        if tp == protomap.CPROTO_REQ_LOADDB:
+            return protomap.CPROTO_RES_ACK, self._loaddb(body)
+        if self.cluster is None:
+            raise ValueError('Not connected to a database')
+        if tp == protomap.CPROTO_REQ_QUERY:
+            q = qpack.unpackb(body, decode='utf-8')[0]
+            try:
+                result = self.cluster.query(q)
+            except ValueError as e:
+                return protomap.CPROTO_ERR_QUERY, qpack.packb(
+                    {'error_msg': str(e)})
+            return protomap.CPROTO_RES_QUERY, qpack.packb(result)
+        if tp == protomap.CPROTO_REQ_REGISTER_SERVER:
+            self.cluster.register(qpack.unpackb(body))
+            return protomap.CPROTO_RES_ACK, b''
+        if tp in (protomap.CPROTO_REQ_FILE_SERVERS,
+                  protomap.CPROTO_REQ_FILE_USERS,
+                  protomap.CPROTO_REQ_FILE_GROUPS):
+            return protomap.CPROTO_RES_FILE, self.cluster.file(tp)
+        raise ValueError('Unsupported request type: {}'.format(tp))
+
+    def _loaddb(self, body):
+        dbpath = qpack.unpackb(body, decode='utf-8')
+        with open(os.path.join(dbpath, 'database.dat'), 'rb') as f:
+            dbname = qpack.unpackb(f.read())[2]
+        if isinstance(dbname, bytes):
+            dbname = dbname.decode('utf-8')
+        if self.faults.dblist_delay:
+            asyncio.get_event_loop().call_later(
+                self.faults.dblist_delay, self.dblist.append, dbname)
+        else:
+            self.dblist.append(dbname)
+        return b''
+
+    async def start(self):
+        self._server = await asyncio.get_event_loop().create_server(
+            lambda: StubProtocol(self), self.host, self.port)
+        # port 0 binds to a free port
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        for connection in list(self.connections):
+            connection.close()
+        self._server.close()
+        await self._server.wait_closed()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--local-port', type=int, default=9000)
+    parser.add_argument('--remote-port', type=int, default=9001)
+    parser.add_argument('--dbname', type=str, default='dbtest')
+    parser.add_argument('--pools', type=int, default=1)
+    parser.add_argument('--servers-per-pool', type=int, default=1)
+    parser.add_argument('--users', type=int, default=1)
+    parser.add_argument('--groups', type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    async def run():
+        cluster = StubCluster(dbname=args.dbname,
+                              pools=args.pools,
+                              servers_per_pool=args.servers_per_pool,
+                              users=args.users,
+                              groups=args.groups)
+        await StubServer(port=args.local_port).start()
+        await StubServer(port=args.remote_port, cluster=cluster).start()
+        logging.info('Local stub on port {}, remote stub with database {!r} '
+                     'on port {}'.format(args.local_port,
+                                         args.dbname,
+                                         args.remote_port))
+        await asyncio.Event().wait()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
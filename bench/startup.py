@@ -0,0 +1,104 @@
+#!/usr/bin/python3
+'''Check the cold start of siridb-manage against an import time budget.
+
+Commands which do not talk to SiriDB (--version, --help, plan-shards and gc)
+should not import asyncio, qpack or the SiriDB connector. Each command is
+run with `python -X importtime` and the import time of the top level
+modules is summed. The best of a number of runs is compared with the budget.
+
+Exits with 1 when a command is over budget or imports a module it should
+not need.
+
+Usage: python3 bench/startup.py [--budget 50] [--repeat 5]
+'''
+
+import os
+import re
+import sys
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+MANAGE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'siridb-manage.py')
+
+CONFIG = '''[siridb]
+listen_client_port = 9000
+server_name = 127.0.0.1:9010
+ip_support = ALL
+default_db_path = {path}
+'''
+
+COMMANDS = [
+    ['--version'],
+    ['--help'],
+    ['plan-shards', '--series', '1000', '--points-per-second', '100'],
+    ['plan-shards', '--help'],
+    ['gc']]
+
+NOT_NEEDED = ('asyncio', 'qpack', 'siridb')
+
+IMPORT_LINE = re.compile(
+    r'^import time:\s+(\d+) \|\s+(\d+) \|(\s*)([\w.]+)$')
+
+
+def import_times(args, config):
+    '''Returns the top level import time in milliseconds and all modules.'''
+    cmd = [sys.executable, '-X', 'importtime', MANAGE, '-n', '-c', config]
+    result = subprocess.run(cmd + args,
+                            stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE,
+                            universal_newlines=True)
+    total = 0
+    modules = []
+    for line in result.stderr.splitlines():
+        m = IMPORT_LINE.match(line)
+        if m is None:
+            continue
+        modules.append(m.group(4))
+        if len(m.group(3)) == 1:
+            total += int(m.group(2))
+    return total / 1000, modules
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--budget',
+        type=float,
+        default=50.0,
+        help='import time budget in milliseconds for each command')
+    parser.add_argument(
+        '--repeat',
+        type=int,
+        default=5,
+        help='number of runs per command, the best run is used')
+    args = parser.parse_args()
+
+    path = tempfile.mkdtemp()
+    config = os.path.join(path, 'siridb.conf')
+    with open(config, 'w') as f:
+        f.write(CONFIG.format(path=path))
+
+    failed = False
+    try:
+        for command in COMMANDS:
+            runs = [import_times(command, config) for _ in range(args.repeat)]
+            best = min(total for total, _ in runs)
+            not_needed = sorted(set(
+                module for module in runs[0][1]
+                if module.split('.')[0] in NOT_NEEDED))
+            ok = best <= args.budget and not not_needed
+            failed = failed or not ok
+            print('{}{}{}'.format(
+                ' '.join(command).ljust(56),
+                '{:.1f}ms'.format(best).ljust(10),
+                'ok' if ok else 'FAILED{}'.format(
+                    ' (imports {})'.format(', '.join(not_needed))
+                    if not_needed else '')))
+    finally:
+        shutil.rmtree(path)
+
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,91 @@
+'''Disk benchmark for the buffer path.
+
+SiriDB writes series buffers as buffer_size blocks to the buffer file and
+flushes them to disk, so the latency of small aligned writes followed by an
+fsync is what matters for the buffer location.
+'''
+
+import os
+import time
+import random
+import tempfile
+from advisor import existing_path
+from advisor import format_bytes
+from constants import DEFAULT_BENCH_SAMPLES
+from constants import DEFAULT_BENCH_BLOCKS
+
+
+def percentile(values, p):
+    if not values:
+        raise ValueError('Cannot compute a percentile without values')
+    values = sorted(values)
+    return values[int(round(p * (len(values) - 1)))]
+
+
+class DiskBench:
+
+    def __init__(self,
+                 path,
+                 buffer_size,
+                 samples=DEFAULT_BENCH_SAMPLES,
+                 blocks=DEFAULT_BENCH_BLOCKS):
+        if samples < 1:
+            raise ValueError('Expecting at least 1 sample, got {}'.format(
+                samples))
+        self.path = existing_path(path)
+        self.buffer_size = buffer_size
+        self.samples = samples
+        self.blocks = blocks
+        self.write_throughput = None
+        self.fsync_latencies = []
+
+    def run(self):
+        '''Run the benchmark, this is blocking.'''
+        block = os.urandom(self.buffer_size)
+        fd, fn = tempfile.mkstemp(prefix='.siridb-manage-bench-',
+                                  dir=self.path)
+        try:
+            start = time.perf_counter()
+            for i in range(self.blocks):
+                os.pwrite(fd, block, i * self.buffer_size)
+            os.fsync(fd)
+            self.write_throughput = \
+                self.blocks * self.buffer_size / (time.perf_counter() - start)
+
+            for _ in range(self.samples):
+                offset = random.randrange(self.blocks) * self.buffer_size
+                os.pwrite(fd, block, offset)
+                start = time.perf_counter()
+                os.fsync(fd)
+                self.fsync_latencies.append(time.perf_counter() - start)
+        finally:
+            os.close(fd)
+            os.unlink(fn)
+        return self
+
+    @property
+    def fsync_p50(self):
+        return percentile(self.fsync_latencies, 0.5) * 1000
+
+    @property
+    def fsync_p99(self):
+        return percentile(self.fsync_latencies, 0.99) * 1000
+
+    def check(self, max_fsync_p99):
+        if self.fsync_p99 > max_fsync_p99:
+            raise ValueError(
+                'Disk for {!r} is too slow: fsync p99 is {:.1f}ms (maximum '
+                'is {:.1f}ms). Please choose a faster disk for the buffer '
+                'or raise --max-fsync-p99'.format(
+                    self.path, self.fsync_p99, max_fsync_p99))
+
+    def as_text(self):
+        return '\n'.join([
+            'Disk benchmark for {!r} (buffer size: {})'.format(
+                self.path, self.buffer_size),
+            '  sequential write: {}/s'.format(
+                format_bytes(self.write_throughput)),
+            '  random rewrite + fsync: {:.0f} ops/s'.format(
+                len(self.fsync_latencies) / sum(self.fsync_latencies)),
+            '  fsync p50: {:.2f}ms'.format(self.fsync_p50),
+            '  fsync p99: {:.2f}ms'.format(self.fsync_p99)])
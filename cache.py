@@ -0,0 +1,67 @@
+'''Cluster topology cache.
+
+Caches the read-only information retrieved from a remote SiriDB cluster so
+repeated invocations against the same cluster and database can skip the
+discovery and topology queries. The cache is opt-in and entries expire after
+a configurable time-to-live. The pools are not cached since any host can
+add a pool to the cluster.
+'''
+
+import os
+import json
+import time
+import hashlib
+import logging
+
+
+class TopologyCache:
+
+    def __init__(self, path, ttl, seeds, dbname):
+        self.ttl = ttl
+        key = '{}/{}'.format(
+            ','.join(sorted('{}:{}'.format(*seed) for seed in seeds)),
+            dbname)
+        self.fn = os.path.join(
+            path,
+            '{}.json'.format(hashlib.sha1(key.encode('utf-8')).hexdigest()))
+
+    def get(self):
+        '''Returns the cached topology or None when missing or expired.'''
+        try:
+            with open(self.fn, 'r', encoding='utf-8') as f:
+                topology = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.warning('Cannot read cache file {!r}: {}'.format(
+                self.fn, e))
+            return None
+
+        age = time.time() - topology.pop('_cached_at', 0)
+        if not 0 <= age < self.ttl:
+            logging.debug('Cache file {!r} is expired'.format(self.fn))
+            return None
+
+        logging.info('Using cached topology ({:.0f} seconds old)'.format(age))
+        return topology
+
+    def set(self, topology):
+        topology = dict(topology, _cached_at=time.time())
+        tmp = '{}.{}.tmp'.format(self.fn, os.getpid())
+        try:
+            os.makedirs(os.path.dirname(self.fn), exist_ok=True)
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(topology, f)
+            os.replace(tmp, self.fn)
+        except Exception as e:
+            logging.warning('Cannot write cache file {!r}: {}'.format(
+                self.fn, e))
+
+    def invalidate(self):
+        try:
+            os.unlink(self.fn)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logging.warning('Cannot remove cache file {!r}: {}'.format(
+                self.fn, e))
@@ -0,0 +1,85 @@
+'''Pools and servers of a SiriDB cluster and the changes between updates.
+
+The first update is rendered as a table, following updates only render
+what has changed: the number of servers and series in each pool (with the
+series rate since the previous update) and the status of each server.
+'''
+
+import time
+
+
+class ClusterStatus:
+
+    def __init__(self):
+        self.pools = None
+        self.servers = None
+        self.at = None
+
+    @staticmethod
+    def table(pools, servers):
+        lines = ['{}{}{}'.format('pool'.ljust(10),
+                                 'servers'.ljust(10),
+                                 'series')]
+        for pool, (n, series) in sorted(pools.items()):
+            lines.append('{}{}{}'.format(str(pool).ljust(10),
+                                         str(n).ljust(10),
+                                         series))
+        lines.append('')
+        lines.append('{}{}'.format('server'.ljust(30), 'status'))
+        for name, status in sorted(servers.items()):
+            lines.append('{}{}'.format(name.ljust(30), status))
+        return lines
+
+    def update(self, pools, servers, at=None):
+        '''Update with the result of the pools and servers queries.
+
+        pools is a list with [pool, servers, series] and servers a list with
+        [name, status] items. Returns the lines to render.
+        '''
+        at = time.monotonic() if at is None else at
+        pools = {p[0]: (p[1], p[2]) for p in pools}
+        servers = {s[0]: s[1] for s in servers}
+
+        if self.pools is None:
+            lines = self.table(pools, servers)
+        else:
+            lines = self.changes(pools, servers, at - self.at)
+
+        self.pools, self.servers, self.at = pools, servers, at
+        return lines
+
+    def changes(self, pools, servers, elapsed):
+        prefix = time.strftime('%H:%M:%S')
+        lines = []
+        for pool, (n, series) in sorted(pools.items()):
+            if pool not in self.pools:
+                lines.append('{} pool {}: added ({} servers, {} series)'
+                             .format(prefix, pool, n, series))
+                continue
+            prev_n, prev_series = self.pools[pool]
+            if n != prev_n:
+                lines.append('{} pool {}: servers {} -> {}'.format(
+                    prefix, pool, prev_n, n))
+            if series != prev_series:
+                delta = series - prev_series
+                lines.append('{} pool {}: series {} -> {} ({:+d}, {:+.1f}/s)'
+                             .format(prefix,
+                                     pool,
+                                     prev_series,
+                                     series,
+                                     delta,
+                                     delta / elapsed if elapsed else 0.0))
+        for pool in sorted(set(self.pools) - set(pools)):
+            lines.append('{} pool {}: removed'.format(prefix, pool))
+
+        for name, status in sorted(servers.items()):
+            prev = self.servers.get(name)
+            if prev is None:
+                lines.append('{} server {!r}: added ({})'.format(
+                    prefix, name, status))
+            elif status != prev:
+                lines.append('{} server {!r}: status {} -> {}'.format(
+                    prefix, name, prev, status))
+        for name in sorted(set(self.servers) - set(servers)):
+            lines.append('{} server {!r}: removed'.format(prefix, name))
+        return lines
@@ -23,12 +23,41 @@ DBPROPS = [
     'dbname',
     'drop_threshold']
 
+FULL_AUTH = 'full'  # user access needed for joining a database
 DEFAULT_CLIENT_PORT = 9000
 DEFAULT_CONFIG_FILE = '/etc/siridb/siridb.conf'
+DEFAULT_CACHE_PATH = '/var/cache/siridb-manage'
 DEFAULT_TIMEZONE = 'NAIVE'
 DEFAULT_BUFFER_SIZE = 1024
 MAX_BUFFER_SIZE = 10485760  # 10MB (655295 points)
 DEFAULT_DROP_THRESHOLD = 1.0
+DEFAULT_LOAD_TIMEOUT = 30.0  # seconds to wait for a database to load
+LOAD_POLL_MIN_DELAY = 0.05
+LOAD_POLL_MAX_DELAY = 1.0
+DEFAULT_WAIT_RUNNING = 0.0  # seconds to wait for all servers to be running
+RUNNING_POLL_MIN_DELAY = 0.2
+RUNNING_POLL_MAX_DELAY = 2.0
+DEFAULT_STATUS_INTERVAL = 2.0  # seconds between status updates
+DEFAULT_REINDEX_TIMEOUT = 0.0  # seconds to watch a re-index, 0 = no limit
+REINDEX_STABLE_SAMPLES = 3  # samples without changes to call a re-index done
+REINDEX_STABLE_SHARE = 0.001  # change in the share of a pool seen as stable
+REINDEX_TARGET_MARGIN = 0.1  # part of its even share a new pool may miss
+DEFAULT_SEED_TIMEOUT = 2.0  # seconds to wait for a remote seed to answer
+DEFAULT_RESOLVE_TIMEOUT = 1.0  # seconds to wait for resolving a host name
+DEFAULT_RESOLVE_TTL = 60.0  # seconds to cache resolved host names
+DEFAULT_RETENTION = 90  # days, only used for planning shards
+DEFAULT_BENCH_SAMPLES = 200  # fsync samples for the disk benchmark
+DEFAULT_BENCH_BLOCKS = 1024  # blocks written by the disk benchmark
+DEFAULT_MAX_FSYNC_P99 = 50.0  # milliseconds
+DEFAULT_PREFLIGHT_TIMEOUT = 10.0  # seconds for each preflight check
+DEFAULT_MIN_DISK_FREE = 1024  # MB required by preflight
+DEFAULT_MIN_FREE_INODES = 10000  # inodes required by preflight
+DEFAULT_GC_WORKERS = 8  # threads removing files from the trash
+DEFAULT_RETRY_ATTEMPTS = 5  # attempts for a remote request
+DEFAULT_RETRY_DELAY = 0.2  # seconds to wait after the first failed attempt
+DEFAULT_RETRY_JITTER = 0.5  # random part of the delay between attempts
+DEFAULT_RETRY_DEADLINE = 60.0  # seconds for all attempts of a request
+RETRY_MAX_DELAY = 5.0  # maximum seconds between attempts
 
 # Database name:
 #    - minimum 2, maximum 20 chars
@@ -0,0 +1,112 @@
+'''Journal for joining a SiriDB cluster.
+
+Each completed step of a join is appended to a journal file in the database
+path, together with the checksums of the files written by the step. When a
+join with --resume fails the completed work is kept and a next run with
+--resume skips each step for which the files still match the journal. A
+join without --resume is rolled back on failure and moves the paths of an
+earlier run to the trash, so a plain retry starts over. The journal is
+removed from the database path when the server is registered.
+
+The journal is a file with one JSON object per line. Each line is flushed
+to disk before the next step starts (except for steps in a staging
+directory, which is flushed as a whole) and a partial last line from a
+crash while writing is ignored.
+'''
+
+import os
+import json
+import time
+import hashlib
+import logging
+
+JOURNAL_FILE = '.siridb-manage.journal'
+
+
+def sha256_file(fn):
+    '''Returns the sha256 hex digest for a file.'''
+    checksum = hashlib.sha256()
+    with open(fn, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            checksum.update(chunk)
+    return checksum.hexdigest()
+
+
+class Journal:
+
+    def __init__(self, dbpath):
+        self.dbpath = dbpath
+        self.fn = os.path.join(dbpath, JOURNAL_FILE)
+        self.steps = {}
+
+    @staticmethod
+    def exists(dbpath):
+        return os.path.isfile(os.path.join(dbpath, JOURNAL_FILE))
+
+    def read(self):
+        '''Read the completed steps, later entries replace earlier ones.'''
+        self.steps.clear()
+        try:
+            with open(self.fn, 'r', encoding='utf-8') as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            return
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                logging.debug('Ignore journal entry: {!r}'.format(line))
+                continue
+            self.steps[entry['step']] = entry
+
+    def move(self, dbpath):
+        '''Use the journal after the directory is moved to dbpath.'''
+        self.dbpath = dbpath
+        self.fn = os.path.join(dbpath, JOURNAL_FILE)
+
+    def remove(self):
+        '''Remove the journal, for example when the join is completed.'''
+        try:
+            os.unlink(self.fn)
+        except FileNotFoundError:
+            pass
+        self.steps.clear()
+
+    def record(self, step, files=None, sync=True, **info):
+        '''Append a completed step.
+
+        files is a dictionary with the file names and their sha256 digest
+        (or None to compute the digest) for the files written by the step.
+        Use sync=False when the directory is flushed to disk later on.
+        '''
+        files = {
+            fn: checksum or sha256_file(os.path.join(self.dbpath, fn))
+            for fn, checksum in (files or {}).items()}
+        entry = dict(info, step=step, files=files, at=time.time())
+        with open(self.fn, 'a', encoding='utf-8') as f:
+            f.write('{}\n'.format(json.dumps(entry)))
+            if sync:
+                f.flush()
+                os.fsync(f.fileno())
+        self.steps[step] = entry
+
+    def get(self, step):
+        '''Returns the entry for a completed step or None.'''
+        return self.steps.get(step)
+
+    def verify(self, step):
+        '''Returns True when step is completed and its files are unchanged.'''
+        entry = self.steps.get(step)
+        if entry is None:
+            return False
+        for fn, checksum in entry['files'].items():
+            try:
+                if sha256_file(os.path.join(self.dbpath, fn)) != checksum:
+                    logging.info('File {!r} has changed since {!r}'.format(
+                        fn, step))
+                    return False
+            except FileNotFoundError:
+                logging.info('File {!r} is missing since {!r}'.format(
+                    fn, step))
+                return False
+        return True
@@ -0,0 +1,2094 @@
+'''SiriDB manage, creating and joining databases.
+
+This module is imported by siridb-manage.py once a command needs it, so
+commands which do not talk to SiriDB do not pay for importing asyncio and
+the SiriDB connector.
+'''
+
+import sys
+import os
+import functools
+import asyncio
+import logging
+import getpass
+import uuid
+import qpack
+import time
+from settings import settings
+from timings import timings
+from metrics import metrics
+from transfer import fetch_files
+from journal import Journal
+from retry import RetryPolicy
+from clusterstatus import ClusterStatus
+from reindex import ReindexProgress
+from staging import staging_path
+from staging import new_staging
+from staging import commit
+from trash import TRASH_DIR
+from trash import move_to_trash
+from trash import trash_path
+from trash import spawn_sweep
+from cache import TopologyCache
+from resolver import resolve
+from resolver import ResolveCache
+import serversdat
+from advisor import BufferAdvice
+from advisor import ClusterAdvice
+from advisor import projected_series
+from advisor import ShardPlan
+from benchdisk import DiskBench
+from preflight import Preflight
+from preflight import check_path
+from preflight import check_disk_free
+from preflight import check_inodes
+from constants import DEFAULT_TIMEZONE
+from constants import DEFAULT_DROP_THRESHOLD
+from constants import DEFAULT_BUFFER_SIZE
+from constants import DURATIONS
+from constants import DBNAME_VALID_NAME
+from constants import MAX_BUFFER_SIZE
+from constants import DEFAULT_CONFIG
+from constants import DEFAULT_CLIENT_PORT
+from constants import FULL_AUTH
+from constants import DBPROPS
+from constants import MAX_NUMBER_DB
+from constants import DEFAULT_LOAD_TIMEOUT
+from constants import DEFAULT_SEED_TIMEOUT
+from constants import DEFAULT_RETENTION
+from constants import LOAD_POLL_MIN_DELAY
+from constants import LOAD_POLL_MAX_DELAY
+from constants import RUNNING_POLL_MIN_DELAY
+from constants import RUNNING_POLL_MAX_DELAY
+from version import __version__
+from version import __version_info__
+from siridb.connector import SiriDBProtocol
+from siridb.connector import async_server_info
+from siridb.connector.lib.connection import SiriDBAsyncConnection
+from siridb.connector.lib.protomap import CPROTO_REQ_LOADDB
+from siridb.connector.lib.protomap import CPROTO_REQ_REGISTER_SERVER
+from siridb.connector.lib.exceptions import QueryError
+from siridb.connector.lib.exceptions import AuthenticationError
+
+PROMPT = '> '
+siri = None
+siri_auth = None
+local_siridb_info = None
+remote_siridb_info = None
+
+
+def check_valid_dbname(dbname):
+    if not isinstance(dbname, str):
+        raise ValueError(
+            'Need a string value for dbname, got {}'.format(
+                type(dbname).__name__))
+    if not DBNAME_VALID_NAME.match(dbname):
+        raise ValueError(
+            'Database name should be 2 to 20 characters, stating with an '
+            'alphabetic and ending with an alphabetic or number character. '
+            'In the middle hyphens are allowed.')
+
+
+def mk_path(path):
+    if not os.path.exists(path):
+        os.makedirs(path)
+    elif os.listdir(path):
+        raise OSError('path is not empty: {}'.format(path))
+
+
+@timings.timed('create_database')
+def create_database(
+        dbname,
+        dbpath,
+        time_precision='ms',
+        duration_log='1d',
+        duration_num='1w',
+        timezone=DEFAULT_TIMEZONE,
+        drop_threshold=DEFAULT_DROP_THRESHOLD,
+        buffer_size=DEFAULT_BUFFER_SIZE,
+        config={},
+        _uuid=None,
+        _pool=0,
+        path=None):
+    '''
+    Note: duration_log and duration_num can both be integer or string.
+          get_duration() understands both.
+          The files are written to path, by default this is dbpath.
+    '''
+    check_valid_dbname(dbname)
+
+    if path is None:
+        path = dbpath
+
+    _config = {
+        'buffer_path': dbpath
+    }
+    _config.update(config)
+
+    if time_precision not in ['s', 'ms', 'us', 'ns']:
+        raise ValueError('time_precision must be either \'s\' (seconds), '
+                         '\'ms\' (milliseconds), \'us\' (microseconds) '
+                         'or \'ns\' (nanoseconds) but received {!r}'
+                         .format(time_precision))
+
+    time_precision = get_time_precision(time_precision)
+
+    duration_num = get_duration(time_precision, duration_num)
+    duration_log = get_duration(time_precision, duration_log)
+
+    if _uuid is None:
+        _uuid = uuid.uuid1()
+
+    with open(os.path.join(path, 'database.conf'),
+              'w',
+              encoding='utf-8') as f:
+        f.write(DEFAULT_CONFIG.format(
+            comment_buffer_path='# '
+            if _config['buffer_path'] == dbpath else '',
+                **_config))
+
+    db_obj = [
+        1,                                          # shema version
+        _uuid.bytes,                                # uuid
+        dbname,                                     # dbname
+        time_precision,                             # time precision
+        buffer_size,                                # buffer size
+        duration_num,                               # duration num
+        duration_log,                               # duration log
+        timezone,                                   # timezone
+        drop_threshold,                             # drop threshold
+    ]
+
+    with open(os.path.join(path, 'database.dat'), 'wb') as f:
+        f.write(qpack.packb(db_obj))
+
+
+def create_staged_database(dbpath, **kwargs):
+    '''Create a database in a staging directory and move it to dbpath.'''
+    staging = new_staging(dbpath)
+    create_database(dbpath=dbpath, path=staging, **kwargs)
+    commit(staging, dbpath)
+
+
+def color_red(s):
+    return '\x1b[31m{}\x1b[0m'.format(s)
+
+
+def color_yellow(s):
+    return '\x1b[33m{}\x1b[0m'.format(s)
+
+
+def color_purple(s):
+    return '\033[95m{}\x1b[0m'.format(s)
+
+
+def color_blue(s):
+    return '\033[94m{}\x1b[0m'.format(s)
+
+
+def print_header(title, desciption, has_default):
+    print('\n',
+          color_blue(title),
+          '(enter to use default)' if has_default else '')
+    if desciption:
+        print(desciption)
+
+
+def print_error(s):
+    print('\n', color_yellow(s), '\n')
+
+
+def print_action(action):
+    print(' {}'.format(color_yellow(action)))
+
+
+def get_input(default):
+    return input('[{}] {}'.format(color_red(default), PROMPT)
+                 if default is not None
+                 else PROMPT).strip()
+
+
+def get_pass(default):
+    return getpass.getpass('[{}] {}'.format(color_red(default), PROMPT)
+                           if default is not None
+                           else PROMPT).strip()
+
+
+class Options:
+
+    def __init__(self, options):
+        self.options = options
+
+    def get_options(self):
+        return [option['option'] for option in self.options]
+
+    def options_as_text(self):
+        return ' or '.join([s
+                            for s in [
+                                ', '.join(self.get_options()[:-1]),
+                                self.get_options()[-1]] if s])
+
+    def __getitem__(self, key):
+        return self.options[key]
+
+
+def not_empty(s):
+    if not s:
+        raise ValueError('Empty value is not allowed')
+
+
+def quit_manage(exit_code=0, msg='Exit manage SiriDB... bye!'):
+    timings.exit_code = exit_code
+    if siri:
+        logging.debug('Close siridb connection')
+        siri.close()
+
+    if exit_code:
+        logging.error(msg)
+    elif msg:
+        logging.info(msg)
+
+    sys.exit(exit_code)
+
+
+def menu(title, options, description='', default=None):
+    print_header(title, description, default is not None)
+    while True:
+        for option in options:
+            print(' [{}] - {}'.format(color_red(option['option']),
+                                      option['text']))
+
+        inp = get_input(default)
+        if not inp:
+            inp = default
+
+        if inp not in options.get_options():
+            print('\nInvalid option: {}, options are: {}'.format(
+                color_red(inp), options.options_as_text()))
+        else:
+            return inp
+
+
+def ask_string(title,
+               description='',
+               default=None,
+               func=lambda x: None,
+               is_password=False):
+    print_header(title, description, default is not None)
+    while True:
+        inp = get_pass(default) if is_password else get_input(default)
+        if not inp:
+            inp = default
+        try:
+            func(inp)
+        except Exception as e:
+            print('\n', e)
+        else:
+            return inp
+
+
+def ask_int(title, description='', default=None, func=lambda x: None):
+    print_header(title, description, default is not None)
+    while True:
+        inp = get_input(default)
+        if not inp:
+            inp = default
+        try:
+            inp = int(inp)
+        except ValueError:
+            print('\nExpecting an integer value but got {!r}'.format(inp))
+        else:
+            try:
+                func(inp)
+            except Exception as e:
+                print('\n', e)
+            else:
+                return inp
+
+
+def check_valid_buffer_size(i):
+    if i % 512 != 0:
+        raise ValueError('Please use a multiple of 512 as a buffer size, '
+                         'got {}'.format(i))
+    check_min_max(i, 512, MAX_BUFFER_SIZE)
+
+
+def check_min_max(i, mi, ma, s='a value'):
+    if i < mi or i > ma:
+        raise ValueError('Expecting {} between {} and {} but got {}'.format(
+            s, mi, ma, i))
+
+
+class SiriDBInfo():
+    def __init__(self, version, dblist):
+        self.version = version
+        self.dblist = dblist
+
+
+@timings.timed('local_info')
+async def set_local_siridb_info(host, port):
+    global local_siridb_info
+    try:
+        result = await async_server_info(host, port)
+    except Exception as e:
+        logging.error('Connection error: {}'.format(e))
+        sys.exit(1)
+    else:
+        if result:
+            local_siridb_info = SiriDBInfo(*result)
+
+
+def parse_seeds(seeds, default_port=DEFAULT_CLIENT_PORT):
+    '''Returns a list of (host, port) tuples from a comma separated string.
+
+    Each seed can be a host, host:port, [ipv6] or [ipv6]:port. A seed without
+    port uses the default port.
+    '''
+    result = []
+    for seed in seeds.split(','):
+        seed = seed.strip()
+        if not seed:
+            continue
+        if seed.startswith('['):
+            host, _, port = seed[1:].partition(']')
+            port = port.lstrip(':')
+        elif seed.count(':') == 1:
+            host, port = seed.split(':')
+        else:
+            host, port = seed, ''
+        try:
+            port = int(port) if port else default_port
+        except ValueError:
+            raise ValueError('Invalid port in remote address: {}'.format(seed))
+        check_min_max(port, 1, 65535, 'a port number')
+        result.append((host, port))
+
+    if not result:
+        raise ValueError('Empty value is not allowed')
+
+    return result
+
+
+@timings.timed('remote_discovery')
+async def set_remote_siridb_info(seeds,
+                                 timeout=DEFAULT_SEED_TIMEOUT,
+                                 local_ready=None,
+                                 resolve_cache=None,
+                                 check_version=True):
+    '''Race server info requests to all seeds and use the first healthy one.
+
+    A seed is healthy when it has at least one database and runs the same
+    version as the local SiriDB server. When the local info is retrieved
+    concurrently, local_ready should be the task retrieving it. Use
+    check_version=False when the local server is not used. Returns the
+    address and port of the chosen seed, host names are resolved so the
+    address can be used without resolving the name again.
+    '''
+    global remote_siridb_info
+
+    async def server_info(host, port):
+        addresses = await resolve(host,
+                                  port,
+                                  settings.ip_support,
+                                  timeout,
+                                  resolve_cache)
+        return addresses[0], await async_server_info(
+            addresses[0], port, timeout=timeout)
+
+    async def probe(host, port):
+        start = time.monotonic()
+        try:
+            # the connector only applies the timeout to the connect
+            with timings.phase('seed {}:{}'.format(host, port)):
+                address, result = await asyncio.wait_for(
+                    server_info(host, port),
+                    timeout)
+        except Exception as e:
+            logging.warning('Seed {}:{} failed after {:.1f}ms: {!r}'.format(
+                host, port, (time.monotonic() - start) * 1000, e))
+            raise
+        logging.info('Seed {}:{} answered in {:.1f}ms'.format(
+            host, port, (time.monotonic() - start) * 1000))
+        return host, address, port, result
+
+    errors = []
+    tasks = [asyncio.ensure_future(probe(*seed)) for seed in seeds]
+    try:
+        for future in asyncio.as_completed(tasks):
+            try:
+                host, address, port, result = await future
+            except Exception as e:
+                errors.append(repr(e))
+                continue
+
+            if not result:
+                errors.append('Error retreiving SiriDB info from {}:{}'
+                              .format(host, port))
+                continue
+
+            info = SiriDBInfo(*result)
+            if not info.dblist:
+                errors.append(
+                    'No databases found in {}:{}'.format(host, port))
+                continue
+
+            if local_ready is not None:
+                await local_ready
+
+            if check_version and local_siridb_info.version != info.version:
+                errors.append(
+                    'Local version ({}) not equal to remote version ({}) on '
+                    '{}:{}'.format(
+                        local_siridb_info.version, info.version, host, port))
+                continue
+
+            logging.info('Using seed {}:{}'.format(host, port))
+            remote_siridb_info = info
+            return address, port
+    finally:
+        # Slower seeds are not cancelled since that would leave their info
+        # request without an answer, but their results are no longer used.
+        for task in tasks:
+            task.add_done_callback(
+                lambda task: task.cancelled() or task.exception())
+
+    raise RuntimeError('No healthy seed found: {}'.format('; '.join(errors)))
+
+
+def check_dbname(s):
+    check_valid_dbname(s)
+    if s in local_siridb_info.dblist:
+        raise ValueError('Database {!r} already exists'.format(s))
+    if len(local_siridb_info.dblist) >= MAX_NUMBER_DB:
+        raise ValueError(
+            'Cannot create {!r} because the maximum number of '
+            'databases is reached. (max={})'.format(s, MAX_NUMBER_DB))
+
+
+@timings.timed('wait_loaded')
+async def wait_for_loaded(dbnames, timeout=DEFAULT_LOAD_TIMEOUT):
+    '''Poll the local server until all given databases are loaded.
+
+    Polling starts immediately since the load request is already answered
+    by the server, and backs off until the deadline is reached. Connection
+    errors are ignored while waiting because a busy server might not accept
+    new connections right away. Returns the time waited in seconds.
+    '''
+    global local_siridb_info
+    start = time.monotonic()
+    deadline = start + timeout
+    delay = LOAD_POLL_MIN_DELAY
+    while True:
+        timeout = max(deadline - time.monotonic(), LOAD_POLL_MIN_DELAY)
+        try:
+            # the connector only applies the timeout to the connect
+            result = await asyncio.wait_for(
+                async_server_info(
+                    settings.localhost,
+                    settings.listen_client_port,
+                    timeout=timeout),
+                timeout)
+        except Exception as e:
+            logging.debug('Waiting for database(s) to load: {!r}'.format(e))
+        else:
+            if result:
+                local_siridb_info = SiriDBInfo(*result)
+                if all(dbname in local_siridb_info.dblist
+                       for dbname in dbnames):
+                    return time.monotonic() - start
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(
+                'Timeout after {:.1f} seconds'.format(
+                    time.monotonic() - start))
+
+        # the last poll is done at the deadline
+        await asyncio.sleep(min(delay, remaining))
+        delay = min(delay * 2, LOAD_POLL_MAX_DELAY)
+
+
+async def check_loaded(dbname, timeout=DEFAULT_LOAD_TIMEOUT):
+    try:
+        elapsed = await wait_for_loaded([dbname], timeout)
+    except TimeoutError as e:
+        raise ValueError('Database {!r} is not loaded, please check the '
+                         'SiriDB logging to see what went wrong. (possible '
+                         'cause:  SiriDB has no access to the database '
+                         'folder) {}'.format(dbname, e))
+    logging.info('Database {!r} loaded in {:.3f} seconds'.format(
+        dbname, elapsed))
+
+
+class SiriDBLoadProtocol(SiriDBProtocol):
+
+    def connection_made(self, transport):
+
+        def finished(future):
+            pass
+
+        self.transport = transport
+        self.remote_ip, self.port = transport.get_extra_info('peername')[:2]
+
+        self.future = self.send_package(CPROTO_REQ_LOADDB,
+                                        data=self._dbname,
+                                        timeout=10)
+        self.future.add_done_callback(finished)
+
+
+@timings.timed('load_database')
+async def load_database(dbpath, host, port):
+    if dbpath[-1] != '/':
+        dbpath += '/'
+
+    loop = asyncio.get_event_loop()
+
+    client = loop.create_connection(
+        lambda: SiriDBLoadProtocol(None, None, dbpath),
+        host=host,
+        port=port)
+
+    transport, protocol = await asyncio.wait_for(client, timeout=10)
+
+    await protocol.future
+    transport.close()
+
+
+class SiriDBManageConnection(SiriDBAsyncConnection):
+
+    @timings.timed('register_server')
+    async def _register_server(self, server, timeout=30):
+        '''Register a new SiriDB Server.
+
+        Full access rights are required for this request.
+        '''
+        result = await self._protocol.send_package(
+            CPROTO_REQ_REGISTER_SERVER,
+            data=server,
+            timeout=timeout)
+        return result
+
+
+async def connect_other(dbname, host, port, username, password):
+    global siri, siri_auth
+    connection = SiriDBManageConnection()
+    await connection.connect(username, password, dbname, host, port)
+    siri = connection
+    siri_auth = (username, password, dbname, host, port)
+
+
+async def reconnect():
+    '''Connect again to the remote server if the connection is lost.'''
+    if siri is None or not siri.connected:
+        username, password, dbname, host, port = siri_auth
+        await connect_other(dbname, host, port, username, password)
+
+
+async def query_remote(query, retry):
+    '''Query the remote server, retried according to retry.'''
+    return await retry.call(
+        query,
+        lambda: siri.query(query),
+        fatal=(QueryError, AuthenticationError),
+        before_retry=reconnect)
+
+
+@timings.timed('wait_running')
+async def wait_for_running(timeout, retry=None):
+    '''Poll the remote cluster until all servers have status running.
+
+    With a timeout of 0 the status is checked once, otherwise polling backs
+    off until the deadline is reached and each change in the status of a
+    server is logged. Raises ValueError when not all servers are running.
+    '''
+    if retry is None:
+        retry = RetryPolicy()
+    expected = 'running'
+    start = time.monotonic()
+    deadline = start + timeout
+    delay = RUNNING_POLL_MIN_DELAY
+    status = {}
+    while True:
+        result = await query_remote('list servers name, status', retry)
+        other = []
+        for srv in result['servers']:
+            if timeout and status.get(srv[0]) != srv[1]:
+                logging.info('Server {!r} has status {!r} ({:.1f}s)'.format(
+                    srv[0], srv[1], time.monotonic() - start))
+            status[srv[0]] = srv[1]
+            if srv[1] != expected:
+                other.append(srv)
+
+        if not other:
+            return
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise ValueError(
+                'All servers must have status {!r} before we can continue. '
+                'Not running: {}'.format(expected, ', '.join(
+                    '{!r} ({})'.format(*srv) for srv in other)))
+
+        await asyncio.sleep(min(delay, remaining))
+        delay = min(delay * 2, RUNNING_POLL_MAX_DELAY)
+
+
+async def connect_to_siridb(dbname,
+                            address,
+                            port,
+                            username,
+                            password,
+                            topology=None):
+    '''Connect and check the version and user privileges.
+
+    The version and users are taken from topology when given, otherwise
+    they are queried. Returns the version and users query results.
+    '''
+    try:
+        with timings.phase('connect'):
+            await connect_other(dbname, address, port, username, password)
+    except Exception as e:
+        raise ConnectionError('Error while connecting: {}'.format(e))
+
+    if topology is not None:
+        result, users = topology['version'], topology['users']
+    else:
+        try:
+            with timings.phase('query_version_and_users'):
+                result, users = await asyncio.gather(
+                    siri.query('show version'),
+                    siri.query('list users name, access'))
+        except QueryError:
+            raise ConnectionError('User {!r} has no {!r} privileges'.format(
+                username, FULL_AUTH))
+
+    version = result['data'][0]['value']
+
+    if tuple(map(int, version.split('.')))[:2] != __version_info__[:2]:
+        raise ValueError('SiriDB Server is running version {}, '
+                         'we are using  {}'.format(version, __version__))
+
+    for user in users['users']:
+        if user[0] == username and user[1] != FULL_AUTH:
+            raise ConnectionError('User {!r} has no {!r} privileges'.format(
+                username, FULL_AUTH))
+
+    return result, users
+
+
+async def join_database():
+    other_address = None
+    other_port = DEFAULT_CLIENT_PORT
+    username = None
+    dbname = None
+    resolve_cache = ResolveCache()
+    server_name_ready = asyncio.ensure_future(
+        settings.resolve_server_name(resolve_cache))
+    while True:
+        other_address = ask_string(
+            title='Remote host or IP-address',
+            default=other_address,
+            func=parse_seeds,
+            description='If your database has already more than one server '
+            'you can just choose one, or enter a comma separated list of '
+            'servers and the fastest one will be used')
+
+        other_port = ask_int(
+            title='Remote client port',
+            default=other_port,
+            func=functools.partial(check_min_max, mi=1, ma=65535))
+
+        try:
+            remote_address, remote_port = await set_remote_siridb_info(
+                parse_seeds(other_address, other_port),
+                resolve_cache=resolve_cache)
+        except Exception as e:
+            print_error(e)
+            continue
+
+        db = menu(
+            title='Database',
+            options=Options([
+                {'option': str(i), 'text': s}
+                for i, s in enumerate(remote_siridb_info.dblist)]),
+            default='0')
+        dbname = remote_siridb_info.dblist[int(db)]
+
+        if dbname in local_siridb_info.dblist:
+            print_error('Database "{}" already exist on this server'.format(
+                dbname))
+            continue
+
+        username = ask_string(
+            title='User name',
+            default=username,
+            func=not_empty,
+            description='The given user name should have {!r} '
+            'privileges'.format(FULL_AUTH))
+
+        password = ask_string(
+            title='Password',
+            is_password=True)
+
+        try:
+            await connect_to_siridb(dbname,
+                                    remote_address,
+                                    remote_port,
+                                    username,
+                                    password)
+        except Exception as e:
+            print_error(e)
+        else:
+            break
+
+        print_action('Please verify your input and try again...')
+
+    try:
+        await server_name_ready
+    except ValueError as e:
+        quit_manage(1, e)
+
+    dbpath = os.path.join(settings.default_db_path, dbname)
+    mk_path(dbpath)
+    buffer_path = ask_buffer_path(dbpath)
+
+    while True:
+        try:
+            result = await siri.query('list pools pool, servers, series ')
+        except QueryError as e:
+            print_error(e)
+            answer = menu(
+                title='Do you want to retry?',
+                options=Options([
+                    {'option': 'r', 'text': 'Retry'},
+                    {'option': 'q', 'text': 'Quit'}]),
+                default='r')
+
+            if answer == 'r':
+                continue
+
+            quit_manage(1, e)
+        break
+
+    pools = sorted(result['pools'], key=lambda t: t[0])
+
+    await pool_or_replica(pools, dbpath, buffer_path)
+
+
+def show_pool_status(pools):
+    print(color_blue('{}{}{}'.format('pool'.ljust(10),
+                                     'servers'.ljust(10),
+                                     'series')))
+
+    for pool in pools:
+        print('{}{}{}'.format(str(pool[0]).ljust(10),
+                              str(pool[1]).ljust(10),
+                              str(pool[2])))
+
+    print()
+    print(ClusterAdvice(pools).as_text())
+
+
+async def create_joined_database(pools,
+                                 dbpath,
+                                 buffer_path,
+                                 pool,
+                                 new_pool,
+                                 action_str):
+    dbconfig = await siri.query('show {}'.format(','.join(DBPROPS)))
+    props = {prop['name']: prop['value'] for prop in dbconfig['data']}
+    cfg = {}
+
+    advice = BufferAdvice(
+        projected_series(pools, pool, new_pool),
+        buffer_path)
+    ask_buffer_size(cfg, advice)
+
+    cfg['buffer_path'] = buffer_path
+
+    dbname = props['dbname']
+
+    answer = menu(
+        title='Are you sure you want to continue and {}?'.format(action_str),
+        options=Options([
+            {'option': 'y', 'text': 'Yes, I\'m sure'},
+            {'option': 'n', 'text': 'No, go back'}]),
+        default='n')
+    if answer == 'n':
+        return None
+
+    try:
+        await wait_for_running(0)
+    except Exception as e:
+        quit_manage(1, e)
+
+    await create_and_register_server(dbname,
+                                     dbpath,
+                                     pool,
+                                     props,
+                                     cfg,
+                                     new_pool,
+                                     allow_retry=True)
+
+
+def get_time_precision(s):
+    _map = ['s', 'ms', 'us', 'ns']
+    return _map.index(s)
+
+
+def get_duration(tp, duration):
+    return duration if isinstance(duration, int) \
+        else DURATIONS[duration][0] * (1000**tp)
+
+
+async def create_and_register_server(dbname,
+                                     dbpath,
+                                     pool,
+                                     props,
+                                     cfg,
+                                     new_pool,
+                                     allow_retry=True,
+                                     load_timeout=DEFAULT_LOAD_TIMEOUT,
+                                     topology_cache=None,
+                                     keep_on_failure=False,
+                                     resume=False,
+                                     retry=None,
+                                     after_register=None):
+    if retry is None:
+        retry = RetryPolicy()
+
+    def count_register_retry():
+        metrics.register_retries += 1
+
+    # Files are written to a staging directory which replaces dbpath just
+    # before the database is loaded, unless an earlier run got that far.
+    staging = staging_path(dbpath)
+    if resume and Journal.exists(staging):
+        workdir = staging
+    elif resume and Journal.exists(dbpath):
+        workdir = dbpath
+    else:
+        workdir = new_staging(dbpath)
+
+    journal = Journal(workdir)
+    if resume:
+        journal.read()
+
+    def rollback(*args):
+        if keep_on_failure and journal.steps:
+            logging.warning(
+                'Keep {!r} with the completed steps, use --resume to '
+                'continue or run without --resume to start over'.format(
+                    journal.dbpath))
+            quit_manage(*args)
+        metrics.rollbacks += 1
+        logging.warning('Roll-back create database...')
+        # the trash is emptied in the background, a retry can start now
+        if os.path.exists(staging):
+            move_to_trash(staging, trash_path(dbpath))
+        spawn_sweep(move_to_trash(dbpath))
+        quit_manage(*args)
+
+    if journal.get('registered'):
+        journal.remove()
+        quit_manage(0, 'Database {!r} has already joined...'.format(dbname))
+
+    address = settings.server_address
+    port = settings.listen_backend_port
+    fns = ('servers.dat', 'users.dat', 'groups.dat')
+
+    config = journal.get('config')
+    if config is not None and config['pool'] != pool:
+        quit_manage(1, 'The journal in {!r} is for pool {}, not for pool {}'
+                       .format(dbpath, config['pool'], pool))
+
+    # Once loaded, the files belong to the SiriDB server
+    loaded = journal.get('loaded') is not None and \
+        dbname in local_siridb_info.dblist
+
+    if loaded or journal.verify('config'):
+        _uuid = uuid.UUID(config['uuid'])
+        logging.info('Resume with the existing database {!r}'.format(
+            props['dbname']))
+    else:
+        _uuid = uuid.uuid1()
+        create_database(
+            dbname=dbname,
+            dbpath=dbpath,
+            time_precision=props['time_precision'],
+            duration_log=props['duration_log'],
+            duration_num=props['duration_num'],
+            timezone=props['timezone'],
+            drop_threshold=props['drop_threshold'],
+            config=cfg,
+            _uuid=_uuid,
+            _pool=pool,
+            path=workdir)
+        journal.record('config',
+                       files={'database.conf': None, 'database.dat': None},
+                       sync=False,
+                       uuid=_uuid.hex,
+                       pool=pool)
+        logging.info('Added database {!r}'.format(props['dbname']))
+
+    server = [_uuid.bytes, bytes(address, 'utf-8'), port, pool]
+    servers_dat = loaded or (
+        journal.get('servers_dat') is not None and
+        journal.get('servers_dat')['uuid'] == _uuid.hex and
+        journal.verify('servers_dat'))
+
+    if not loaded:
+        fetch = [fn for fn in fns
+                 if not journal.verify('fetch {}'.format(fn)) and
+                 not (fn == 'servers.dat' and servers_dat)]
+        if len(fetch) < len(fns):
+            logging.info('Skip fetching verified file(s): {}'.format(
+                ', '.join(fn for fn in fns if fn not in fetch)))
+
+        def fetched(fn, size, checksum):
+            metrics.files[fn] = size
+            journal.record('fetch {}'.format(fn),
+                           files={fn: checksum},
+                           sync=False)
+
+        try:
+            await fetch_files(fetch,
+                              workdir,
+                              *siri_auth,
+                              fetched=fetched,
+                              retry=retry)
+        except Exception as e:
+            rollback(1, e)
+
+        if new_pool:
+            with open(os.path.join(workdir, '.reindex'), 'wb'):
+                pass
+
+        if not servers_dat:
+            try:
+                with timings.phase('update_servers_dat'):
+                    serversdat.set_server(
+                        os.path.join(workdir, 'servers.dat'), server)
+            except Exception as e:
+                rollback(1, 'Cannot add server to servers.dat: {}'.format(e))
+            journal.record('servers_dat',
+                           files={'servers.dat': None},
+                           sync=False,
+                           uuid=_uuid.hex)
+
+        if workdir == staging:
+            try:
+                with timings.phase('commit_staging'):
+                    commit(staging, dbpath)
+            except Exception as e:
+                rollback(1, 'Cannot move {!r} to {!r}: {}'.format(
+                    staging, dbpath, e))
+            journal.move(dbpath)
+
+        try:
+            await load_database(
+                dbpath,
+                settings.localhost,
+                settings.listen_client_port)
+            await check_loaded(dbname, load_timeout)
+        except Exception as e:
+            rollback(1, e)
+        journal.record('loaded')
+        logging.info('Database loaded... now register the server')
+    else:
+        logging.info('Database is loaded... now register the server')
+
+    async def is_registered():
+        result = await siri.query('list servers name, uuid')
+        return any(name == '{}:{}'.format(address, port) or
+                   server_uuid == str(_uuid)
+                   for name, server_uuid in result['servers'])
+
+    attempts = 0
+
+    async def register():
+        nonlocal attempts
+        attempts += 1
+        # An earlier attempt might have reached the cluster before it failed,
+        # registering twice fails while the server is already registered
+        if attempts > 1 and await is_registered():
+            logging.info('Server {}:{} is already registered'.format(
+                address, port))
+            return
+        await siri._register_server(server)
+
+    while True:
+        try:
+            await retry.call(
+                'register_server',
+                register,
+                fatal=(AuthenticationError,),
+                before_retry=reconnect,
+                on_retry=count_register_retry)
+        except Exception as e:
+            try:
+                await reconnect()
+                registered = await is_registered()
+            except Exception as exc:
+                logging.warning('Cannot check if the server is registered: '
+                                '{}'.format(exc))
+                registered = None
+            if registered:
+                logging.info('Server {}:{} is registered'.format(
+                    address, port))
+                break
+            if registered is None:
+                # Never remove a database which might be registered
+                quit_manage(1, 'Registration of {}:{} failed and it is '
+                               'unknown if it reached the cluster, check '
+                               'with \'list servers\' before using --resume '
+                               'or removing {!r}: {}'.format(address,
+                                                             port,
+                                                             dbpath,
+                                                             e))
+            if allow_retry:
+                print_error(e)
+                answer = menu(
+                    title='Do you want to retry the registration?',
+                    options=Options([
+                        {'option': 'r', 'text': 'Retry'},
+                        {'option': 'q', 'text': 'Quit'}]),
+                    default='r')
+                if answer == 'r':
+                    metrics.register_retries += 1
+                    continue
+                rollback(0, None)
+            else:
+                rollback(1, e)
+        break
+    journal.record('registered')
+    # The database now belongs to the cluster, a next run should not find
+    # the journal of this join
+    journal.remove()
+
+    if topology_cache is not None:
+        # The cluster has a new server so the cached topology is outdated
+        topology_cache.invalidate()
+
+    if metrics.enabled:
+        try:
+            result = await siri.query('list pools pool, servers, series')
+        except Exception as e:
+            logging.warning('Cannot read the pools for metrics: {}'.format(e))
+        else:
+            metrics.pools = result['pools']
+
+    if after_register is not None:
+        logging.info('Finished joining database {!r}...'.format(dbname))
+        try:
+            await after_register()
+        except Exception as e:
+            quit_manage(1, e)
+        quit_manage(0, None)
+
+    quit_manage(0, 'Finished joining database {!r}...'.format(dbname))
+
+
+async def create_new_pool(pools, dbpath, buffer_path):
+    pool = len(pools)
+    await create_joined_database(pools,
+                                 dbpath,
+                                 buffer_path,
+                                 pool,
+                                 True,
+                                 'create a new pool: {}'.format(pool))
+
+
+async def create_new_replica(pools, dbpath, buffer_path):
+    opts = [{
+        'option': str(pool[0]),
+        'text': 'Pool ID {}'.format(pool[0])
+    } for pool in pools if pool[1] == 1]
+    advice = ClusterAdvice(pools)
+
+    pool = menu(
+        title='For which pool do you want to create a replica?',
+        description=None
+        if opts
+        else '(All available pools already have a replica)',
+        options=Options(opts + [{'option': 'b', 'text': 'Back'}]),
+        default=None
+        if advice.replica_pool is None
+        else str(advice.replica_pool)
+    )
+    if pool == 'b':
+        return None
+    pool = int(pool)
+
+    await create_joined_database(pools,
+                                 dbpath,
+                                 buffer_path,
+                                 pool,
+                                 False,
+                                 'create a replica for pool {}'.format(pool))
+
+
+async def pool_or_replica(pools, dbpath, buffer_path):
+    advice = ClusterAdvice(pools)
+    while True:
+        action = menu(
+            title='New pool or extend and existing pool (replica)?',
+            description='Recommended: {}'.format(
+                'create a new pool'
+                if advice.recommended == 'pool'
+                else 'create a replica for pool {}'.format(
+                    advice.replica_pool)),
+            options=Options([
+                {'option': 'p',
+                 'text': 'Create a new pool'},
+                {'option': 'r',
+                 'text': 'Create a replica for an existing pool'},
+                {'option': 's',
+                 'text': 'Show current pools'},
+                {'option': 'q',
+                 'text': 'quit'}]),
+            default=advice.recommended[0])
+        result = {
+            'q': quit_manage,
+            'p': lambda: create_new_pool(pools, dbpath, buffer_path),
+            'r': lambda: create_new_replica(pools, dbpath, buffer_path),
+            's': lambda: show_pool_status(pools)
+        }[action]()
+        if asyncio.iscoroutine(result):
+            await result
+
+
+def ask_buffer_path(dbpath):
+    return ask_string(
+        title='Location to store the buffer file',
+        description='It can be useful to store the buffer file on a separate '
+        '(fast) disk, for example a Solid State Drive (SSD).',
+        default=dbpath,
+        func=mk_path)
+
+
+def ask_buffer_size(cfg, advice=None):
+    def check(i):
+        check_valid_buffer_size(i)
+        if advice is not None:
+            warning = advice.check(i)
+            if warning:
+                print_error(warning)
+
+    cfg['buffer_size'] = ask_int(
+        title='Buffer size',
+        description=None if advice is None else advice.as_text(),
+        default=DEFAULT_BUFFER_SIZE if advice is None else advice.recommended,
+        func=check)
+
+
+def ask_shard_plan(time_precision):
+    series = ask_int(
+        title='Expected number of series',
+        description='Used to recommend the sharding durations, use 0 to '
+        'skip the recommendation',
+        default=0,
+        func=lambda i: check_min_max(i, 0, 2 ** 32))
+    if not series:
+        return None
+
+    points_per_second = ask_int(
+        title='Expected number of points per second for all series',
+        func=lambda i: check_min_max(i, 1, 2 ** 32))
+
+    log_percentage = ask_int(
+        title='Percentage of the points which are log (string) values',
+        default=0,
+        func=lambda i: check_min_max(i, 0, 100, 'a percentage'))
+
+    retention = ask_int(
+        title='Number of days you want to keep points',
+        default=DEFAULT_RETENTION,
+        func=lambda i: check_min_max(i, 1, 36500))
+
+    plan = ShardPlan(series,
+                     points_per_second,
+                     log_percentage / 100,
+                     time_precision,
+                     retention * 86400,
+                     settings.max_open_files)
+    print('\n{}'.format(plan.as_text()))
+    return plan
+
+
+async def form_create_new_database():
+    dbname = ask_string(
+        title='Type a name for the new database',
+        description='Note: this value cannot be changed after the database '
+        'has been created',
+        func=check_dbname)
+
+    dbpath = os.path.join(settings.default_db_path, dbname)
+    try:
+        mk_path(dbpath)
+    except Exception as e:
+        quit_manage(1, e)
+
+    buffer_path = ask_buffer_path(dbpath)
+
+    time_precision = menu(
+        title='Time precision',
+        options=Options([
+            {'option': 's', 'text': 'seconds'},
+            {'option': 'ms', 'text': 'milliseconds'},
+            {'option': 'us', 'text': 'microseconds'},
+            {'option': 'ns', 'text': 'nanoseconds'}
+        ]),
+        default='ms')
+
+    plan = ask_shard_plan(time_precision)
+
+    duration_options = [
+        {'option': k, 'text': v[1]} for k, v in DURATIONS.items()]
+
+    duration_num = menu(
+        title='Number (float and integer) sharding duration',
+        options=Options(duration_options),
+        default='1w' if plan is None else plan.duration_num)
+
+    duration_log = menu(
+        title='Log (string) sharding duration',
+        options=Options(duration_options),
+        default='1d' if plan is None else plan.duration_log)
+
+    if plan is not None:
+        warning = plan.check_open_files(duration_num, duration_log)
+        if warning:
+            print_error(warning)
+
+    cfg = {'buffer_path': buffer_path}
+
+    ask_buffer_size(cfg)
+
+    await create_new_database(dbname,
+                              dbpath,
+                              time_precision,
+                              duration_log,
+                              duration_num,
+                              cfg.pop('buffer_size'),
+                              cfg)
+
+
+async def create_new_database(dbname,
+                              dbpath,
+                              time_precision,
+                              duration_log,
+                              duration_num,
+                              buffer_size,
+                              cfg,
+                              load_timeout=DEFAULT_LOAD_TIMEOUT):
+    create_staged_database(
+        dbname=dbname,
+        dbpath=dbpath,
+        time_precision=time_precision,
+        duration_log=duration_log,
+        duration_num=duration_num,
+        buffer_size=buffer_size,
+        config=cfg)
+    logging.info('Created database {!r}'.format(dbname))
+
+    try:
+        await load_database(
+            dbpath,
+            settings.localhost,
+            settings.listen_client_port)
+        await check_loaded(dbname, load_timeout)
+    except Exception as e:
+        quit_manage(1, e)
+    else:
+        quit_manage(0, 'Database "{}" created succesfully'.format(dbname))
+
+
+async def main_menu():
+    choice = menu(
+        title='Tell me what you plan to do:',
+        options=Options([
+            {'option': 'c', 'text': 'create a new database'},
+            {'option': 'j', 'text': 'join an existing SiriDB database'},
+            {'option': 'q', 'text': 'quit'}
+        ]))
+
+    await {
+        'q': quit_manage,
+        'j': join_database,
+        'c': form_create_new_database
+    }[choice]()
+
+
+def signal_handler(s, f):
+    quit_manage(2, '\nyou pressed ctrl+c, quiting...\n')
+
+
+@timings.timed('bench_disk')
+async def bench_buffer_disk(buffer_path, buffer_size, max_fsync_p99):
+    '''Benchmark the buffer path, raises ValueError when it is too slow.'''
+    bench = DiskBench(buffer_path, buffer_size)
+    await asyncio.get_event_loop().run_in_executor(None, bench.run)
+    logging.info(bench.as_text())
+    bench.check(max_fsync_p99)
+
+
+async def parse_bench_disk(args):
+    try:
+        check_valid_buffer_size(args.buffer_size)
+        bench = DiskBench(args.path or settings.default_db_path,
+                          args.buffer_size,
+                          samples=args.samples)
+        await asyncio.get_event_loop().run_in_executor(None, bench.run)
+    except Exception as e:
+        quit_manage(1, e)
+
+    print(bench.as_text())
+    try:
+        bench.check(args.max_fsync_p99)
+    except ValueError as e:
+        quit_manage(1, e)
+
+
+async def parse_create_new(args):
+    try:
+        check_dbname(args.dbname)
+        check_valid_buffer_size(args.buffer_size)
+
+        dbpath = os.path.join(settings.default_db_path, args.dbname)
+        buffer_path = args.buffer_path or dbpath
+
+        if args.bench_disk:
+            await bench_buffer_disk(buffer_path,
+                                    args.buffer_size,
+                                    args.max_fsync_p99)
+
+        mk_path(dbpath)
+        mk_path(buffer_path)
+
+    except Exception as e:
+        quit_manage(1, e)
+
+    cfg = {'buffer_path': buffer_path}
+
+    await create_new_database(args.dbname,
+                              dbpath,
+                              args.time_precision,
+                              args.duration_log,
+                              args.duration_num,
+                              args.buffer_size,
+                              cfg,
+                              args.load_timeout)
+
+
+MANIFEST_DEFAULTS = {
+    'time_precision': 'ms',
+    'duration_num': '1w',
+    'duration_log': '1d',
+    'buffer_size': DEFAULT_BUFFER_SIZE,
+    'buffer_path': ''
+}
+
+MANIFEST_TYPES = {
+    'dbname': str,
+    'time_precision': str,
+    'duration_num': str,
+    'duration_log': str,
+    'buffer_size': int,
+    'buffer_path': str
+}
+
+
+def read_manifest(fn):
+    with open(fn, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    if os.path.splitext(fn)[1].lower() in ('.yml', '.yaml'):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError(
+                'Reading a YAML manifest requires PyYAML, please install '
+                'PyYAML or use a JSON manifest')
+        manifest = yaml.safe_load(content)
+    else:
+        import json
+        manifest = json.loads(content)
+
+    if isinstance(manifest, dict):
+        manifest = manifest.get('databases')
+
+    if not isinstance(manifest, list) or not manifest:
+        raise ValueError(
+            'Manifest {!r} should contain a non empty list of databases'
+            .format(fn))
+
+    databases = []
+    for db in manifest:
+        if not isinstance(db, dict) or 'dbname' not in db:
+            raise ValueError(
+                'Each database in manifest {!r} needs at least a dbname, '
+                'got: {!r}'.format(fn, db))
+        unknown = set(db) - set(MANIFEST_DEFAULTS) - {'dbname'}
+        if unknown:
+            raise ValueError('Unknown key(s) for database {!r}: {}'.format(
+                db['dbname'], ', '.join(sorted(unknown))))
+        database = dict(MANIFEST_DEFAULTS)
+        database.update(db)
+        for key, tp in MANIFEST_TYPES.items():
+            # bool is a subclass of int but not a valid buffer_size
+            if not isinstance(database[key], tp) or \
+                    isinstance(database[key], bool):
+                raise ValueError(
+                    'Invalid {} for database {!r}: expecting {}, got {!r}'
+                    .format(key, db['dbname'], tp.__name__, database[key]))
+        databases.append(database)
+
+    return databases
+
+
+def check_manifest(databases):
+    '''Validate all databases against the cached local SiriDB info.
+
+    Nothing is written to disk until every database in the manifest is
+    valid, so a typo in the last entry does not leave half a batch behind.
+    '''
+    dbnames = [db['dbname'] for db in databases]
+    for dbname in dbnames:
+        if dbnames.count(dbname) > 1:
+            raise ValueError(
+                'Database {!r} is listed more than once'.format(dbname))
+
+    total = len(local_siridb_info.dblist) + len(databases)
+    if total > MAX_NUMBER_DB:
+        raise ValueError(
+            'Cannot create {} database(s) because the maximum number of '
+            'databases would be exceeded. (max={}, existing={})'.format(
+                len(databases), MAX_NUMBER_DB, len(local_siridb_info.dblist)))
+
+    for db in databases:
+        check_dbname(db['dbname'])
+        if db['time_precision'] not in ('s', 'ms', 'us', 'ns'):
+            raise ValueError(
+                'Invalid time_precision for database {!r}: {!r}'.format(
+                    db['dbname'], db['time_precision']))
+        for key in ('duration_num', 'duration_log'):
+            if db[key] not in DURATIONS:
+                raise ValueError(
+                    'Invalid {} for database {!r}: {!r} (choose from {})'
+                    .format(key, db['dbname'], db[key],
+                            ', '.join(DURATIONS.keys())))
+        check_valid_buffer_size(db['buffer_size'])
+
+        db['dbpath'] = os.path.join(settings.default_db_path, db['dbname'])
+        db['buffer_path'] = db['buffer_path'] or db['dbpath']
+        for path in (db['dbpath'], db['buffer_path']):
+            if os.path.exists(path) and os.listdir(path):
+                raise OSError('path is not empty: {}'.format(path))
+
+    # All paths are still empty, two databases sharing a buffer path would
+    # only show up once SiriDB writes the buffer files
+    dbpaths = {os.path.abspath(db['dbpath']): db['dbname'] for db in databases}
+    buffer_paths = {}
+    for db in databases:
+        buffer_path = os.path.abspath(db['buffer_path'])
+        other = dbpaths.get(buffer_path, db['dbname'])
+        if other != db['dbname']:
+            raise ValueError(
+                'The buffer_path of database {!r} is the database path of '
+                '{!r}: {}'.format(db['dbname'], other, buffer_path))
+        other = buffer_paths.setdefault(buffer_path, db['dbname'])
+        if other != db['dbname']:
+            raise ValueError(
+                'Databases {!r} and {!r} use the same buffer_path: {}'.format(
+                    other, db['dbname'], buffer_path))
+
+
+async def create_many_databases(databases, load_timeout):
+    loop = asyncio.get_event_loop()
+
+    await asyncio.gather(*[loop.run_in_executor(None, functools.partial(
+        create_staged_database,
+        dbname=db['dbname'],
+        dbpath=db['dbpath'],
+        time_precision=db['time_precision'],
+        duration_log=db['duration_log'],
+        duration_num=db['duration_num'],
+        buffer_size=db['buffer_size'],
+        config={'buffer_path': db['buffer_path']})) for db in databases])
+
+    for db in databases:
+        logging.info('Created database {!r}'.format(db['dbname']))
+
+    results = await asyncio.gather(*[load_database(
+        db['dbpath'],
+        settings.localhost,
+        settings.listen_client_port) for db in databases],
+        return_exceptions=True)
+
+    loading = []
+    for db, result in zip(databases, results):
+        if isinstance(result, Exception):
+            logging.error('Error loading database {!r}: {}'.format(
+                db['dbname'], result))
+        else:
+            loading.append(db['dbname'])
+
+    if loading:
+        try:
+            elapsed = await wait_for_loaded(loading, load_timeout)
+        except TimeoutError as e:
+            logging.error('Waiting for database(s) to load: {}'.format(e))
+        else:
+            logging.info('Database(s) loaded in {:.3f} seconds'.format(
+                elapsed))
+
+
+async def parse_create_many(args):
+    try:
+        databases = read_manifest(args.manifest)
+        check_manifest(databases)
+        for db in databases:
+            mk_path(db['dbpath'])
+            mk_path(db['buffer_path'])
+    except Exception as e:
+        quit_manage(1, e)
+
+    await create_many_databases(databases, args.load_timeout)
+
+    failed = [db['dbname'] for db in databases
+              if db['dbname'] not in local_siridb_info.dblist]
+
+    if failed:
+        quit_manage(1, 'Database(s) not loaded: {}, please check the SiriDB '
+                       'logging to see what went wrong.'.format(
+                           ', '.join(failed)))
+
+    quit_manage(0, 'Databases created succesfully: {}'.format(
+        ', '.join(db['dbname'] for db in databases)))
+
+
+def check_replica_pool(pools, pool):
+    '''Raises ValueError when a replica cannot be created for pool.'''
+    pools = {p[0]: p[1] for p in pools}
+    if pool not in pools:
+        raise ValueError('Pool ID {} does not exists'.format(pool))
+    if pools[pool] != 1:
+        raise ValueError('A pool can only have two servers. '
+                         'Pool ID {} already has {} servers.'
+                         .format(pool, pools[pool]))
+
+
+def discard_earlier_run(dbname, dbpath):
+    '''Move the paths of a failed run to the trash to start over.
+
+    Raises ValueError when the local SiriDB server has loaded the database,
+    the files then belong to the server.
+    '''
+    if dbname in local_siridb_info.dblist:
+        raise ValueError(
+            'Database {!r} is loaded by the local SiriDB server and cannot '
+            'be discarded, use --resume to continue'.format(dbname))
+
+    staging = staging_path(dbpath)
+    trash = None
+    for path in (staging, dbpath):
+        if Journal.exists(path):
+            logging.warning('Discard the earlier run in {!r}'.format(path))
+            trash = move_to_trash(path, trash_path(dbpath))
+    if trash is not None:
+        spawn_sweep(trash)
+
+
+async def parse_create_replica_or_pool(args):
+    if not args.password:
+        password = ask_string(
+            title='Password',
+            is_password=True)
+    else:
+        password = args.password
+
+    global remote_siridb_info
+    topology_cache = topology = None
+    bench = None
+
+    try:
+        dbpath = os.path.join(settings.default_db_path, args.dbname)
+        buffer_path = args.buffer_path or dbpath
+        retry = RetryPolicy(args.retry_attempts,
+                            args.retry_delay,
+                            args.retry_jitter,
+                            args.retry_deadline)
+
+        journal_path = dbpath if Journal.exists(dbpath) else \
+            staging_path(dbpath)
+        resume = Journal.exists(journal_path)
+        if args.resume and args.discard:
+            raise ValueError('Use either --resume or --discard, not both')
+        # Without --resume a run starts over, so automation can retry a
+        # failed run without flags
+        discard = resume and not args.resume
+        if discard:
+            resume = False
+        if resume:
+            logging.info('Resume the earlier run in {!r}'.format(
+                journal_path))
+
+        if args.bench_disk:
+            # The disk benchmark runs while we talk to the remote cluster
+            bench = asyncio.ensure_future(bench_buffer_disk(
+                buffer_path,
+                args.buffer_size,
+                args.max_fsync_p99))
+
+        seeds = parse_seeds(args.remote_address, args.remote_port)
+
+        # The server name is only used when registering this server but
+        # should be valid before anything is created.
+        resolve_cache = ResolveCache(args.cache_path)
+        server_name_ready = asyncio.ensure_future(
+            settings.resolve_server_name(resolve_cache))
+
+        if args.cache_ttl > 0:
+            topology_cache = TopologyCache(
+                args.cache_path, args.cache_ttl, seeds, args.dbname)
+            topology = topology_cache.get()
+
+        # Discovery of the remote seeds does not need to wait for the local
+        # server info until a seed answers.
+        local_ready = asyncio.ensure_future(check_local_siridb())
+        if topology is None:
+            remote_address, remote_port = await set_remote_siridb_info(
+                seeds,
+                args.seed_timeout,
+                local_ready,
+                resolve_cache)
+        else:
+            remote_address, remote_port = topology['seed']
+            remote_siridb_info = SiriDBInfo(*topology['info'])
+
+        _, _, (version, users) = await asyncio.gather(
+            local_ready,
+            server_name_ready,
+            connect_to_siridb(args.dbname,
+                              remote_address,
+                              remote_port,
+                              args.user,
+                              password,
+                              topology))
+
+        if local_siridb_info.version != remote_siridb_info.version:
+            raise RuntimeError(
+                'Local version ({}) not equal to remote version ({})'.format(
+                    local_siridb_info.version, remote_siridb_info.version))
+
+        if discard:
+            discard_earlier_run(args.dbname, dbpath)
+
+        if resume:
+            # the database might be loaded by an earlier run
+            check_valid_dbname(args.dbname)
+        else:
+            check_dbname(args.dbname)
+        check_valid_buffer_size(args.buffer_size)
+
+        # Runs while the topology is read and the buffer is checked, the
+        # local database is only created when all servers are running
+        running = asyncio.ensure_future(
+            wait_for_running(args.wait_running, retry))
+
+        # The pools are never cached, another host can add a pool while
+        # only the cache on this host is invalidated when we join
+        pools_ready = query_remote('list pools pool, servers, series', retry)
+        if topology is None:
+            with timings.phase('query_topology'):
+                result, dbconfig = await asyncio.gather(
+                    pools_ready,
+                    query_remote('show {}'.format(','.join(DBPROPS)), retry))
+            if topology_cache is not None:
+                topology_cache.set({
+                    'seed': [remote_address, remote_port],
+                    'info': [remote_siridb_info.version,
+                             remote_siridb_info.dblist],
+                    'version': version,
+                    'users': users,
+                    'props': dbconfig})
+        else:
+            with timings.phase('query_pools'):
+                result = await pools_ready
+            dbconfig = topology['props']
+
+        if hasattr(args, 'pool'):
+            check_replica_pool(result['pools'], args.pool)
+            pool = args.pool
+
+        else:
+            pool = len(result['pools'])
+
+        cluster_advice = ClusterAdvice(result['pools'])
+        logging.debug(cluster_advice.as_text())
+        if hasattr(args, 'pool') and \
+                cluster_advice.recommended == 'pool':
+            logging.info('Advice is to create a new pool instead: {}'
+                         .format(cluster_advice.reason))
+        elif not hasattr(args, 'pool') and \
+                cluster_advice.recommended == 'replica':
+            logging.info('Advice is to create a replica for pool {} '
+                         'instead: {}'.format(cluster_advice.replica_pool,
+                                              cluster_advice.reason))
+
+        advice = BufferAdvice(
+            projected_series(result['pools'], pool, not hasattr(args, 'pool')),
+            buffer_path)
+        logging.debug(advice.as_text())
+        warning = advice.check(args.buffer_size)
+        if warning:
+            logging.warning(warning)
+
+        if bench is not None:
+            await bench
+
+        await running
+
+        if not resume:
+            mk_path(dbpath)
+            mk_path(buffer_path)
+    except Exception as e:
+        quit_manage(1, e)
+
+    props = {prop['name']: prop['value'] for prop in dbconfig['data']}
+    cfg = {
+        'buffer_path': buffer_path,
+        'buffer_size': args.buffer_size,
+    }
+
+    if getattr(args, 'watch_reindex', False):
+        # Only create-pool starts a re-index
+        async def after_register():
+            await watch_reindex(args.interval,
+                                args.reindex_timeout,
+                                retry,
+                                pool)
+    else:
+        after_register = None
+
+    await create_and_register_server(args.dbname,
+                                     dbpath,
+                                     pool,
+                                     props,
+                                     cfg,
+                                     new_pool=not hasattr(args, 'pool'),
+                                     allow_retry=False,
+                                     load_timeout=args.load_timeout,
+                                     topology_cache=topology_cache,
+                                     keep_on_failure=args.resume,
+                                     resume=resume,
+                                     retry=retry,
+                                     after_register=after_register)
+
+
+async def parse_preflight(args):
+    '''Run the checks for create-replica or create-pool concurrently.
+
+    Nothing is created and the remote cluster is not changed. The report is
+    written as JSON to stdout, the exit code is 0 when all checks passed.
+    '''
+    if not args.password:
+        password = ask_string(
+            title='Password',
+            is_password=True)
+    else:
+        password = args.password
+
+    dbpath = os.path.join(settings.default_db_path, args.dbname)
+    buffer_path = args.buffer_path or dbpath
+    resolve_cache = ResolveCache(args.cache_path)
+    preflight = Preflight(args.timeout)
+
+    async def local_server():
+        global local_siridb_info
+        result = await async_server_info(
+            settings.localhost,
+            settings.listen_client_port,
+            timeout=args.timeout)
+        if not result:
+            raise ConnectionError(
+                'Unable to get local SiriDB info from {}:{}'.format(
+                    settings.localhost, settings.listen_client_port))
+        local_siridb_info = SiriDBInfo(*result)
+        check_local_version()
+        return {'version': local_siridb_info.version}
+
+    async def dbname():
+        await preflight.depends('local_server')
+        check_dbname(args.dbname)
+
+    async def buffer_size():
+        check_valid_buffer_size(args.buffer_size)
+
+    async def remote_seed():
+        await preflight.depends('local_server')
+        address, port = await set_remote_siridb_info(
+            parse_seeds(args.remote_address, args.remote_port),
+            args.seed_timeout,
+            resolve_cache=resolve_cache)
+        if args.dbname not in remote_siridb_info.dblist:
+            raise ValueError('Database {!r} not found on {}:{}'.format(
+                args.dbname, address, port))
+        return {'address': address,
+                'port': port,
+                'version': remote_siridb_info.version}
+
+    async def remote_access():
+        seed = await preflight.depends('remote_seed')
+        result, _ = await connect_to_siridb(args.dbname,
+                                            seed['address'],
+                                            seed['port'],
+                                            args.user,
+                                            password)
+        return {'version': result['data'][0]['value']}
+
+    async def servers_running():
+        await preflight.depends('remote_access')
+        result = await siri.query('list servers name, status')
+        expected = 'running'
+        other = ['{} ({})'.format(*srv) for srv in result['servers']
+                 if srv[1] != expected]
+        if other:
+            raise ValueError('All servers must have status {!r}, not '
+                             'running: {}'.format(expected, ', '.join(other)))
+        return {'servers': len(result['servers'])}
+
+    async def pool():
+        await preflight.depends('remote_access')
+        await preflight.depends('buffer_size')
+        result = await siri.query('list pools pool, servers, series')
+        new_pool = args.pool is None
+        if new_pool:
+            pool_id = len(result['pools'])
+        else:
+            check_replica_pool(result['pools'], args.pool)
+            pool_id = args.pool
+
+        advice = BufferAdvice(
+            projected_series(result['pools'], pool_id, new_pool),
+            buffer_path)
+        return {'pool': pool_id,
+                'new_pool': new_pool,
+                'warning': advice.check(args.buffer_size)}
+
+    preflight.add('local_server', local_server())
+    preflight.add('dbname', dbname())
+    preflight.add('buffer_size', buffer_size())
+    preflight.add('server_name',
+                  settings.resolve_server_name(resolve_cache))
+    preflight.add('remote_seed', remote_seed())
+    preflight.add('remote_access', remote_access())
+    preflight.add('servers_running', servers_running())
+    preflight.add('pool', pool())
+
+    paths = [('db_path', dbpath)]
+    if buffer_path != dbpath:
+        paths.append(('buffer_path', buffer_path))
+    for name, path in paths:
+        preflight.add_blocking(name, check_path, path)
+        preflight.add_blocking('{}_disk_free'.format(name),
+                               check_disk_free,
+                               path,
+                               args.min_disk_free)
+        preflight.add_blocking('{}_inodes'.format(name),
+                               check_inodes,
+                               path,
+                               args.min_free_inodes)
+
+    passed = await preflight.run()
+    print(preflight.as_json())
+
+    if not passed:
+        quit_manage(1, 'Preflight failed: {}'.format(
+            ', '.join(preflight.failed)))
+    quit_manage(0, 'Preflight passed')
+
+
+async def parse_status(args):
+    '''Show the pools and servers of a cluster.
+
+    With --watch a single connection is kept open and only the changes are
+    shown at each interval, until ctrl+c is pressed.
+    '''
+    if not args.password:
+        password = ask_string(
+            title='Password',
+            is_password=True)
+    else:
+        password = args.password
+
+    try:
+        address, port = await set_remote_siridb_info(
+            parse_seeds(args.remote_address, args.remote_port),
+            args.seed_timeout,
+            check_version=False)
+        await connect_other(args.dbname, address, port, args.user, password)
+    except Exception as e:
+        quit_manage(1, e)
+
+    retry = RetryPolicy()
+    status = ClusterStatus()
+    while True:
+        start = time.monotonic()
+        try:
+            pools, servers = await asyncio.gather(
+                query_remote('list pools pool, servers, series', retry),
+                query_remote('list servers name, status', retry))
+        except Exception as e:
+            quit_manage(1, e)
+
+        for line in status.update(pools['pools'], servers['servers'], start):
+            print(line)
+
+        if not args.watch:
+            quit_manage(0, None)
+
+        sys.stdout.flush()
+        await asyncio.sleep(
+            max(args.interval - (time.monotonic() - start), 0))
+
+
+async def watch_reindex(interval, timeout, retry=None, pool=None):
+    '''Sample the series per pool until the re-index is done.
+
+    pool is the new pool, by default the newest pool in the cluster.
+
+    Prints the progress for each sample and raises a ValueError when the
+    re-index is not done within timeout seconds (0 for no limit).
+    '''
+    if retry is None:
+        retry = RetryPolicy()
+    progress = ReindexProgress(pool)
+    deadline = time.monotonic() + timeout if timeout > 0 else None
+    while True:
+        start = time.monotonic()
+        pools, servers = await asyncio.gather(
+            query_remote('list pools pool, servers, series', retry),
+            query_remote('list servers name, status', retry))
+        progress.update(pools['pools'], servers['servers'], start)
+        print(progress.as_text())
+        sys.stdout.flush()
+
+        if progress.stable:
+            logging.info('Re-index is done, pool {} has {} series'.format(
+                progress.pool, progress.series))
+            return progress
+
+        if deadline is not None and start + interval >= deadline:
+            raise ValueError(
+                'Re-index is not done within {} seconds, pool {} has {} of '
+                '~{} series'.format(timeout,
+                                    progress.pool,
+                                    progress.series,
+                                    progress.target))
+
+        await asyncio.sleep(
+            max(interval - (time.monotonic() - start), 0))
+
+
+async def parse_reindex_status(args):
+    '''Watch the re-index of a cluster, exits with 0 when it is done.'''
+    if not args.password:
+        password = ask_string(
+            title='Password',
+            is_password=True)
+    else:
+        password = args.password
+
+    try:
+        address, port = await set_remote_siridb_info(
+            parse_seeds(args.remote_address, args.remote_port),
+            args.seed_timeout,
+            check_version=False)
+        await connect_other(args.dbname, address, port, args.user, password)
+        await watch_reindex(args.interval, args.reindex_timeout)
+    except Exception as e:
+        quit_manage(1, e)
+
+    quit_manage(0, None)
+
+
+async def check_local_siridb():
+    await set_local_siridb_info(
+        settings.localhost,
+        settings.listen_client_port)
+
+    if local_siridb_info is None:
+        quit_manage(2,
+                    'Unable to get local SiriDB info, please check if '
+                    'SiriDB is running and listening to {}:{}.'.format(
+                        settings.localhost,
+                        settings.listen_client_port))
+
+    try:
+        check_local_version()
+    except ValueError as e:
+        quit_manage(2, e)
+
+
+def check_local_version():
+    '''Check if this tool and the SiriDB Server have the same version.'''
+    if tuple(map(
+            int,
+            local_siridb_info.version.split('.')[:2])) != __version_info__[:2]:
+        raise ValueError('SiriDB Server (version {}) should have the same '
+                         'version as this manage tool (version {})'
+                         .format(local_siridb_info.version, __version__))
+
+
+async def main(args):
+    # Does not need a running SiriDB server
+    if args.action == 'bench-disk':
+        await parse_bench_disk(args)
+        return
+
+    # Empty the trash left by earlier runs
+    spawn_sweep(os.path.join(settings.default_db_path, TRASH_DIR))
+
+    if args.action == 'status':
+        # Only talks to the remote cluster
+        await parse_status(args)
+        return
+
+    if args.action == 'reindex-status':
+        await parse_reindex_status(args)
+        return
+
+    if args.action == 'preflight':
+        # Runs its own checks on the local SiriDB server
+        await parse_preflight(args)
+        return
+
+    if args.action in ('create-replica', 'create-pool'):
+        # Checks the local SiriDB server concurrently with the remote steps
+        await parse_create_replica_or_pool(args)
+        return
+
+    await check_local_siridb()
+
+    if args.action is None:
+        logging.getLogger().setLevel('INFO')
+        # Open menu
+        await main_menu()
+    elif args.action == 'create-new':
+        await parse_create_new(args)
+    elif args.action == 'create-many':
+        await parse_create_many(args)
+
+
+def run(args):
+    '''Run a command, the settings must be read before calling this.'''
+    try:
+        import uvloop
+    except ImportError:
+        pass
+    else:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+    asyncio.run(main(args))
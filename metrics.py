@@ -0,0 +1,125 @@
+'''Metrics for a siridb-manage run in the OpenMetrics text format.
+
+The file is written at exit for the node_exporter textfile collector (or
+any other tool reading OpenMetrics text). It contains the phase durations
+from timings.py, the bytes received for each file, the outcome, the number
+of roll-backs and registration retries and the pool layout of the joined
+cluster. The file is replaced with an atomic rename so a collector never
+reads a partial file.
+'''
+
+import os
+import time
+import logging
+from timings import timings
+
+PREFIX = 'siridb_manage'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace(
+        '"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{{{}}}'.format(','.join(
+        '{}="{}"'.format(k, _escape(v)) for k, v in labels.items()))
+
+
+class RunMetrics:
+
+    def __init__(self):
+        self.enabled = False
+        self.command = None
+        self.dbname = None
+        self.files = {}
+        self.rollbacks = 0
+        self.register_retries = 0
+        self.pools = None
+
+    def lines(self):
+        labels = {'command': self.command or 'menu'}
+        if self.dbname:
+            labels['dbname'] = self.dbname
+        exit_code = timings.exit_code
+
+        samples = [
+            ('last_run_timestamp_seconds', 'gauge',
+             'Time the run finished.',
+             [(labels, round(time.time(), 3))]),
+            ('duration_seconds', 'gauge',
+             'Duration of the run.',
+             [(labels, round(time.perf_counter() - timings.start, 6))]),
+            ('success', 'gauge',
+             'Whether the run finished with exit code 0.',
+             [(labels, int(exit_code == 0))]),
+            ('exit_code', 'gauge',
+             'Exit code of the run, -1 when unknown.',
+             [(labels, -1 if exit_code is None else exit_code)]),
+            ('rollbacks', 'gauge',
+             'Number of roll-backs of a created database.',
+             [(labels, self.rollbacks)]),
+            ('register_retries', 'gauge',
+             'Number of retries for registering the server.',
+             [(labels, self.register_retries)])]
+
+        durations = {}
+        for phase in timings.phases:
+            durations[phase['phase']] = \
+                durations.get(phase['phase'], 0.0) + phase['duration']
+        samples.append((
+            'phase_duration_seconds', 'gauge',
+            'Time spent in each phase of the run.',
+            [(dict(labels, phase=name), round(duration, 6))
+             for name, duration in sorted(durations.items())]))
+
+        samples.append((
+            'file_bytes', 'gauge',
+            'Bytes received for each file.',
+            [(dict(labels, file=fn), size)
+             for fn, size in sorted(self.files.items())]))
+
+        if self.pools is not None:
+            samples.append((
+                'pool_servers', 'gauge',
+                'Number of servers in each pool after the run.',
+                [(dict(labels, pool=pool[0]), pool[1])
+                 for pool in self.pools]))
+            samples.append((
+                'pool_series', 'gauge',
+                'Number of series in each pool after the run.',
+                [(dict(labels, pool=pool[0]), pool[2])
+                 for pool in self.pools]))
+
+        for name, tp, doc, values in samples:
+            if not values:
+                continue
+            name = '{}_{}'.format(PREFIX, name)
+            yield '# HELP {} {}'.format(name, doc)
+            yield '# TYPE {} {}'.format(name, tp)
+            for labels, value in values:
+                yield '{}{} {}'.format(name, _labels(labels), value)
+        yield '# EOF'
+
+    def write(self, fn):
+        '''Write the metrics to fn, registered with atexit.'''
+        tmp = '{}.{}.tmp'.format(fn, os.getpid())
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(self.lines()))
+                f.write('\n')
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, fn)
+        except Exception as e:
+            logging.warning('Cannot write metrics file {!r}: {}'.format(
+                fn, e))
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+
+
+# Shared by all modules, filled during the run.
+metrics = RunMetrics()
@@ -0,0 +1,144 @@
+'''Preflight checks before joining a SiriDB cluster.
+
+All checks are started at once. A check which needs the outcome of another
+check waits for it and is skipped when that check did not pass, so a bad
+host is rejected in the time of the slowest failing check instead of the sum
+of all steps. The report contains the status and duration of each check.
+'''
+
+import os
+import json
+import time
+import asyncio
+import tempfile
+from timings import timings
+from advisor import existing_path
+from advisor import read_disk_free
+
+PASS = 'pass'
+FAIL = 'fail'
+SKIP = 'skip'
+
+
+class Skipped(Exception):
+    pass
+
+
+def check_path(path):
+    '''Raises an exception when path cannot be used for a new database.
+
+    The path must be an empty directory or should not exist, and we must be
+    able to write in it (or in the nearest parent which exists).
+    '''
+    if os.path.exists(path):
+        if not os.path.isdir(path):
+            raise ValueError('path is not a directory: {}'.format(path))
+        if os.listdir(path):
+            raise ValueError('path is not empty: {}'.format(path))
+
+    probe = existing_path(path)
+    # os.access() is always true for root, so really write a file
+    fd, fn = tempfile.mkstemp(prefix='.preflight-', dir=probe)
+    os.close(fd)
+    os.unlink(fn)
+    return {'path': path, 'writable': probe}
+
+
+def check_disk_free(path, min_free):
+    '''Raises ValueError when path has less than min_free MB free.'''
+    free = read_disk_free(path) // 2 ** 20
+    if free < min_free:
+        raise ValueError(
+            '{} has {} MB free, at least {} MB is required'.format(
+                existing_path(path), free, min_free))
+    return {'path': path, 'free_mb': free}
+
+
+def check_inodes(path, min_inodes):
+    '''Raises ValueError when path has less than min_inodes free inodes.'''
+    st = os.statvfs(existing_path(path))
+    if st.f_files == 0:
+        # file systems like btrfs do not have a fixed number of inodes
+        return {'path': path, 'free_inodes': None}
+    if st.f_favail < min_inodes:
+        raise ValueError(
+            '{} has {} free inodes, at least {} are required'.format(
+                existing_path(path), st.f_favail, min_inodes))
+    return {'path': path, 'free_inodes': st.f_favail}
+
+
+class Preflight:
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self.start = time.perf_counter()
+        self.checks = {}
+        self.results = []
+
+    def add(self, name, check):
+        '''Start a check, check is a coroutine returning details or None.'''
+        self.checks[name] = asyncio.ensure_future(self._run(name, check))
+
+    def add_blocking(self, name, func, *args):
+        '''Start a check which runs func in the default executor.'''
+        self.add(name, asyncio.get_event_loop().run_in_executor(
+            None, func, *args))
+
+    async def depends(self, name):
+        '''Wait for a check and return its details.
+
+        Raises Skipped when the check did not pass. The check is shielded
+        so a check which times out does not cancel its dependencies.
+        '''
+        result = await asyncio.shield(self.checks[name])
+        if result['status'] != PASS:
+            raise Skipped('{!r} did not pass'.format(name))
+        return result.get('details')
+
+    async def _run(self, name, check):
+        start = time.perf_counter()
+        result = {'check': name}
+        try:
+            with timings.phase('preflight {}'.format(name)):
+                details = await asyncio.wait_for(check, self.timeout)
+        except Skipped as e:
+            result['status'] = SKIP
+            result['error'] = str(e)
+        except asyncio.TimeoutError:
+            result['status'] = FAIL
+            result['error'] = 'Timeout after {} seconds'.format(self.timeout)
+        except Exception as e:
+            result['status'] = FAIL
+            result['error'] = str(e).strip() or type(e).__name__
+        else:
+            result['status'] = PASS
+            if details is not None:
+                result['details'] = details
+        result['duration'] = round(time.perf_counter() - start, 6)
+        self.results.append(result)
+        return result
+
+    async def run(self):
+        '''Wait for all checks, returns True when all checks passed.'''
+        await asyncio.gather(*self.checks.values())
+        order = list(self.checks)
+        self.results.sort(key=lambda result: order.index(result['check']))
+        return self.passed
+
+    @property
+    def passed(self):
+        return all(result['status'] == PASS for result in self.results)
+
+    @property
+    def failed(self):
+        return [result['check'] for result in self.results
+                if result['status'] == FAIL]
+
+    def as_dict(self):
+        return {
+            'passed': self.passed,
+            'duration': round(time.perf_counter() - self.start, 6),
+            'checks': self.results}
+
+    def as_json(self):
+        return json.dumps(self.as_dict(), indent=2)
@@ -0,0 +1,146 @@
+'''Progress of the re-index after a new pool is added to a SiriDB cluster.
+
+The series per pool are sampled over time. The new pool receives its
+share of the series from the other pools, the rate at which its series grow
+is the throughput of the re-index and the remaining series to reach an even
+distribution give the estimated time to complete. The re-index is done when
+no server reports re-indexing and the share of each pool has not changed
+for a number of samples, after a server was seen re-indexing or when the new
+pool holds (close to) its even share of the series. Before the re-index
+starts the distribution is unchanged as well, that is not done.
+'''
+
+import time
+import collections
+from advisor import format_duration
+from constants import REINDEX_STABLE_SAMPLES
+from constants import REINDEX_STABLE_SHARE
+from constants import REINDEX_TARGET_MARGIN
+
+
+def is_reindexing(status):
+    '''Returns True when a server status contains re-indexing.
+
+    A server status can be a combination like 'running | re-indexing'.
+    '''
+    return 're-indexing' in status
+
+
+class ReindexProgress:
+
+    def __init__(self, pool=None, stable_samples=REINDEX_STABLE_SAMPLES):
+        '''pool is the new pool, by default the newest pool in the samples.
+
+        When pool is given the re-index is not done before the pool is
+        listed, the pools can be listed before the new pool is known to
+        all servers.
+        '''
+        self.new_pool = pool
+        self.samples = collections.deque(maxlen=max(stable_samples, 2))
+        self.first = None
+        self.seen_reindexing = False
+
+    def update(self, pools, servers, at=None):
+        '''Add a sample with the result of the pools and servers queries.
+
+        pools is a list with [pool, servers, series] and servers a list with
+        [name, status] items.
+        '''
+        sample = (
+            time.monotonic() if at is None else at,
+            {p[0]: p[2] for p in pools},
+            [s[0] for s in servers if is_reindexing(s[1])])
+        if self.first is None:
+            self.first = sample
+        if sample[2]:
+            self.seen_reindexing = True
+        self.samples.append(sample)
+
+    @property
+    def pool(self):
+        '''The new pool which receives the series.'''
+        if self.new_pool is not None:
+            return self.new_pool
+        return max(self.samples[-1][1])
+
+    @property
+    def series(self):
+        return self.samples[-1][1].get(self.pool, 0)
+
+    @property
+    def target(self):
+        '''Series in the new pool when the series are evenly spread.'''
+        pools = self.samples[-1][1]
+        return sum(pools.values()) // len(set(pools) | {self.pool})
+
+    @property
+    def remaining(self):
+        return max(self.target - self.series, 0)
+
+    @property
+    def moved(self):
+        '''Series moved to the new pool since the first sample.'''
+        return self.series - self.first[1].get(self.pool, 0)
+
+    @property
+    def throughput(self):
+        '''Series per second moved to the new pool over the last samples.'''
+        (start, first, _), (end, last, _) = self.samples[0], self.samples[-1]
+        if end <= start:
+            return 0.0
+        moved = last.get(self.pool, 0) - first.get(self.pool, 0)
+        return max(moved, 0) / (end - start)
+
+    @property
+    def eta(self):
+        '''Estimated seconds to complete or None when nothing is moving.'''
+        if not self.remaining:
+            return 0.0
+        throughput = self.throughput
+        return self.remaining / throughput if throughput else None
+
+    @property
+    def reindexing(self):
+        '''Servers which report re-indexing in the last sample.'''
+        return self.samples[-1][2]
+
+    @property
+    def near_target(self):
+        '''True when the new pool holds close to its even share.'''
+        return self.series > 0 and \
+            self.series >= self.target * (1 - REINDEX_TARGET_MARGIN)
+
+    @staticmethod
+    def _shares(pools):
+        total = sum(pools.values())
+        return {pool: series / total if total else 0.0
+                for pool, series in pools.items()}
+
+    @property
+    def stable(self):
+        '''True when the re-index has run and the distribution is stable.'''
+        if len(self.samples) < self.samples.maxlen or \
+                self.pool not in self.samples[0][1] or \
+                any(sample[2] for sample in self.samples) or \
+                not (self.seen_reindexing or self.near_target):
+            return False
+        first = self._shares(self.samples[0][1])
+        last = self._shares(self.samples[-1][1])
+        return first.keys() == last.keys() and all(
+            abs(last[pool] - share) < REINDEX_STABLE_SHARE
+            for pool, share in first.items())
+
+    def as_text(self):
+        eta = self.eta
+        return '{} pool {}: {} of ~{} series ({:.0%}), moved {}, {:.1f}/s, ' \
+            'ETA {}{}'.format(
+                time.strftime('%H:%M:%S'),
+                self.pool,
+                self.series,
+                self.target,
+                self.series / self.target if self.target else 1.0,
+                self.moved,
+                self.throughput,
+                'unknown' if eta is None else format_duration(eta),
+                ', re-indexing: {}'.format(', '.join(self.reindexing))
+                if self.reindexing else '')
@@ -0,0 +1,129 @@
+'''Asynchronous host name resolution with a short lived disk cache.
+
+Names are resolved with getaddrinfo() on the event loop (which runs it in
+the default executor) so a slow resolver never blocks other work, and every
+resolution is limited by a timeout. The address family follows the
+ip_support setting of SiriDB. Results are cached on disk for a short time
+since this tool is often started many times in a row for the same hosts.
+'''
+
+import os
+import json
+import time
+import socket
+import asyncio
+import logging
+from constants import DEFAULT_CACHE_PATH
+from constants import DEFAULT_RESOLVE_TIMEOUT
+from constants import DEFAULT_RESOLVE_TTL
+
+FAMILY_MAP = {
+    'ALL': socket.AF_UNSPEC,
+    'IPV4ONLY': socket.AF_INET,
+    'IPV6ONLY': socket.AF_INET6
+}
+
+CACHE_FILE = 'resolve.json'
+
+
+def literal_address(host):
+    '''Returns host without brackets when it is an IP-address, or None.'''
+    if host.startswith('[') and host.endswith(']'):
+        host = host[1:-1]
+    for family in (socket.AF_INET, socket.AF_INET6):
+        try:
+            socket.inet_pton(family, host)
+        except (socket.error, ValueError):
+            continue
+        return host
+    return None
+
+
+class ResolveCache:
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_RESOLVE_TTL):
+        self.fn = os.path.join(path, CACHE_FILE)
+        self.ttl = ttl
+
+    def _read(self):
+        try:
+            with open(self.fn, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logging.debug('Cannot read resolve cache {!r}: {}'.format(
+                self.fn, e))
+            return {}
+
+    def get(self, key):
+        entry = self._read().get(key)
+        if entry is None:
+            return None
+        if not 0 <= time.time() - entry['resolved_at'] < self.ttl:
+            return None
+        return entry['addresses']
+
+    def set(self, key, addresses):
+        now = time.time()
+        # Expired entries are dropped so the file stays small
+        entries = {k: v for k, v in self._read().items()
+                   if 0 <= now - v['resolved_at'] < self.ttl}
+        entries[key] = {'addresses': addresses, 'resolved_at': now}
+        tmp = '{}.{}.tmp'.format(self.fn, os.getpid())
+        try:
+            os.makedirs(os.path.dirname(self.fn), exist_ok=True)
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(entries, f)
+            os.replace(tmp, self.fn)
+        except Exception as e:
+            # a user without access to the cache path should not get a
+            # warning on every run
+            logging.debug('Cannot write resolve cache {!r}: {}'.format(
+                self.fn, e))
+
+
+async def resolve(host,
+                  port,
+                  ip_support='ALL',
+                  timeout=DEFAULT_RESOLVE_TIMEOUT,
+                  cache=None):
+    '''Returns a list with the addresses for host.
+
+    IP-addresses are returned as is. Raises socket.gaierror when the name
+    cannot be resolved and asyncio.TimeoutError when resolving takes more
+    than timeout seconds.
+    '''
+    address = literal_address(host)
+    if address is not None:
+        return [address]
+
+    family = FAMILY_MAP.get(ip_support, socket.AF_UNSPEC)
+    key = '{}/{}'.format(ip_support, host)
+
+    if cache is not None:
+        addresses = cache.get(key)
+        if addresses:
+            logging.debug('Using cached address(es) for {!r}: {}'.format(
+                host, ', '.join(addresses)))
+            return addresses
+
+    start = time.monotonic()
+    infos = await asyncio.wait_for(
+        asyncio.get_event_loop().getaddrinfo(
+            host, port, family=family, type=socket.SOCK_STREAM),
+        timeout)
+
+    addresses = []
+    for info in infos:
+        if info[4][0] not in addresses:
+            addresses.append(info[4][0])
+    if not addresses:
+        raise socket.gaierror('No address found for {!r}'.format(host))
+
+    logging.debug('Resolved {!r} to {} in {:.1f}ms'.format(
+        host, ', '.join(addresses), (time.monotonic() - start) * 1000))
+
+    if cache is not None:
+        cache.set(key, addresses)
+    return addresses
@@ -0,0 +1,93 @@
+'''Retry requests to a remote SiriDB server.
+
+Failed requests are retried with an exponential backoff and a random
+jitter, until the maximum number of attempts is used or the deadline for
+all attempts has passed. Each attempt is logged with its latency.
+'''
+
+import time
+import random
+import asyncio
+import logging
+from constants import DEFAULT_RETRY_ATTEMPTS
+from constants import DEFAULT_RETRY_DELAY
+from constants import DEFAULT_RETRY_JITTER
+from constants import DEFAULT_RETRY_DEADLINE
+from constants import RETRY_MAX_DELAY
+
+
+class RetryPolicy:
+
+    def __init__(self,
+                 attempts=DEFAULT_RETRY_ATTEMPTS,
+                 delay=DEFAULT_RETRY_DELAY,
+                 jitter=DEFAULT_RETRY_JITTER,
+                 deadline=DEFAULT_RETRY_DEADLINE):
+        if attempts < 1:
+            raise ValueError('Expecting at least 1 attempt, got {}'.format(
+                attempts))
+        if not 0 <= jitter <= 1:
+            raise ValueError('Expecting a jitter between 0 and 1, got {}'
+                             .format(jitter))
+        self.attempts = attempts
+        self.delay = delay
+        self.jitter = jitter
+        self.deadline = deadline
+
+    def backoff(self, attempt):
+        '''Returns the seconds to wait after the given failed attempt.'''
+        delay = min(self.delay * 2 ** (attempt - 1), RETRY_MAX_DELAY)
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    async def call(self,
+                   name,
+                   func,
+                   fatal=(),
+                   before_retry=None,
+                   on_retry=None):
+        '''Returns the result of await func().
+
+        Exceptions which are an instance of fatal are raised right away.
+        before_retry is a coroutine function which is awaited before each
+        retry (for example to reconnect) and on_retry is called for each
+        retry. The last exception is raised when all attempts failed.
+        '''
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            attempt += 1
+            start = time.monotonic()
+            try:
+                if attempt > 1 and before_retry is not None:
+                    await before_retry()
+                result = await asyncio.wait_for(
+                    func(),
+                    max(deadline - start, 0))
+            except fatal:
+                raise
+            except Exception as e:
+                logging.warning('{} attempt {}/{} failed after {:.1f}ms: '
+                                '{}'.format(name,
+                                            attempt,
+                                            self.attempts,
+                                            (time.monotonic() - start) * 1000,
+                                            str(e) or type(e).__name__))
+                backoff = self.backoff(attempt)
+                if attempt >= self.attempts or \
+                        time.monotonic() + backoff >= deadline:
+                    raise
+            else:
+                msg = '{} attempt {}/{} succeeded in {:.1f}ms'.format(
+                    name,
+                    attempt,
+                    self.attempts,
+                    (time.monotonic() - start) * 1000)
+                if attempt > 1:
+                    logging.info(msg)
+                else:
+                    logging.debug(msg)
+                return result
+
+            if on_retry is not None:
+                on_retry()
+            await asyncio.sleep(backoff)
@@ -0,0 +1,237 @@
+'''Edit a SiriDB servers.dat file.
+
+The servers.dat file is a qpack array with one [uuid, address, port, pool]
+array per server. Instead of unpacking and re-packing the complete file,
+this module scans the entries in place (the file is memory mapped and only
+entry boundaries are parsed) and writes the result to a temporary file
+which replaces the original with an atomic rename.
+'''
+
+import os
+import mmap
+import struct
+import qpack
+
+_QP_ARRAY0 = 0xed
+_QP_ARRAY4 = 0xf1
+_QP_ARRAY5 = 0xf2
+_QP_MAP0 = 0xf3
+_QP_MAP5 = 0xf8
+_QP_OPEN_ARRAY = 0xfc
+_QP_OPEN_MAP = 0xfd
+_QP_CLOSE_ARRAY = 0xfe
+_QP_CLOSE_MAP = 0xff
+_QP_RAW_UUID = 0x80 + 16
+
+_RAW_SIZE = {
+    0xe4: struct.Struct('<B'),
+    0xe5: struct.Struct('<H'),
+    0xe6: struct.Struct('<I'),
+    0xe7: struct.Struct('<Q')}
+
+_NUMBER_SIZE = {
+    0xe8: 1,
+    0xe9: 2,
+    0xea: 4,
+    0xeb: 8,
+    0xec: 8}
+
+_COPY_CHUNK = 65536
+
+
+def _skip(qp, pos):
+    '''Returns the position after the qpack object starting at pos.'''
+    tp = qp[pos]
+    pos += 1
+    if tp < 0x80 or 0xf9 <= tp <= 0xfb:
+        return pos
+    if tp < 0xe4:
+        return pos + tp - 0x80
+    if tp in _RAW_SIZE:
+        size = _RAW_SIZE[tp]
+        return pos + size.size + size.unpack_from(qp, pos)[0]
+    if tp in _NUMBER_SIZE:
+        return pos + _NUMBER_SIZE[tp]
+    if tp <= _QP_ARRAY5:
+        for _ in range(tp - _QP_ARRAY0):
+            pos = _skip(qp, pos)
+        return pos
+    if tp <= _QP_MAP5:
+        for _ in range(2 * (tp - _QP_MAP0)):
+            pos = _skip(qp, pos)
+        return pos
+    if tp in (_QP_OPEN_ARRAY, _QP_OPEN_MAP):
+        close = _QP_CLOSE_ARRAY if tp == _QP_OPEN_ARRAY else _QP_CLOSE_MAP
+        while pos < len(qp) and qp[pos] != close:
+            pos = _skip(qp, pos)
+        return pos + 1
+    raise ValueError('Unexpected qpack type {} at position {}'.format(
+        tp, pos - 1))
+
+
+def _scan(qp):
+    '''Returns the entry positions and the position of the array close.
+
+    The close position is None when the array has a fixed size or when an
+    open array is closed by the end of the file.
+    '''
+    try:
+        return _scan_entries(qp)
+    except (IndexError, struct.error):
+        raise ValueError('Servers file is truncated')
+
+
+def _scan_entries(qp):
+    tp = _check_header(qp)
+    pos = 1
+    entries = []
+    close = None
+
+    if tp == _QP_OPEN_ARRAY:
+        while pos < len(qp):
+            if qp[pos] == _QP_CLOSE_ARRAY:
+                close = pos
+                pos += 1
+                break
+            end = _skip(qp, pos)
+            entries.append((pos, end))
+            pos = end
+    else:
+        for _ in range(tp - _QP_ARRAY0):
+            end = _skip(qp, pos)
+            entries.append((pos, end))
+            pos = end
+
+    if pos != len(qp):
+        raise ValueError('Unexpected data at the end of the servers file')
+
+    for i, (start, end) in enumerate(entries):
+        if end > len(qp):
+            raise ValueError('Servers file is truncated')
+        if i == 0 and qp[start] < 0xe4:
+            # the SiriDB server writes a schema version as first item
+            continue
+        if qp[start] != _QP_ARRAY4 or qp[start + 1] != _QP_RAW_UUID:
+            raise ValueError(
+                'Invalid server entry at position {}'.format(start))
+
+    return entries, close
+
+
+def _check_header(qp):
+    if not len(qp):
+        raise ValueError('Empty servers file')
+    tp = qp[0]
+    if tp != _QP_OPEN_ARRAY and not _QP_ARRAY0 <= tp <= _QP_ARRAY5:
+        raise ValueError('Servers file does not contain an array')
+    return tp
+
+
+def _find(qp, uuid):
+    '''Returns the start and end position for the server with uuid.'''
+    needle = bytes([_QP_ARRAY4, _QP_RAW_UUID]) + uuid
+    pos = qp.find(needle, 1)
+    if pos == -1:
+        return None
+    try:
+        end = _skip(qp, pos)
+    except (IndexError, struct.error):
+        raise ValueError('Servers file is truncated')
+    if end > len(qp):
+        raise ValueError('Servers file is truncated')
+    return pos, end
+
+
+def _open(fn):
+    with open(fn, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _close(qp):
+    if isinstance(qp, mmap.mmap):
+        qp.close()
+
+
+def _copy(f, qp, start, end):
+    for pos in range(start, end, _COPY_CHUNK):
+        f.write(qp[pos:min(pos + _COPY_CHUNK, end)])
+
+
+def validate(fn):
+    '''Validate all entries in a servers file.
+
+    Returns the number of servers.
+    '''
+    qp = _open(fn)
+    try:
+        entries, _ = _scan(qp)
+        return sum(qp[start] == _QP_ARRAY4 for start, _ in entries)
+    finally:
+        _close(qp)
+
+
+def iter_servers(fn):
+    '''Yields the servers in a servers file one by one.'''
+    qp = _open(fn)
+    try:
+        for start, end in _scan(qp)[0]:
+            if qp[start] == _QP_ARRAY4:
+                yield qpack.unpackb(qp[start:end])
+    finally:
+        _close(qp)
+
+
+def set_server(fn, server):
+    '''Replace the server with the same uuid or append the server.
+
+    Only the array header and the entry with the same uuid (when present)
+    are parsed, the rest of the file is copied as is. An open array is
+    considered closed when the file ends with a close marker. (the last
+    byte of a server entry is part of the pool number and cannot be a
+    close marker for pool numbers below 65024)
+
+    Returns True when an existing server is replaced.
+    '''
+    packed = qpack.packb(list(server))
+    qp = _open(fn)
+    tmp = '{}.tmp'.format(fn)
+    try:
+        tp = _check_header(qp)
+        if tp != _QP_OPEN_ARRAY:
+            # small fixed size array, we can afford to check every entry
+            _scan(qp)
+        replace = _find(qp, bytes(server[0]))
+
+        with open(tmp, 'wb') as f:
+            if replace is not None:
+                start, end = replace
+                _copy(f, qp, 0, start)
+                f.write(packed)
+                _copy(f, qp, end, len(qp))
+            elif tp == _QP_OPEN_ARRAY:
+                end = len(qp) - 1 \
+                    if qp[len(qp) - 1] == _QP_CLOSE_ARRAY and len(qp) > 1 \
+                    else len(qp)
+                _copy(f, qp, 0, end)
+                f.write(packed)
+                f.write(bytes([_QP_CLOSE_ARRAY]))
+            elif tp < _QP_ARRAY5:
+                f.write(bytes([tp + 1]))
+                _copy(f, qp, 1, len(qp))
+                f.write(packed)
+            else:
+                f.write(bytes([_QP_OPEN_ARRAY]))
+                _copy(f, qp, 1, len(qp))
+                f.write(packed)
+                f.write(bytes([_QP_CLOSE_ARRAY]))
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    finally:
+        _close(qp)
+
+    os.replace(tmp, fn)
+    return replace is not None
@@ -12,6 +12,7 @@ import logging
 import socket
 import configparser
 from constants import DEFAULT_CONFIG_FILE
+from timings import timings
 
 # configparser is set to global so we do not need cleanup after reading config.
 config = configparser.RawConfigParser()
@@ -28,6 +29,10 @@ Cannot connect to "{}". Check the server_name specified in "{}" and check if
 SiriDB is running. (or specify a different configuration file)
 '''
 
+_RESOLVE_ERROR_MSG = '''
+Cannot resolve "{}" ({}). Check the server_name specified in "{}".
+'''
+
 class Settings:
 
     def __init__(self):
@@ -35,6 +40,10 @@ class Settings:
 
     @staticmethod
     def _get_address(addr, fn):
+        '''Returns the address and port for a server name.
+
+        Names are not resolved here, see resolve_server_name().
+        '''
         addr = addr.replace('%HOSTNAME', socket.gethostname())
         try:
             address, port = \
@@ -44,19 +53,34 @@ class Settings:
         if not 1 < port < 2 ** 16:
             raise ValueError(_ADDRESS_ERROR_MSG.format(addr, fn))
 
-        try:
-            if address.startswith('[') and address.endswith(']'):
-                address = address.lstrip('[').rstrip(']')
-                socket.inet_pton(socket.AF_INET6, address)
-            else:
-                socket.inet_pton(socket.AF_INET, address)
-        except socket.error:
+        if address.startswith('[') and address.endswith(']'):
+            address = address.lstrip('[').rstrip(']')
             try:
-                socket.gethostbyname(address)
+                socket.inet_pton(socket.AF_INET6, address)
             except socket.error:
                 raise ValueError(_ADDRESS_ERROR_MSG.format(addr, fn))
         return address, port
 
+    async def resolve_server_name(self, cache=None):
+        '''Check if the server name can be resolved.
+
+        This is only needed when the server name is used, for example when
+        a server is added to servers.dat, so resolving the name is done
+        asynchronously by the commands which need it.
+        '''
+        from resolver import resolve
+        with timings.phase('resolve_server_name'):
+            try:
+                await resolve(self.server_address,
+                              self.listen_backend_port,
+                              self.ip_support,
+                              cache=cache)
+            except Exception as e:
+                raise ValueError(_RESOLVE_ERROR_MSG.format(
+                    self.server_address,
+                    str(e) or type(e).__name__,
+                    self.config_file))
+
     def read_config(self):
         '''Read settings from global configuration file.'''
         global config
@@ -76,5 +100,13 @@ class Settings:
         if ip_support not in IP_SUPPORT_MAP:
             ip_support = 'ALL'
 
+        self.ip_support = ip_support
         self.localhost = IP_SUPPORT_MAP[ip_support]
 
+        # Only used for advice, older configuration files do not have it
+        self.max_open_files = config.getint(
+            'siridb', 'max_open_files', fallback=None)
+
+
+# Shared by siridb-manage.py, which reads the configuration, and manage.py.
+settings = Settings()
@@ -1,715 +1,59 @@
 #!/usr/bin/python3 -OO
 import sys
 import os
+import atexit
 import argparse
 import signal
-import functools
-import asyncio
-import shutil
 import logging
-import getpass
-import uuid
-import pickle
-import qpack
-import time
-from settings import Settings
-from constants import DEFAULT_TIMEZONE
-from constants import DEFAULT_DROP_THRESHOLD
+from timings import timings
+from metrics import metrics
+from settings import settings
+from constants import DEFAULT_BENCH_SAMPLES
 from constants import DEFAULT_BUFFER_SIZE
+from constants import DEFAULT_CACHE_PATH
+from constants import DEFAULT_GC_WORKERS
+from constants import DEFAULT_LOAD_TIMEOUT
+from constants import DEFAULT_MAX_FSYNC_P99
+from constants import DEFAULT_MIN_DISK_FREE
+from constants import DEFAULT_MIN_FREE_INODES
+from constants import DEFAULT_PREFLIGHT_TIMEOUT
+from constants import DEFAULT_REINDEX_TIMEOUT
+from constants import DEFAULT_RETENTION
+from constants import DEFAULT_RETRY_ATTEMPTS
+from constants import DEFAULT_RETRY_DEADLINE
+from constants import DEFAULT_RETRY_DELAY
+from constants import DEFAULT_RETRY_JITTER
+from constants import DEFAULT_SEED_TIMEOUT
+from constants import DEFAULT_STATUS_INTERVAL
+from constants import DEFAULT_WAIT_RUNNING
 from constants import DURATIONS
-from constants import DBNAME_VALID_NAME
-from constants import MAX_BUFFER_SIZE
-from constants import DEFAULT_CONFIG
-from constants import DEFAULT_CLIENT_PORT
-from constants import DBPROPS
-from constants import MAX_NUMBER_DB
+from constants import FULL_AUTH
 from version import __version__
-from version import __version_info__
 from version import __email__
 from version import __maintainer__
-from siridb.connector import connect
-from siridb.connector import SiriDBProtocol
-from siridb.connector import async_server_info
-from siridb.connector.lib.protomap import CPROTO_REQ_LOADDB
-from siridb.connector.lib.exceptions import ServerError
-from siridb.connector.lib.exceptions import PoolError
-from siridb.connector.lib.exceptions import UserAuthError
-from siridb.connector.lib.exceptions import AuthenticationError
-
-settings = Settings()
-PROMPT = '> '
-FULL_AUTH = 'full'
-siri = None
-local_siridb_info = None
-remote_siridb_info = None
-
-
-def check_valid_dbname(dbname):
-    if not isinstance(dbname, str):
-        raise ValueError(
-            'Need a string value for dbname, got {}'.format(
-                type(dbname).__name__))
-    if not DBNAME_VALID_NAME.match(dbname):
-        raise ValueError(
-            'Database name should be 2 to 20 characters, stating with an '
-            'alphabetic and ending with an alphabetic or number character. '
-            'In the middle hyphens are allowed.')
-
-
-def mk_path(path):
-    if not os.path.exists(path):
-        os.makedirs(path)
-    elif os.listdir(path):
-        raise OSError('path is not empty: {}'.format(path))
 
 
-def create_database(
-        dbname,
-        dbpath,
-        time_precision='ms',
-        duration_log='1d',
-        duration_num='1w',
-        timezone=DEFAULT_TIMEZONE,
-        drop_threshold=DEFAULT_DROP_THRESHOLD,
-        buffer_size=DEFAULT_BUFFER_SIZE,
-        config={},
-        _uuid=None,
-        _pool=0):
-    '''
-    Note: duration_log and duration_num can both be integer or string.
-          get_duration() understands both.
-    '''
-    check_valid_dbname(dbname)
-
-    _config = {
-        'buffer_path': dbpath
-    }
-    _config.update(config)
-
-    if time_precision not in ['s', 'ms', 'us', 'ns']:
-        raise ValueError('time_precision must be either \'s\' (seconds), '
-                         '\'ms\' (milliseconds), \'us\' (microseconds) '
-                         'or \'ns\' (nanoseconds) but received {!r}'
-                         .format(time_precision))
-
-    time_precision = get_time_precision(time_precision)
-
-    duration_num = get_duration(time_precision, duration_num)
-    duration_log = get_duration(time_precision, duration_log)
-
-    if _uuid is None:
-        _uuid = uuid.uuid1()
-
-    with open(os.path.join(dbpath, 'database.conf'),
-              'w',
-              encoding='utf-8') as f:
-        f.write(DEFAULT_CONFIG.format(
-            comment_buffer_path='# '
-            if _config['buffer_path'] == dbpath else '',
-                **_config))
-
-    db_obj = [
-        1,                                          # shema version
-        _uuid.bytes,                                # uuid
-        dbname,                                     # dbname
-        time_precision,                             # time precision
-        buffer_size,                                # buffer size
-        duration_num,                               # duration num
-        duration_log,                               # duration log
-        timezone,                                   # timezone
-        drop_threshold,                             # drop threshold
-    ]
-
-    with open(os.path.join(dbpath, 'database.dat'), 'wb') as f:
-        f.write(qpack.packb(db_obj))
-
-
-def color_red(s):
-    return '\x1b[31m{}\x1b[0m'.format(s)
-
-
-def color_yellow(s):
-    return '\x1b[33m{}\x1b[0m'.format(s)
-
-
-def color_purple(s):
-    return '\033[95m{}\x1b[0m'.format(s)
-
-
-def color_blue(s):
-    return '\033[94m{}\x1b[0m'.format(s)
-
-
-def print_header(title, desciption, has_default):
-    print('\n',
-          color_blue(title),
-          '(enter to use default)' if has_default else '')
-    if desciption:
-        print(desciption)
-
-
-def print_error(s):
-    print('\n', color_yellow(s), '\n')
-
-
-def print_action(action):
-    print(' {}'.format(color_yellow(action)))
-
-
-def get_input(default):
-    return input('[{}] {}'.format(color_red(default), PROMPT)
-                 if default is not None
-                 else PROMPT).strip()
-
-
-def get_pass(default):
-    return getpass.getpass('[{}] {}'.format(color_red(default), PROMPT)
-                           if default is not None
-                           else PROMPT).strip()
-
-
-class Options:
-
-    def __init__(self, options):
-        self.options = options
-
-    def get_options(self):
-        return [option['option'] for option in self.options]
-
-    def options_as_text(self):
-        return ' or '.join([s
-                            for s in [
-                                ', '.join(self.get_options()[:-1]),
-                                self.get_options()[-1]] if s])
-
-    def __getitem__(self, key):
-        return self.options[key]
-
-
-def not_empty(s):
-    if not s:
-        raise ValueError('Empty value is not allowed')
-
-
-def quit_manage(exit_code=0, msg='Exit manage SiriDB... bye!'):
-    if siri:
-        logging.debug('Close siridb connection')
-        siri.close()
-
+def exit_manage(exit_code=0, msg=None):
+    '''Exit before manage.py is imported, see quit_manage() in manage.py.'''
+    timings.exit_code = exit_code
     if exit_code:
         logging.error(msg)
-    else:
+    elif msg:
         logging.info(msg)
 
     sys.exit(exit_code)
 
 
-def menu(title, options, description='', default=None):
-    print_header(title, description, default is not None)
-    while True:
-        for option in options:
-            print(' [{}] - {}'.format(color_red(option['option']),
-                                      option['text']))
-
-        inp = get_input(default)
-        if not inp:
-            inp = default
-
-        if inp not in options.get_options():
-            print('\nInvalid option: {}, options are: {}'.format(
-                color_red(inp), options.options_as_text()))
-        else:
-            return inp
-
-
-def ask_string(title,
-               description='',
-               default=None,
-               func=lambda x: None,
-               is_password=False):
-    print_header(title, description, default is not None)
-    while True:
-        inp = get_pass(default) if is_password else get_input(default)
-        if not inp:
-            inp = default
-        try:
-            func(inp)
-        except Exception as e:
-            print('\n', e)
-        else:
-            return inp
-
-
-def ask_int(title, description='', default=None, func=lambda x: None):
-    print_header(title, description, default is not None)
-    while True:
-        inp = get_input(default)
-        if not inp:
-            inp = default
-        try:
-            inp = int(inp)
-        except ValueError:
-            print('\nExpecting an integer value but got {!r}'.format(inp))
-        else:
-            try:
-                func(inp)
-            except Exception as e:
-                print('\n', e)
-            else:
-                return inp
-
-
-def check_valid_buffer_size(i):
-    if i % 512 != 0:
-        raise ValueError('Please use a multiple of 512 as a buffer size, '
-                         'got {}'.format(i))
-    check_min_max(i, 512, MAX_BUFFER_SIZE)
-
-
-def check_min_max(i, mi, ma, s='a value'):
-    if i < mi or i > ma:
-        raise ValueError('Expecting {} between {} and {} but got {}'.format(
-            s, mi, ma, i))
-
-
-class SiriDBInfo():
-    def __init__(self, version, dblist):
-        self.version = version
-        self.dblist = dblist
-
-
-async def set_local_siridb_info(host, port):
-    global local_siridb_info
-    try:
-        result = await async_server_info(host, port)
-    except Exception as e:
-        logging.error('Connection error: {}'.format(e))
-        sys.exit(1)
-    else:
-        if result:
-            local_siridb_info = SiriDBInfo(*result)
-
-
-async def set_remote_siridb_info(host, port):
-    global remote_siridb_info
-    try:
-        result = await async_server_info(host, port)
-    except:
-        result = None
-
-    if result:
-        remote_siridb_info = SiriDBInfo(*result)
-
-    if remote_siridb_info is None:
-        raise RuntimeError(
-            'Error retreiving SiriDB info from {}:{}'.format(host, port))
-
-    if not remote_siridb_info.dblist:
-        raise RuntimeError('No databases found in {}:{}'.format(host, port))
-
-    if local_siridb_info.version != remote_siridb_info.version:
-        raise RuntimeError(
-            'Local version ({}) not equal to remote version ({})'
-            .format(local_siridb_info.version, remote_siridb_info.version))
-
-
-def check_dbname(s):
-    check_valid_dbname(s)
-    if s in local_siridb_info.dblist:
-        raise ValueError('Database {!r} already exists'.format(s))
-    if len(local_siridb_info.dblist) >= MAX_NUMBER_DB:
-        raise ValueError(
-            'Cannot create {!r} because the maximum number of '
-            'databases is reached. (max={})'.format(s, MAX_NUMBER_DB))
-
-
-def check_loaded(dbname):
-    asyncio.get_event_loop().run_until_complete(set_local_siridb_info(
-        settings.localhost,
-        settings.listen_client_port))
-    if dbname not in local_siridb_info.dblist:
-        raise ValueError('Database {!r} is not loaded, please check the '
-                         'SiriDB logging to see what went wrong. (possible '
-                         'cause:  SiriDB has no access to the database '
-                         'folder)'.format(dbname))
-
-
-class SiriDBLoadProtocol(SiriDBProtocol):
-
-    def connection_made(self, transport):
-
-        def finished(future):
-            pass
-
-        self.transport = transport
-        self.remote_ip, self.port = transport.get_extra_info('peername')[:2]
-
-        self.future = self.send_package(CPROTO_REQ_LOADDB,
-                                        data=self._dbname,
-                                        timeout=10)
-        self.future.add_done_callback(finished)
-
-
-async def load_database(dbpath, host, port):
-    if dbpath[-1] != '/':
-        dbpath += '/'
-
-    loop = asyncio.get_event_loop()
-
-    client = loop.create_connection(
-        lambda: SiriDBLoadProtocol(None, None, dbpath),
-        host=host,
-        port=port)
-
-    transport, protocol = await asyncio.wait_for(client, timeout=10)
-
-    await protocol.future
-    transport.close()
-
-
-def connect_other(dbname, host, port, username, password):
-    global siri
-    siri = connect(username, password, dbname, host, port)
-
-
-def connect_to_siridb(dbname, address, port, username, password):
-    try:
-        connect_other(dbname, address, port, username, password)
-    except Exception as e:
-        raise ConnectionError('Error while connecting: {}'.format(e))
-
-    try:
-        result = siri.query('show version')
-    except QueryError:
-        raise ConnectionError('User {!r} has no {!r} privileges'.format(
-            username, FULL_AUTH))
-
-    version = result['data'][0]['value']
-
-    if tuple(map(int, version.split('.')))[:2] != __version_info__[:2]:
-        raise ValueError('SiriDB Server is running version {}, '
-                         'we are using  {}'.format(version, __version__))
-
-    result = siri.query('list users name, access')
-
-    for user in result['users']:
-        if user[0] == username and user[1] != FULL_AUTH:
-            raise ConnectionError('User {!r} has no {!r} privileges'.format(
-                username, FULL_AUTH))
-
-
-def join_database():
-    other_address = None
-    other_port = DEFAULT_CLIENT_PORT
-    username = None
-    dbname = None
-    while True:
-        other_address = ask_string(
-            title='Remote host or IP-address',
-            default=other_address,
-            func=not_empty,
-            description='If your database has already more than one server '
-            'you can just choose one')
-
-        other_port = ask_int(
-            title='Remote client port',
-            default=other_port,
-            func=functools.partial(check_min_max, mi=1, ma=65535))
-
-        try:
-            asyncio.get_event_loop().run_until_complete(set_remote_siridb_info(
-                other_address,
-                other_port))
-        except Exception as e:
-            print_error(e)
-            continue
-
-        db = menu(
-            title='Database',
-            options=Options([
-                {'option': str(i), 'text': s}
-                for i, s in enumerate(remote_siridb_info.dblist)]),
-            default='0')
-        dbname = remote_siridb_info.dblist[int(db)]
-
-        if dbname in local_siridb_info.dblist:
-            print_error('Database "{}" already exist on this server'.format(
-                dbname))
-            continue
-
-        username = ask_string(
-            title='User name',
-            default=username,
-            func=not_empty,
-            description='The given user name should have {!r} '
-            'privileges'.format(FULL_AUTH))
-
-        password = ask_string(
-            title='Password',
-            is_password=True)
-
-        try:
-            connect_to_siridb(dbname,
-                              other_address,
-                              other_port,
-                              username,
-                              password)
-        except Exception as e:
-            print_error(e)
-        else:
-            break
-
-        print_action('Please verify your input and try again...')
-
-    dbpath = os.path.join(settings.default_db_path, dbname)
-    mk_path(dbpath)
-    buffer_path = ask_buffer_path(dbpath)
-
-    while True:
-        try:
-            result = siri.query('list pools pool, servers, series ')
-        except QueryError as e:
-            print_error(e)
-            answer = menu(
-                title='Do you want to retry?',
-                options=Options([
-                    {'option': 'r', 'text': 'Retry'},
-                    {'option': 'q', 'text': 'Quit'}]),
-                default='r')
-
-            if answer == 'r':
-                continue
-
-            quit_manage(1, e)
-        break
-
-    pools = sorted(result['pools'], key=lambda t: t[0])
-
-    pool_or_replica(pools, dbpath, buffer_path)
-
-
-def show_pool_status(pools):
-    print(color_blue('{}{}{}'.format('pool'.ljust(10),
-                                     'servers'.ljust(10),
-                                     'series')))
-
-    for pool in pools:
-        print('{}{}{}'.format(str(pool[0]).ljust(10),
-                              str(pool[1]).ljust(10),
-                              str(pool[2])))
-
-
-def create_joined_database(dbpath, buffer_path, pool, new_pool, action_str):
-    dbconfig = siri.query('show {}'.format(','.join(DBPROPS)))
-    props = {prop['name']: prop['value'] for prop in dbconfig['data']}
-    cfg = {}
-
-    ask_buffer_size(cfg)
-
-    cfg['buffer_path'] = buffer_path
-
-    dbname = props['dbname']
-
-    answer = menu(
-        title='Are you sure you want to continue and {}?'.format(action_str),
-        options=Options([
-            {'option': 'y', 'text': 'Yes, I\'m sure'},
-            {'option': 'n', 'text': 'No, go back'}]),
-        default='n')
-    if answer == 'n':
-        return None
-
-    create_and_register_server(dbname,
-                               dbpath,
-                               pool,
-                               props,
-                               cfg,
-                               new_pool,
-                               allow_retry=True)
-
-
-def get_time_precision(s):
-    _map = ['s', 'ms', 'us', 'ns']
-    return _map.index(s)
-
-
-def get_duration(tp, duration):
-    return duration if isinstance(duration, int) \
-        else DURATIONS[duration][0] * (1000**tp)
-
-
-def create_and_register_server(dbname,
-                               dbpath,
-                               pool,
-                               props,
-                               cfg,
-                               new_pool,
-                               allow_retry=True):
-    def rollback(*args):
-        logging.warning('Roll-back create database...')
-        shutil.rmtree(dbpath)
-        quit_manage(*args)
-
-    address = settings.server_address
-    port = settings.listen_backend_port
-    _uuid = uuid.uuid1()
-
-    create_database(
-        dbname=dbname,
-        dbpath=dbpath,
-        time_precision=props['time_precision'],
-        duration_log=props['duration_log'],
-        duration_num=props['duration_num'],
-        timezone=props['timezone'],
-        drop_threshold=props['drop_threshold'],
-        config=cfg,
-        _uuid=_uuid,
-        _pool=pool)
-    logging.info('Added database {!r}'.format(props['dbname']))
-
-    for fn in ('servers.dat',
-               'users.dat',
-               'groups.dat'):
-        try:
-            content = siri._get_file(fn)
-        except ServerError as e:
-            rollback(1, e)
-
-        with open(os.path.join(dbpath, fn), 'wb') as f:
-            f.write(content)
-
-    if new_pool:
-        with open(os.path.join(dbpath, '.reindex'), 'wb') as f:
-            pass
-
-    with open(os.path.join(dbpath, 'servers.dat'), 'rb') as f:
-        qp_servers = f.read()
-        servers_obj = qpack.unpackb(qp_servers)
-
-    server = [_uuid.bytes, bytes(address, 'utf-8'), port, pool]
-    servers_obj.append(server)
-
-    with open(os.path.join(dbpath, 'servers.dat'), 'wb') as f:
-        qp_servers = qpack.packb(servers_obj)
-        f.write(qp_servers)
-
-    result = siri.query('list servers name, status')
-
-    expected = 'running'
-    for srv in result['servers']:
-        if srv[1] != expected:
-            rollback(
-                1,
-                'All servers must have status {!r} '
-                'before we can continue. As least {!r} has status {!r}'
-                .format(expected, srv[0], srv[1]))
-
-    asyncio.get_event_loop().run_until_complete(load_database(
-        dbpath,
-        settings.localhost,
-        settings.listen_client_port))
-
-    time.sleep(1)
-
-    try:
-        check_loaded(dbname)
-    except Exception as e:
-        rollback(1, e)
-    else:
-        logging.info(
-            'Database loaded... now register the server'.format(dbname))
-
-    while True:
-        try:
-            siri._register_server(server)
-        except Exception as e:
-            if allow_retry:
-                print_error(e)
-                answer = menu(
-                    title='Do you want to retry the registration?',
-                    options=Options([
-                        {'option': 'r', 'text': 'Retry'},
-                        {'option': 'q', 'text': 'Quit'}]),
-                    default='r')
-                if answer == 'r':
-                    continue
-                rollback(0, None)
-            else:
-                rollback(1, e)
-        break
-
-    quit_manage(0, 'Finished joining database {!r}...'.format(dbname))
-
-
-def create_new_pool(pools, dbpath, buffer_path):
-    pool = len(pools)
-    create_joined_database(dbpath,
-                           buffer_path,
-                           pool,
-                           True,
-                           'create a new pool: {}'.format(pool))
-
-
-def create_new_replica(pools, dbpath, buffer_path):
-    opts = [{
-        'option': str(pool[0]),
-        'text': 'Pool ID {}'.format(pool[0])
-    } for pool in pools if pool[1] == 1]
-
-    pool = menu(
-        title='For which pool do you want to create a replica?',
-        description=None
-        if opts
-        else '(All available pools already have a replica)',
-        options=Options(opts + [{'option': 'b', 'text': 'Back'}])
-    )
-    if pool == 'b':
-        return None
-    pool = int(pool)
-
-    create_joined_database(dbpath,
-                           buffer_path,
-                           pool,
-                           False,
-                           'create a replica for pool {}'.format(pool))
-
-
-def pool_or_replica(pools, dbpath, buffer_path):
-    while True:
-        action = menu(
-            title='New pool or extend and existing pool (replica)?',
-            options=Options([
-                {'option': 'p',
-                 'text': 'Create a new pool'},
-                {'option': 'r',
-                 'text': 'Create a replica for an existing pool'},
-                {'option': 's',
-                 'text': 'Show current pools'},
-                {'option': 'q',
-                 'text': 'quit'}]))
-        {
-            'q': quit_manage,
-            'p': lambda: create_new_pool(pools, dbpath, buffer_path),
-            'r': lambda: create_new_replica(pools, dbpath, buffer_path),
-            's': lambda: show_pool_status(pools)
-        }[action]()
-
-
-def ask_buffer_path(dbpath):
-    return ask_string(
-        title='Location to store the buffer file',
-        description='It can be useful to store the buffer file on a separate '
-        '(fast) disk, for example a Solid State Drive (SSD).'.format(
-            args.config),
-        default=dbpath,
-        func=mk_path)
-
-
-def ask_buffer_size(cfg):
-    cfg['buffer_size'] = ask_int(
-        title='Buffer size',
-        default=DEFAULT_BUFFER_SIZE,
-        func=check_valid_buffer_size)
+def _arg_manifest(parser):
+    parser.add_argument(
+        '--manifest',
+        type=str,
+        required=True,
+        help='JSON or YAML file with the databases to create. The file '
+        'should contain a list of databases (or a mapping with a '
+        '\'databases\' list) where each database accepts the keys: dbname, '
+        'time_precision, duration_num, duration_log, buffer_size and '
+        'buffer_path.')
 
 
 def _arg_dbname(parser):
@@ -765,13 +109,101 @@ def _arg_buffer_size(parser):
         'multiple of 512 as a buffer size.')
 
 
+def _arg_load_timeout(parser):
+    parser.add_argument(
+        '--load-timeout',
+        type=float,
+        default=DEFAULT_LOAD_TIMEOUT,
+        help='Maximum time in seconds to wait for SiriDB to finish loading '
+        'a new database.')
+
+
+def _arg_bench_disk(parser):
+    parser.add_argument(
+        '--bench-disk',
+        action='store_true',
+        default=False,
+        help='Benchmark the disk for the buffer path before the database is '
+        'created and refuse the buffer path when the fsync latency is above '
+        '--max-fsync-p99.')
+
+
+def _arg_max_fsync_p99(parser):
+    parser.add_argument(
+        '--max-fsync-p99',
+        type=float,
+        default=DEFAULT_MAX_FSYNC_P99,
+        help='Maximum accepted 99th percentile fsync latency in milliseconds '
+        'for the buffer path.')
+
+
+def _arg_bench_path(parser):
+    parser.add_argument(
+        '--path',
+        type=str,
+        default='',
+        help='Path to benchmark, for example the planned buffer path. '
+        '(defaults to the default database path)')
+
+
+def _positive_int(value):
+    n = int(value)
+    if n < 1:
+        raise argparse.ArgumentTypeError(
+            'expecting at least 1, got {}'.format(value))
+    return n
+
+
+def _arg_bench_samples(parser):
+    parser.add_argument(
+        '--samples',
+        type=_positive_int,
+        default=DEFAULT_BENCH_SAMPLES,
+        help='Number of random rewrites followed by an fsync to measure.')
+
+
+def _arg_series(parser):
+    parser.add_argument(
+        '--series',
+        type=int,
+        required=True,
+        help='Expected number of series.')
+
+
+def _arg_points_per_second(parser):
+    parser.add_argument(
+        '--points-per-second',
+        type=float,
+        required=True,
+        help='Expected number of points per second for all series.')
+
+
+def _arg_log_ratio(parser):
+    parser.add_argument(
+        '--log-ratio',
+        type=float,
+        default=0.0,
+        help='Part of the series and points which are log (string) values, '
+        'a value between 0 and 1.')
+
+
+def _arg_retention(parser):
+    parser.add_argument(
+        '--retention',
+        type=float,
+        default=DEFAULT_RETENTION,
+        help='Number of days you want to keep points.')
+
+
 def _arg_remote_address(parser):
     parser.add_argument(
         '--remote-address',
         type=str,
         required=True,
         help='Remote host or IP-address of one of the servers in the SiriDB '
-        'cluster you want to join.')
+        'cluster you want to join. Multiple servers can be given as a comma '
+        'separated list, for example: a:9000,b:9000. All of them are tried '
+        'concurrently and the first healthy server is used.')
 
 
 def _arg_remote_port(parser):
@@ -780,7 +212,34 @@ def _arg_remote_port(parser):
         type=int,
         default=9000,
         help='Remote port of one of the servers in the SiriDB cluster you '
-        'want to join.')
+        'want to join. Used for remote addresses without a port.')
+
+
+def _arg_seed_timeout(parser):
+    parser.add_argument(
+        '--seed-timeout',
+        type=float,
+        default=DEFAULT_SEED_TIMEOUT,
+        help='Timeout in seconds for retrieving info from a remote server.')
+
+
+def _arg_cache_ttl(parser):
+    parser.add_argument(
+        '--cache-ttl',
+        type=float,
+        default=0,
+        help='Cache the remote cluster topology for the given number of '
+        'seconds. The cache is used by following invocations against the '
+        'same cluster and database and is removed after the server is '
+        'registered. Use 0 to disable the cache.')
+
+
+def _arg_cache_path(parser):
+    parser.add_argument(
+        '--cache-path',
+        type=str,
+        default=DEFAULT_CACHE_PATH,
+        help='Location for storing the cluster topology cache.')
 
 
 def _arg_user(parser):
@@ -810,199 +269,196 @@ def _arg_pool(parser):
         'server. (use \'\' for an overview)')
 
 
-def form_create_new_database():
-    dbname = ask_string(
-        title='Type a name for the new database',
-        description='Note: this value cannot be changed after the database '
-        'has been created',
-        func=check_dbname)
+def _arg_resume(parser):
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        default=False,
+        help='Keep the completed steps when this run fails and continue an '
+        'earlier run which failed with --resume. Steps which are completed '
+        'and of which the files are unchanged are skipped. Without --resume '
+        'a failed run is rolled back and the paths of an earlier run are '
+        'moved to the trash.')
 
-    dbpath = os.path.join(settings.default_db_path, dbname)
-    try:
-        mk_path(dbpath)
-    except Exception as e:
-        quit_manage(1, e)
-
-    buffer_path = ask_buffer_path(dbpath)
-
-    time_precision = menu(
-        title='Time precision',
-        options=Options([
-            {'option': 's', 'text': 'seconds'},
-            {'option': 'ms', 'text': 'milliseconds'},
-            {'option': 'us', 'text': 'microseconds'},
-            {'option': 'ns', 'text': 'nanoseconds'}
-        ]),
-        default='ms')
-
-    duration_options = [
-        {'option': k, 'text': v[1]} for k, v in DURATIONS.items()]
-
-    duration_num = menu(
-        title='Number (float and integer) sharding duration',
-        options=Options(duration_options),
-        default='1w')
-
-    duration_log = menu(
-        title='Log (string) sharding duration',
-        options=Options(duration_options),
-        default='1d')
-
-    cfg = {'buffer_path': buffer_path}
-
-    ask_buffer_size(cfg)
-
-    create_new_database(dbname,
-                        dbpath,
-                        time_precision,
-                        duration_log,
-                        duration_num,
-                        cfg.pop('buffer_size'),
-                        cfg)
-
-
-def create_new_database(dbname,
-                        dbpath,
-                        time_precision,
-                        duration_log,
-                        duration_num,
-                        buffer_size,
-                        cfg):
-    create_database(
-        dbname=dbname,
-        dbpath=dbpath,
-        time_precision=time_precision,
-        duration_log=duration_log,
-        duration_num=duration_num,
-        buffer_size=buffer_size,
-        config=cfg)
-    logging.info('Created database {!r}'.format(dbname))
-
-    asyncio.get_event_loop().run_until_complete(load_database(
-        dbpath,
-        settings.localhost,
-        settings.listen_client_port))
-
-    time.sleep(1)
 
-    try:
-        check_loaded(dbname)
-    except Exception as e:
-        quit_manage(1, e)
-    else:
-        quit_manage(0, 'Database "{}" created succesfully'.format(dbname))
+def _arg_discard(parser):
+    parser.add_argument(
+        '--discard',
+        action='store_true',
+        default=False,
+        help='Move the database path of an earlier run which failed to the '
+        'trash and start over, which is also done without --resume. Refused '
+        'when the local SiriDB server has loaded the database.')
 
 
-def main_menu():
-    choice = menu(
-        title='Tell me what you plan to do:',
-        options=Options([
-            {'option': 'c', 'text': 'create a new database'},
-            {'option': 'j', 'text': 'join an existing SiriDB database'},
-            {'option': 'q', 'text': 'quit'}
-        ]))
+def _arg_retry_attempts(parser):
+    parser.add_argument(
+        '--retry-attempts',
+        type=int,
+        default=DEFAULT_RETRY_ATTEMPTS,
+        help='Maximum number of attempts for registering the server and '
+        'other requests to the remote cluster.')
 
-    {
-        'q': quit_manage,
-        'j': join_database,
-        'c': form_create_new_database
-    }[choice]()
 
+def _arg_retry_delay(parser):
+    parser.add_argument(
+        '--retry-delay',
+        type=float,
+        default=DEFAULT_RETRY_DELAY,
+        help='Seconds to wait after the first failed attempt, the delay is '
+        'doubled after each next attempt.')
 
-def signal_handler(s, f):
-    quit_manage(2, '\nyou pressed ctrl+c, quiting...\n')
 
+def _arg_retry_jitter(parser):
+    parser.add_argument(
+        '--retry-jitter',
+        type=float,
+        default=DEFAULT_RETRY_JITTER,
+        help='Random part of the delay between attempts, between 0 and 1.')
 
-def parse_create_new(args):
-    try:
-        check_dbname(args.dbname)
-        check_valid_buffer_size(args.buffer_size)
 
-        dbpath = os.path.join(settings.default_db_path, args.dbname)
-        mk_path(dbpath)
+def _arg_retry_deadline(parser):
+    parser.add_argument(
+        '--retry-deadline',
+        type=float,
+        default=DEFAULT_RETRY_DEADLINE,
+        help='Seconds for all attempts of a request.')
 
-        buffer_path = args.buffer_path or dbpath
-        mk_path(buffer_path)
 
-    except Exception as e:
-        quit_manage(1, e)
+def _arg_wait_running(parser):
+    parser.add_argument(
+        '--wait-running',
+        type=float,
+        default=DEFAULT_WAIT_RUNNING,
+        help='Seconds to wait for all servers in the cluster to have status '
+        'running, for example while the cluster is synchronizing or '
+        're-indexing. Use 0 to give up when a server is not running.')
+
 
-    cfg = {'buffer_path': buffer_path}
+def _arg_watch(parser):
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        default=False,
+        help='Keep the connection open and show the changes at each '
+        'interval, until ctrl+c is pressed.')
 
-    create_new_database(args.dbname,
-                        dbpath,
-                        args.time_precision,
-                        args.duration_log,
-                        args.duration_num,
-                        args.buffer_size,
-                        cfg)
 
+def _arg_interval(parser):
+    parser.add_argument(
+        '--interval',
+        type=float,
+        default=DEFAULT_STATUS_INTERVAL,
+        help='Seconds between updates when using --watch.')
 
-def parse_create_replica_or_pool(args):
-    if not args.password:
-        password = ask_string(
-            title='Password',
-            is_password=True)
-    else:
-        password = args.password
 
+def _arg_watch_reindex(parser):
+    parser.add_argument(
+        '--watch-reindex',
+        action='store_true',
+        default=False,
+        help='Show the progress of the re-index after the pool is created '
+        'and exit when the series are spread over the pools.')
+
+
+def _arg_reindex_interval(parser):
+    parser.add_argument(
+        '--interval',
+        type=float,
+        default=DEFAULT_STATUS_INTERVAL,
+        help='Seconds between samples of the series per pool while watching '
+        'the re-index.')
+
+
+def _arg_reindex_timeout(parser):
+    parser.add_argument(
+        '--reindex-timeout',
+        type=float,
+        default=DEFAULT_REINDEX_TIMEOUT,
+        help='Seconds to watch the re-index before exiting with an error. '
+        'Use 0 to watch until the re-index is done.')
+
+
+def _arg_target_pool(parser):
+    parser.add_argument(
+        '--pool',
+        type=int,
+        default=None,
+        help='Pool ID when checking for a replica, by default the checks are '
+        'done for a new pool.')
+
+
+def _arg_preflight_timeout(parser):
+    parser.add_argument(
+        '--timeout',
+        type=float,
+        default=DEFAULT_PREFLIGHT_TIMEOUT,
+        help='Timeout in seconds for each check.')
+
+
+def _arg_min_disk_free(parser):
+    parser.add_argument(
+        '--min-disk-free',
+        type=int,
+        default=DEFAULT_MIN_DISK_FREE,
+        help='Required free disk space in MB for the database and buffer '
+        'path.')
+
+
+def _arg_min_free_inodes(parser):
+    parser.add_argument(
+        '--min-free-inodes',
+        type=int,
+        default=DEFAULT_MIN_FREE_INODES,
+        help='Required number of free inodes for the database and buffer '
+        'path.')
+
+
+def _arg_gc_workers(parser):
+    parser.add_argument(
+        '--workers',
+        type=_positive_int,
+        default=DEFAULT_GC_WORKERS,
+        help='Number of threads removing files.')
+
+
+def _arg_gc_db_path(parser):
+    parser.add_argument(
+        '--db-path',
+        default=None,
+        help='Database path with the trash to empty, by default the default '
+        'database path. The configuration is not read when this is given.')
+
+
+def gc(args):
+    from trash import TRASH_DIR
+    from trash import sweep
+    # Only the trash of a database path is ever emptied, never a given path
+    trash = os.path.join(args.db_path or settings.default_db_path, TRASH_DIR)
     try:
-        asyncio.get_event_loop().run_until_complete(set_remote_siridb_info(
-                args.remote_address,
-                args.remote_port))
-
-        check_dbname(args.dbname)
-        check_valid_buffer_size(args.buffer_size)
-
-        dbpath = os.path.join(settings.default_db_path, args.dbname)
-        mk_path(dbpath)
-
-        buffer_path = args.buffer_path or dbpath
-        mk_path(buffer_path)
-
-        connect_to_siridb(args.dbname,
-                          args.remote_address,
-                          args.remote_port,
-                          args.user,
-                          password)
-
-        result = siri.query('list pools pool, servers, series')
-        if hasattr(args, 'pool'):
-            pools = {pool[0]: pool[1] for pool in result['pools']}
-            if args.pool not in pools:
-                raise ValueError('Pool ID {} does not exists'.format(
-                    args.pool))
-            if pools[args.pool] != 1:
-                raise ValueError('A pool can only have two servers. '
-                                 'Pool ID {} already has {} servers.'
-                                 .format(args.pool, pools[args.pool]))
-            pool = args.pool
-
-        else:
-            pool = len(result['pools'])
-
-        dbconfig = siri.query('show {}'.format(','.join(DBPROPS)))
+        removed = sweep(trash, args.workers)
     except Exception as e:
-        quit_manage(1, e)
-
-    props = {prop['name']: prop['value'] for prop in dbconfig['data']}
-    cfg = {
-        'buffer_path': buffer_path,
-        'buffer_size': args.buffer_size,
-    }
-
-    create_and_register_server(args.dbname,
-                               dbpath,
-                               pool,
-                               props,
-                               cfg,
-                               new_pool=not hasattr(args, 'pool'),
-                               allow_retry=False)
+        exit_manage(1, e)
 
-if __name__ == '__main__':
+    print('Removed {} file(s) from {}'.format(removed, trash))
 
-    # Add ctrl+c to quit
-    signal.signal(signal.SIGINT, signal_handler)
+
+def plan_shards(args):
+    from advisor import ShardPlan
+    try:
+        plan = ShardPlan(args.series,
+                         args.points_per_second,
+                         args.log_ratio,
+                         args.time_precision,
+                         args.retention * 86400,
+                         settings.max_open_files)
+    except Exception as e:
+        exit_manage(1, e)
+
+    print(plan.as_text())
+
+
+if __name__ == '__main__':
 
     # Read arguments
     parser = argparse.ArgumentParser()
@@ -1027,6 +483,16 @@ if __name__ == '__main__':
         default='info',
         help='set the log level (ignored in wizard mode)',
         choices=['debug', 'info', 'warning', 'error', 'critical'])
+    parser.add_argument(
+        '--timings',
+        choices=['table', 'json'],
+        help='write the duration of each phase to stderr at exit')
+    parser.add_argument(
+        '--metrics-file',
+        type=str,
+        help='write metrics for this run in the OpenMetrics text format to '
+        'the given file at exit, for example to a .prom file in the '
+        'node_exporter textfile collector directory')
 
     subparsers = parser.add_subparsers(
         dest='action',
@@ -1046,7 +512,10 @@ if __name__ == '__main__':
                      _arg_time_precision,
                      _arg_duration_log,
                      _arg_duration_num,
-                     _arg_buffer_size]:
+                     _arg_buffer_size,
+                     _arg_load_timeout,
+                     _arg_bench_disk,
+                     _arg_max_fsync_p99]:
         argument(parser_create_new)
 
     parser_create_replica = subparsers.add_parser(
@@ -1058,11 +527,24 @@ if __name__ == '__main__':
     for argument in [_arg_dbname,
                      _arg_remote_address,
                      _arg_remote_port,
+                     _arg_seed_timeout,
+                     _arg_cache_ttl,
+                     _arg_cache_path,
                      _arg_user,
                      _arg_password,
                      _arg_pool,
                      _arg_buffer_path,
-                     _arg_buffer_size]:
+                     _arg_buffer_size,
+                     _arg_load_timeout,
+                     _arg_bench_disk,
+                     _arg_max_fsync_p99,
+                     _arg_resume,
+                     _arg_discard,
+                     _arg_retry_attempts,
+                     _arg_retry_delay,
+                     _arg_retry_jitter,
+                     _arg_retry_deadline,
+                     _arg_wait_running]:
         argument(parser_create_replica)
 
     parser_create_pool = subparsers.add_parser(
@@ -1074,12 +556,129 @@ if __name__ == '__main__':
     for argument in [_arg_dbname,
                      _arg_remote_address,
                      _arg_remote_port,
+                     _arg_seed_timeout,
+                     _arg_cache_ttl,
+                     _arg_cache_path,
                      _arg_user,
                      _arg_password,
                      _arg_buffer_path,
-                     _arg_buffer_size]:
+                     _arg_buffer_size,
+                     _arg_load_timeout,
+                     _arg_bench_disk,
+                     _arg_max_fsync_p99,
+                     _arg_resume,
+                     _arg_discard,
+                     _arg_retry_attempts,
+                     _arg_retry_delay,
+                     _arg_retry_jitter,
+                     _arg_retry_deadline,
+                     _arg_wait_running,
+                     _arg_watch_reindex,
+                     _arg_reindex_interval,
+                     _arg_reindex_timeout]:
         argument(parser_create_pool)
 
+    parser_create_many = subparsers.add_parser(
+        'create-many',
+        help='create several new SiriDB databases from a manifest',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        argument_default=argparse.SUPPRESS)
+
+    for argument in [_arg_manifest,
+                     _arg_load_timeout]:
+        argument(parser_create_many)
+
+    parser_bench_disk = subparsers.add_parser(
+        'bench-disk',
+        help='measure the write and fsync latency of a disk before choosing '
+        'a buffer path',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        argument_default=argparse.SUPPRESS)
+
+    for argument in [_arg_bench_path,
+                     _arg_buffer_size,
+                     _arg_bench_samples,
+                     _arg_max_fsync_p99]:
+        argument(parser_bench_disk)
+
+    parser_preflight = subparsers.add_parser(
+        'preflight',
+        help='check concurrently if this server can join a SiriDB cluster '
+        'and write a JSON report, nothing is created',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        argument_default=argparse.SUPPRESS)
+
+    for argument in [_arg_dbname,
+                     _arg_remote_address,
+                     _arg_remote_port,
+                     _arg_seed_timeout,
+                     _arg_cache_path,
+                     _arg_user,
+                     _arg_password,
+                     _arg_target_pool,
+                     _arg_buffer_path,
+                     _arg_buffer_size,
+                     _arg_preflight_timeout,
+                     _arg_min_disk_free,
+                     _arg_min_free_inodes]:
+        argument(parser_preflight)
+
+    parser_status = subparsers.add_parser(
+        'status',
+        help='show the pools and servers of a SiriDB cluster',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        argument_default=argparse.SUPPRESS)
+
+    for argument in [_arg_dbname,
+                     _arg_remote_address,
+                     _arg_remote_port,
+                     _arg_seed_timeout,
+                     _arg_user,
+                     _arg_password,
+                     _arg_watch,
+                     _arg_interval]:
+        argument(parser_status)
+
+    parser_reindex_status = subparsers.add_parser(
+        'reindex-status',
+        help='show the progress of a re-index after a new pool is created '
+        'and exit when the series are spread over the pools',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        argument_default=argparse.SUPPRESS)
+
+    for argument in [_arg_dbname,
+                     _arg_remote_address,
+                     _arg_remote_port,
+                     _arg_seed_timeout,
+                     _arg_user,
+                     _arg_password,
+                     _arg_reindex_interval,
+                     _arg_reindex_timeout]:
+        argument(parser_reindex_status)
+
+    parser_gc = subparsers.add_parser(
+        'gc',
+        help='empty the trash with databases removed after a failure',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        argument_default=argparse.SUPPRESS)
+
+    for argument in [_arg_gc_workers,
+                     _arg_gc_db_path]:
+        argument(parser_gc)
+
+    parser_plan_shards = subparsers.add_parser(
+        'plan-shards',
+        help='recommend sharding durations for the expected ingest',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        argument_default=argparse.SUPPRESS)
+
+    for argument in [_arg_series,
+                     _arg_points_per_second,
+                     _arg_log_ratio,
+                     _arg_time_precision,
+                     _arg_retention]:
+        argument(parser_plan_shards)
+
     args = parser.parse_args()
 
     formatter = logging.Formatter(fmt='%(message)s', style='%')
@@ -1092,8 +691,17 @@ if __name__ == '__main__':
     ch.setFormatter(formatter)
     logger.addHandler(ch)
 
+    if args.timings:
+        atexit.register(timings.report, args.timings)
+
+    if args.metrics_file:
+        metrics.enabled = True
+        metrics.command = args.action
+        metrics.dbname = getattr(args, 'dbname', None)
+        atexit.register(metrics.write, args.metrics_file)
+
     if args.version:
-        quit_manage(0, '''
+        exit_manage(0, '''
 SiriDB Manage {version}
 Maintainer: {maintainer} <{email}>
 Home-page: http://siridb.net
@@ -1103,22 +711,28 @@ Home-page: http://siridb.net
 
     # Check for root
     if not args.noroot and not os.geteuid() == 0:
-        quit_manage(2,
+        exit_manage(2,
                     '\nOnly root can run this script.\n\nIf you are sure '
                     'you want to run as a user you can add the "--noroot" '
                     'argument. \nSee "{} --help" for more info.\n'
                     .format(os.path.basename(sys.argv[0])))
 
+    # A given database path does not need the configuration, this is how the
+    # trash is emptied in the background (see spawn_sweep() in trash.py)
+    if args.action == 'gc' and args.db_path:
+        gc(args)
+        exit_manage(0)
+
     # Check if global configuration file exists
     if not os.path.exists(args.config):
-        quit_manage(2,
+        exit_manage(2,
                     'Cannot find {!r}, please use --options to specify the '
                     'location for the global configuration file'
                     .format(args.config))
 
     # Check if we have read access to the global configuration file
     if not os.access(args.config, os.R_OK):
-        quit_manage(2,
+        exit_manage(2,
                     'Missing read access to the global configuration file: {}'
                     .format(args.config))
 
@@ -1126,35 +740,26 @@ Home-page: http://siridb.net
     settings.config_file = args.config
 
     try:
-        settings.read_config()
+        with timings.phase('read_config'):
+            settings.read_config()
     except Exception as e:
-        quit_manage(2, str(e))
-
-    asyncio.get_event_loop().run_until_complete(set_local_siridb_info(
-        settings.localhost,
-        settings.listen_client_port))
-
-    if local_siridb_info is None:
-        quit_manage(2,
-                    'Unable to get local SiriDB info, please check if '
-                    'SiriDB is running and listening to {}:{}.'.format(
-                        settings.localhost,
-                        settings.listen_client_port))
-
-    # Check if this tool and the SiriDB Server have the same version number
-    if tuple(map(
-            int,
-            local_siridb_info.version.split('.')[:2])) != __version_info__[:2]:
-        quit_manage(2,
-                    'SiriDB Server (version {}) should have the same version '
-                    'as this manage tool (version {})'
-                    .format(local_siridb_info.version, __version__))
-
-    if args.action is None:
-        logger.setLevel('INFO')
-        # Open menu
-        main_menu()
-    elif args.action == 'create-new':
-        parse_create_new(args)
-    elif args.action in ('create-replica', 'create-pool'):
-        parse_create_replica_or_pool(args)
+        exit_manage(2, str(e))
+
+    if args.action == 'plan-shards':
+        plan_shards(args)
+        exit_manage(0)
+
+    if args.action == 'gc':
+        gc(args)
+        exit_manage(0)
+
+    # Imports asyncio and the SiriDB connector, only commands which need
+    # them should get here.
+    with timings.phase('import_manage'):
+        import manage
+
+    # Add ctrl+c to quit
+    signal.signal(signal.SIGINT, manage.signal_handler)
+
+    manage.run(args)
+    timings.exit_code = 0
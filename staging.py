@@ -0,0 +1,63 @@
+'''Build the files for a new database in a staging directory.
+
+The files are written to a directory in a hidden directory next to the
+database path, flushed to disk as one batch and moved into place with a
+single rename. The SiriDB server does not look for databases in the hidden
+directory, so it never sees a partial database path, and after a power loss
+the database path is either empty or complete.
+'''
+
+import os
+from trash import move_to_trash
+from trash import trash_path
+
+STAGING_DIR = '.siridb-manage-staging'
+
+
+def staging_path(dbpath):
+    '''Returns the staging directory for dbpath.'''
+    dbpath = os.path.abspath(dbpath)
+    return os.path.join(
+        os.path.dirname(dbpath),
+        STAGING_DIR,
+        os.path.basename(dbpath))
+
+
+def new_staging(dbpath):
+    '''Create an empty staging directory for dbpath and return it.
+
+    A staging directory left by an earlier run is moved to the trash.
+    '''
+    staging = staging_path(dbpath)
+    if os.path.exists(staging):
+        move_to_trash(staging, trash_path(dbpath))
+    os.makedirs(os.path.dirname(staging), exist_ok=True)
+    os.mkdir(staging)
+    return staging
+
+
+def _fsync(path, flags=os.O_RDONLY):
+    fd = os.open(path, flags)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def commit(staging, dbpath):
+    '''Flush all files in staging and move staging to dbpath.
+
+    dbpath must be an empty directory or should not exist.
+    '''
+    with os.scandir(staging) as it:
+        for entry in it:
+            if entry.is_file(follow_symlinks=False):
+                _fsync(entry.path)
+    _fsync(staging, os.O_RDONLY | os.O_DIRECTORY)
+
+    # rename() replaces an empty directory
+    os.rename(staging, dbpath)
+    _fsync(os.path.dirname(os.path.abspath(dbpath)),
+           os.O_RDONLY | os.O_DIRECTORY)
+    _fsync(os.path.dirname(os.path.abspath(staging)),
+           os.O_RDONLY | os.O_DIRECTORY)
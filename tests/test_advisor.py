@@ -0,0 +1,123 @@
+import unittest
+from unittest import mock
+import advisor
+from advisor import BufferAdvice
+from advisor import ClusterAdvice
+from advisor import ShardPlan
+from advisor import SHARD_FILES
+from advisor import OPEN_FILES_BUDGET
+from advisor import SIRIDB_MAX_OPEN_FILES
+
+GB = 2 ** 30
+
+
+@mock.patch.object(advisor, 'read_disk_free', return_value=100 * GB)
+@mock.patch.object(advisor, 'read_mem_available', return_value=GB)
+class TestBufferAdvice(unittest.TestCase):
+
+    def test_no_series(self, *_):
+        advice = BufferAdvice(0, '/tmp')
+        self.assertEqual(advice.recommended, advisor.DEFAULT_BUFFER_SIZE)
+        self.assertIsNone(advice.check(1024))
+
+    def test_recommended_fits_budget(self, *_):
+        advice = BufferAdvice(100000, '/tmp')
+        self.assertTrue(advice.fits(advice.recommended))
+        self.assertFalse(advice.fits(advice.recommended * 2))
+        self.assertIsNone(advice.check(advice.recommended))
+
+    def test_check(self, *_):
+        advice = BufferAdvice(100000, '/tmp')
+        self.assertIsNotNone(advice.check(advice.recommended * 2))
+        with self.assertRaises(ValueError):
+            advice.check(advisor.MAX_BUFFER_SIZE)
+
+
+class TestShardPlan(unittest.TestCase):
+
+    def plan(self, series=10000, points_per_second=5000, retention=90,
+             max_open_files=None):
+        return ShardPlan(series,
+                         points_per_second,
+                         0.0,
+                         'ms',
+                         retention * 86400,
+                         max_open_files)
+
+    def test_invalid_input(self):
+        for kwargs in ({'series': -5},
+                       {'points_per_second': 0},
+                       {'points_per_second': -1},
+                       {'retention': 0}):
+            with self.assertRaises(ValueError):
+                self.plan(**kwargs)
+        with self.assertRaises(ValueError):
+            ShardPlan(100, 10, 1.5, 'ms', 86400)
+
+    def test_default_max_open_files(self):
+        plan = self.plan()
+        self.assertEqual(plan.max_open_files, SIRIDB_MAX_OPEN_FILES)
+        self.assertLessEqual(
+            plan.open_files(plan.duration_num, plan.duration_log),
+            SIRIDB_MAX_OPEN_FILES * OPEN_FILES_BUDGET)
+        self.assertIsNone(
+            plan.check_open_files(plan.duration_num, plan.duration_log))
+        self.assertIn('SiriDB default', plan.as_text())
+
+    def test_open_files_budget(self):
+        plan = self.plan(max_open_files=100000)
+        self.assertEqual(plan.duration_num, '1h')
+        plan = self.plan(max_open_files=2048)
+        files = plan.open_files(plan.duration_num, plan.duration_log)
+        self.assertLessEqual(files, 1024)
+        self.assertNotEqual(plan.duration_num, '1h')
+
+    def test_over_budget_warns(self):
+        plan = self.plan(retention=3650)
+        self.assertEqual(plan.duration_num, '4w')
+        self.assertIsNotNone(
+            plan.check_open_files(plan.duration_num, plan.duration_log))
+
+    def test_no_series(self):
+        plan = self.plan(series=0)
+        self.assertEqual(plan.duration_num, '1w')
+        self.assertEqual(plan.duration_log, '1d')
+        self.assertEqual(plan.open_files('1w', '1d'), 0)
+
+    def test_open_files(self):
+        plan = self.plan(retention=7)
+        self.assertEqual(plan.open_files('1w', '1d'),
+                         SHARD_FILES * (2 + 0))
+
+
+class TestClusterAdvice(unittest.TestCase):
+
+    def test_new_pool_when_all_pools_have_a_replica(self):
+        advice = ClusterAdvice([[0, 2, 100], [1, 2, 100]])
+        self.assertEqual(advice.recommended, 'pool')
+        self.assertIsNone(advice.replica_pool)
+        self.assertEqual(advice.new_pool['pool'], 2)
+        self.assertEqual(advice.new_pool['moved'], 66)
+
+    def test_replica_for_the_largest_pool(self):
+        advice = ClusterAdvice([[0, 1, 1000], [1, 1, 5000], [2, 2, 100]])
+        self.assertEqual(advice.recommended, 'replica')
+        self.assertEqual(advice.replica_pool, 1)
+        self.assertEqual([r['pool'] for r in advice.replicas], [1, 0])
+        self.assertGreater(advice.imbalance, advisor.IMBALANCE_THRESHOLD)
+
+    def test_new_pool_for_large_pools(self):
+        series = advisor.POOL_SERIES_TARGET
+        advice = ClusterAdvice([[0, 1, series], [1, 1, series]])
+        self.assertEqual(advice.recommended, 'pool')
+        self.assertEqual(advice.replica_pool, 0)
+
+    def test_empty_cluster(self):
+        advice = ClusterAdvice([[0, 1, 0]])
+        self.assertEqual(advice.imbalance, 0.0)
+        self.assertEqual(advice.replicas[0]['read_share'], 0.0)
+        self.assertIn('Recommended', advice.as_text())
+
+
+if __name__ == '__main__':
+    unittest.main()
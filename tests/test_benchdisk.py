@@ -0,0 +1,21 @@
+import tempfile
+import unittest
+from benchdisk import DiskBench
+from benchdisk import percentile
+
+
+class TestBenchDisk(unittest.TestCase):
+
+    def test_percentile(self):
+        self.assertEqual(percentile([3, 1, 2], 0.5), 2)
+        self.assertEqual(percentile([1], 0.99), 1)
+        with self.assertRaises(ValueError):
+            percentile([], 0.5)
+
+    def test_no_samples(self):
+        with self.assertRaises(ValueError):
+            DiskBench(tempfile.gettempdir(), 1024, samples=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
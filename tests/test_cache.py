@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import cache
+from cache import TopologyCache
+
+SEEDS = [('server0', 9000), ('server1', 9000)]
+
+
+class TestTopologyCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def cache(self, ttl=60, seeds=SEEDS, dbname='dbtest'):
+        return TopologyCache(self.tmp.name, ttl, seeds, dbname)
+
+    def test_set_and_get(self):
+        self.assertIsNone(self.cache().get())
+        self.cache().set({'props': [1, 2]})
+        self.assertEqual(self.cache().get(), {'props': [1, 2]})
+        self.assertEqual(os.listdir(self.tmp.name),
+                         [os.path.basename(self.cache().fn)])
+
+    def test_key(self):
+        self.cache().set({'props': 1})
+        self.assertEqual(self.cache(seeds=SEEDS[::-1]).get(), {'props': 1})
+        self.assertIsNone(self.cache(seeds=SEEDS[:1]).get())
+        self.assertIsNone(self.cache(dbname='other').get())
+
+    def test_ttl(self):
+        self.cache().set({'props': 1})
+        now = cache.time.time()
+        with mock.patch.object(cache.time, 'time', return_value=now + 61):
+            self.assertIsNone(self.cache().get())
+        with mock.patch.object(cache.time, 'time', return_value=now - 10):
+            # a clock which moved back does not make the entry valid
+            self.assertIsNone(self.cache().get())
+        self.assertIsNotNone(self.cache().get())
+
+    def test_invalidate(self):
+        self.cache().set({'props': 1})
+        self.cache().invalidate()
+        self.assertIsNone(self.cache().get())
+        self.cache().invalidate()
+
+    def test_corrupt(self):
+        self.cache().set({'props': 1})
+        with open(self.cache().fn, 'w') as f:
+            f.write('{"props"')
+        self.assertIsNone(self.cache().get())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+from clusterstatus import ClusterStatus
+
+
+def strip(lines):
+    # remove the time prefix
+    return [line.split(' ', 1)[1] for line in lines]
+
+
+class TestClusterStatus(unittest.TestCase):
+
+    def setUp(self):
+        self.status = ClusterStatus()
+        self.lines = self.status.update(
+            [[0, 2, 1000]],
+            [['server0', 'running'], ['server1', 'running']],
+            at=100.0)
+
+    def test_table(self):
+        self.assertEqual(self.lines[0].split(), ['pool', 'servers', 'series'])
+        self.assertEqual(self.lines[1].split(), ['0', '2', '1000'])
+        self.assertEqual(self.lines[-2].split(), ['server0', 'running'])
+        self.assertEqual(self.lines[-1].split(), ['server1', 'running'])
+
+    def test_no_changes(self):
+        self.assertEqual(self.status.update(
+            [[0, 2, 1000]],
+            [['server0', 'running'], ['server1', 'running']],
+            at=110.0), [])
+
+    def test_changes(self):
+        lines = self.status.update(
+            [[0, 2, 800], [1, 1, 200]],
+            [['server0', 'running | re-indexing'],
+             ['server1', 'running'],
+             ['server2', 'running']],
+            at=110.0)
+        self.assertEqual(strip(lines), [
+            'pool 0: series 1000 -> 800 (-200, -20.0/s)',
+            'pool 1: added (1 servers, 200 series)',
+            "server 'server0': status running -> running | re-indexing",
+            "server 'server2': added (running)"])
+
+    def test_removed(self):
+        lines = self.status.update(
+            [[1, 1, 1000]], [['server0', 'running']], at=110.0)
+        self.assertEqual(strip(lines), [
+            'pool 1: added (1 servers, 1000 series)',
+            'pool 0: removed',
+            "server 'server1': removed"])
+
+    def test_servers_and_zero_elapsed(self):
+        lines = self.status.update(
+            [[0, 3, 1010]],
+            [['server0', 'running'], ['server1', 'running']],
+            at=100.0)
+        self.assertEqual(strip(lines), [
+            'pool 0: servers 2 -> 3',
+            'pool 0: series 1000 -> 1010 (+10, +0.0/s)'])
+
+
+if __name__ == '__main__':
+    unittest.main()
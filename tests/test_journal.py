@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+from journal import Journal
+from journal import JOURNAL_FILE
+
+
+class TestJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = self.tmp.name
+        with open(os.path.join(self.path, 'servers.dat'), 'wb') as f:
+            f.write(b'servers')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_record_and_read(self):
+        journal = Journal(self.path)
+        journal.record('config', files={'servers.dat': None}, uuid='abc')
+        self.assertTrue(Journal.exists(self.path))
+
+        journal = Journal(self.path)
+        journal.read()
+        self.assertEqual(journal.get('config')['uuid'], 'abc')
+        self.assertIsNone(journal.get('loaded'))
+        self.assertTrue(journal.verify('config'))
+
+    def test_verify_changed_and_missing(self):
+        journal = Journal(self.path)
+        journal.record('config', files={'servers.dat': None})
+        with open(os.path.join(self.path, 'servers.dat'), 'ab') as f:
+            f.write(b'changed')
+        self.assertFalse(journal.verify('config'))
+        os.unlink(os.path.join(self.path, 'servers.dat'))
+        self.assertFalse(journal.verify('config'))
+        self.assertFalse(journal.verify('unknown'))
+
+    def test_ignores_partial_line(self):
+        journal = Journal(self.path)
+        journal.record('config')
+        with open(os.path.join(self.path, JOURNAL_FILE), 'a') as f:
+            f.write('{"step": "loa')
+        journal = Journal(self.path)
+        journal.read()
+        self.assertIsNotNone(journal.get('config'))
+        self.assertIsNone(journal.get('loa'))
+
+    def test_remove(self):
+        journal = Journal(self.path)
+        journal.record('registered')
+        journal.remove()
+        self.assertFalse(Journal.exists(self.path))
+        self.assertIsNone(journal.get('registered'))
+        journal.remove()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import os
+import json
+import tempfile
+import unittest
+from unittest import mock
+import manage
+from manage import check_manifest
+from manage import read_manifest
+from manage import MANIFEST_DEFAULTS
+from manage import SiriDBInfo
+
+
+class TestReadManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.fn = os.path.join(self.tmp.name, 'manifest.json')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read(self, manifest):
+        with open(self.fn, 'w') as f:
+            json.dump(manifest, f)
+        return read_manifest(self.fn)
+
+    def test_defaults(self):
+        databases = self.read({'databases': [{'dbname': 'db0'}]})
+        self.assertEqual(databases, [dict(MANIFEST_DEFAULTS, dbname='db0')])
+
+    def test_list(self):
+        databases = self.read([{'dbname': 'db0', 'buffer_size': 2048}])
+        self.assertEqual(databases[0]['buffer_size'], 2048)
+
+    def test_invalid(self):
+        for manifest in ([],
+                         {'databases': {}},
+                         [{'buffer_size': 1024}],
+                         [{'dbname': 'db0', 'unknown': 1}]):
+            with self.assertRaises(ValueError):
+                self.read(manifest)
+
+    def test_types(self):
+        for key, value in (('dbname', 5),
+                           ('buffer_size', '1024'),
+                           ('buffer_size', True),
+                           ('time_precision', None),
+                           ('duration_num', 7),
+                           ('buffer_path', [])):
+            db = {'dbname': 'db1', key: value}
+            with self.assertRaisesRegex(ValueError, key):
+                self.read([{'dbname': 'db0'}, db])
+
+
+class TestCheckManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        patchers = (
+            mock.patch.object(manage,
+                              'local_siridb_info',
+                              SiriDBInfo('2.0.19', ['existing'])),
+            mock.patch.object(manage.settings,
+                              'default_db_path',
+                              self.tmp.name,
+                              create=True))
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def databases(self, *dbs):
+        return [dict(MANIFEST_DEFAULTS, **db) for db in dbs]
+
+    def test_valid(self):
+        buffers = os.path.join(self.tmp.name, 'buffers')
+        databases = self.databases(
+            {'dbname': 'db0'},
+            {'dbname': 'db1', 'buffer_path': buffers})
+        check_manifest(databases)
+        self.assertEqual(databases[0]['buffer_path'],
+                         os.path.join(self.tmp.name, 'db0'))
+        self.assertEqual(databases[1]['buffer_path'], buffers)
+
+    def test_invalid(self):
+        for databases in (
+                [{'dbname': 'db0'}, {'dbname': 'db0'}],
+                [{'dbname': 'existing'}],
+                [{'dbname': 'db0', 'time_precision': 'm'}],
+                [{'dbname': 'db0', 'duration_num': '3d'}]):
+            with self.assertRaises(ValueError):
+                check_manifest(self.databases(*databases))
+
+    def test_shared_buffer_path(self):
+        buffers = os.path.join(self.tmp.name, 'buffers')
+        with self.assertRaisesRegex(ValueError, 'same buffer_path'):
+            check_manifest(self.databases(
+                {'dbname': 'db0', 'buffer_path': buffers},
+                {'dbname': 'db1', 'buffer_path': buffers + '/'}))
+
+    def test_buffer_path_is_other_dbpath(self):
+        with self.assertRaisesRegex(ValueError, 'database path of'):
+            check_manifest(self.databases(
+                {'dbname': 'db0'},
+                {'dbname': 'db1',
+                 'buffer_path': os.path.join(self.tmp.name, 'db0')}))
+        with self.assertRaisesRegex(ValueError, 'database path of'):
+            check_manifest(self.databases(
+                {'dbname': 'db0',
+                 'buffer_path': os.path.join(self.tmp.name, 'db1')},
+                {'dbname': 'db1'}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import metrics
+from metrics import RunMetrics
+from timings import Timings
+
+
+class TestRunMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.timings = Timings()
+        patcher = mock.patch.object(metrics, 'timings', self.timings)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.metrics = RunMetrics()
+
+    def samples(self):
+        return {line.rsplit(' ', 1)[0]: line.rsplit(' ', 1)[1]
+                for line in self.metrics.lines()
+                if not line.startswith('#')}
+
+    def test_defaults(self):
+        lines = list(self.metrics.lines())
+        self.assertEqual(lines[-1], '# EOF')
+        samples = self.samples()
+        self.assertEqual(samples['siridb_manage_success{command="menu"}'], '0')
+        self.assertEqual(
+            samples['siridb_manage_exit_code{command="menu"}'], '-1')
+        self.assertFalse(any('file_bytes' in line or 'pool_' in line
+                             for line in lines))
+
+    def test_run(self):
+        self.metrics.command = 'create-pool'
+        self.metrics.dbname = 'db"0'
+        self.metrics.files = {'servers.dat': 64}
+        self.metrics.register_retries = 2
+        self.metrics.pools = [[0, 2, 1000], [1, 1, 0]]
+        for _ in range(2):
+            with self.timings.phase('transfer'):
+                pass
+        self.timings.exit_code = 0
+
+        labels = 'command="create-pool",dbname="db\\"0"'
+        samples = self.samples()
+        self.assertEqual(
+            samples['siridb_manage_success{{{}}}'.format(labels)], '1')
+        self.assertEqual(
+            samples['siridb_manage_register_retries{{{}}}'.format(labels)],
+            '2')
+        self.assertEqual(samples[
+            'siridb_manage_file_bytes{{{},file="servers.dat"}}'
+            .format(labels)], '64')
+        self.assertEqual(samples[
+            'siridb_manage_pool_series{{{},pool="0"}}'.format(labels)],
+            '1000')
+        self.assertEqual(samples[
+            'siridb_manage_pool_servers{{{},pool="1"}}'.format(labels)],
+            '1')
+        # phases with the same name are summed in one sample
+        self.assertEqual(len([
+            key for key in samples
+            if key.startswith('siridb_manage_phase_duration_seconds')]), 1)
+
+    def test_write(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            fn = os.path.join(tmp, 'siridb_manage.prom')
+            self.metrics.write(fn)
+            self.assertEqual(os.listdir(tmp), ['siridb_manage.prom'])
+            with open(fn) as f:
+                self.assertTrue(f.read().endswith('# EOF\n'))
+            self.metrics.write(os.path.join(tmp, 'missing', 'x.prom'))
+            self.assertEqual(os.listdir(tmp), ['siridb_manage.prom'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+import os
+import asyncio
+import tempfile
+import unittest
+from preflight import Preflight
+from preflight import check_path
+from preflight import PASS
+from preflight import FAIL
+from preflight import SKIP
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+
+async def ok(details=None, delay=0):
+    await asyncio.sleep(delay)
+    return details
+
+
+async def fail():
+    raise ValueError('bad host')
+
+
+class TestPreflight(unittest.TestCase):
+
+    def status(self, preflight):
+        return {r['check']: r['status'] for r in preflight.results}
+
+    def test_passed(self):
+        async def main():
+            preflight = Preflight(timeout=1)
+            preflight.add('a', ok({'a': 1}))
+            preflight.add('b', ok())
+            return preflight, await preflight.run()
+
+        preflight, passed = run(main())
+        self.assertTrue(passed)
+        self.assertEqual([r['check'] for r in preflight.results], ['a', 'b'])
+        self.assertEqual(preflight.results[0]['details'], {'a': 1})
+        self.assertNotIn('details', preflight.results[1])
+
+    def test_depends(self):
+        async def main():
+            preflight = Preflight(timeout=1)
+
+            async def second():
+                details = await preflight.depends('first')
+                return {'got': details}
+
+            preflight.add('second', second())
+            preflight.add('first', ok('x', delay=0.01))
+            await preflight.run()
+            return preflight
+
+        preflight = run(main())
+        self.assertEqual(preflight.results[0]['details'], {'got': 'x'})
+        self.assertEqual(self.status(preflight),
+                         {'second': PASS, 'first': PASS})
+
+    def test_skip(self):
+        async def main():
+            preflight = Preflight(timeout=1)
+
+            async def second():
+                await preflight.depends('first')
+
+            preflight.add('first', fail())
+            preflight.add('second', second())
+            preflight.add('third', ok())
+            return preflight, await preflight.run()
+
+        preflight, passed = run(main())
+        self.assertFalse(passed)
+        self.assertEqual(self.status(preflight),
+                         {'first': FAIL, 'second': SKIP, 'third': PASS})
+        self.assertEqual(preflight.failed, ['first'])
+        self.assertEqual(preflight.results[0]['error'], 'bad host')
+
+    def test_timeout(self):
+        async def main():
+            preflight = Preflight(timeout=0.01)
+
+            async def second():
+                await preflight.depends('first')
+
+            preflight.add('first', ok(delay=1))
+            preflight.add('second', second())
+            await preflight.run()
+            return preflight
+
+        preflight = run(main())
+        self.assertEqual(self.status(preflight),
+                         {'first': FAIL, 'second': FAIL})
+        self.assertIn('Timeout', preflight.results[0]['error'])
+
+    def test_blocking(self):
+        async def main():
+            preflight = Preflight(timeout=1)
+            preflight.add_blocking('sum', sum, [1, 2])
+            await preflight.run()
+            return preflight
+
+        preflight = run(main())
+        self.assertEqual(preflight.results[0]['details'], 3)
+
+
+class TestCheckPath(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_new_path(self):
+        path = os.path.join(self.tmp.name, 'db', 'dbtest')
+        self.assertEqual(check_path(path)['writable'], self.tmp.name)
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    def test_not_empty(self):
+        open(os.path.join(self.tmp.name, 'file'), 'w').close()
+        with self.assertRaises(ValueError):
+            check_path(self.tmp.name)
+        with self.assertRaises(ValueError):
+            check_path(os.path.join(self.tmp.name, 'file'))
+
+
+if __name__ == '__main__':
+    unittest.main()
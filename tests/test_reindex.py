@@ -0,0 +1,64 @@
+import unittest
+from reindex import ReindexProgress
+
+RUNNING = [['server0:9010', 'running'], ['server1:9010', 'running']]
+REINDEXING = [['server0:9010', 'running | re-indexing'],
+              ['server1:9010', 'running']]
+
+
+class TestReindexProgress(unittest.TestCase):
+
+    def test_not_done_before_the_reindex_starts(self):
+        progress = ReindexProgress(pool=2)
+        for at in range(10):
+            progress.update([[0, 1, 1000], [1, 1, 1000], [2, 1, 0]],
+                            RUNNING,
+                            at)
+        self.assertFalse(progress.stable)
+        self.assertIsNone(progress.eta)
+
+    def test_not_done_before_the_pool_is_listed(self):
+        progress = ReindexProgress(pool=2)
+        for at in range(10):
+            progress.update([[0, 1, 1000], [1, 1, 1000]], RUNNING, at)
+        self.assertFalse(progress.stable)
+        self.assertEqual(progress.target, 666)
+
+    def test_done_after_reindexing(self):
+        progress = ReindexProgress(pool=1)
+        progress.update([[0, 1, 1000], [1, 1, 0]], REINDEXING, 0)
+        progress.update([[0, 1, 800], [1, 1, 200]], REINDEXING, 1)
+        self.assertFalse(progress.stable)
+        self.assertEqual(progress.throughput, 200)
+        self.assertEqual(progress.eta, 1.5)
+        for at in range(2, 5):
+            progress.update([[0, 1, 520], [1, 1, 480]], RUNNING, at)
+        self.assertTrue(progress.stable)
+        self.assertEqual(progress.moved, 480)
+
+    def test_done_when_near_target(self):
+        progress = ReindexProgress()
+        for at in range(3):
+            progress.update([[0, 1, 500], [1, 1, 480]], RUNNING, at)
+        self.assertEqual(progress.pool, 1)
+        self.assertTrue(progress.stable)
+
+    def test_not_done_while_changing(self):
+        progress = ReindexProgress(pool=1)
+        for at, series in enumerate((300, 400, 490)):
+            progress.update([[0, 1, 1000 - series], [1, 1, series]],
+                            RUNNING,
+                            at)
+        self.assertFalse(progress.stable)
+
+    def test_as_text(self):
+        progress = ReindexProgress(pool=1)
+        progress.update([[0, 1, 1000], [1, 1, 0]], REINDEXING, 0)
+        text = progress.as_text()
+        self.assertIn('pool 1: 0 of ~500 series', text)
+        self.assertIn('ETA unknown', text)
+        self.assertIn('re-indexing: server0:9010', text)
+
+
+if __name__ == '__main__':
+    unittest.main()
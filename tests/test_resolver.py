@@ -0,0 +1,138 @@
+import os
+import json
+import socket
+import asyncio
+import tempfile
+import unittest
+from unittest import mock
+from resolver import literal_address
+from resolver import resolve
+from resolver import ResolveCache
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+class TestLiteralAddress(unittest.TestCase):
+
+    def test_addresses(self):
+        self.assertEqual(literal_address('127.0.0.1'), '127.0.0.1')
+        self.assertEqual(literal_address('::1'), '::1')
+        self.assertEqual(literal_address('[fe80::1]'), 'fe80::1')
+
+    def test_names(self):
+        self.assertIsNone(literal_address('localhost'))
+        self.assertIsNone(literal_address('256.0.0.1'))
+        self.assertIsNone(literal_address('[server1]'))
+
+
+class TestResolveCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = ResolveCache(self.tmp.name, ttl=60)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_get_set(self):
+        self.assertIsNone(self.cache.get('ALL/server1'))
+        self.cache.set('ALL/server1', ['10.0.0.1'])
+        self.assertEqual(self.cache.get('ALL/server1'), ['10.0.0.1'])
+        self.assertEqual(os.listdir(self.tmp.name), ['resolve.json'])
+
+    def test_expired(self):
+        with mock.patch('time.time', return_value=1000.0):
+            self.cache.set('ALL/server1', ['10.0.0.1'])
+        with mock.patch('time.time', return_value=1059.0):
+            self.assertEqual(self.cache.get('ALL/server1'), ['10.0.0.1'])
+        with mock.patch('time.time', return_value=1060.0):
+            self.assertIsNone(self.cache.get('ALL/server1'))
+        # a clock set back does not keep an entry forever
+        with mock.patch('time.time', return_value=999.0):
+            self.assertIsNone(self.cache.get('ALL/server1'))
+
+    def test_drop_expired(self):
+        with mock.patch('time.time', return_value=1000.0):
+            self.cache.set('ALL/server1', ['10.0.0.1'])
+        with mock.patch('time.time', return_value=1100.0):
+            self.cache.set('ALL/server2', ['10.0.0.2'])
+        with open(self.cache.fn) as f:
+            self.assertEqual(list(json.load(f)), ['ALL/server2'])
+
+    def test_invalid_file(self):
+        with open(self.cache.fn, 'w') as f:
+            f.write('{invalid')
+        self.assertIsNone(self.cache.get('ALL/server1'))
+        self.cache.set('ALL/server1', ['10.0.0.1'])
+        self.assertEqual(self.cache.get('ALL/server1'), ['10.0.0.1'])
+
+
+class TestResolve(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = ResolveCache(self.tmp.name, ttl=60)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_literal(self):
+        with mock.patch('asyncio.BaseEventLoop.getaddrinfo') as getaddrinfo:
+            self.assertEqual(run(resolve('[::1]', 9000, cache=self.cache)),
+                             ['::1'])
+            self.assertEqual(run(resolve('10.0.0.1', 9000)), ['10.0.0.1'])
+        getaddrinfo.assert_not_called()
+        self.assertIsNone(self.cache.get('ALL/::1'))
+
+    def test_cached(self):
+        self.cache.set('IPV4ONLY/server1', ['10.0.0.1'])
+        with mock.patch('asyncio.BaseEventLoop.getaddrinfo') as getaddrinfo:
+            self.assertEqual(
+                run(resolve('server1', 9000, 'IPV4ONLY', cache=self.cache)),
+                ['10.0.0.1'])
+        getaddrinfo.assert_not_called()
+
+    def test_resolve(self):
+        infos = [
+            (socket.AF_INET, socket.SOCK_STREAM, 6, '', ('10.0.0.1', 9000)),
+            (socket.AF_INET, socket.SOCK_STREAM, 6, '', ('10.0.0.1', 9000)),
+            (socket.AF_INET, socket.SOCK_STREAM, 6, '', ('10.0.0.2', 9000))]
+
+        async def getaddrinfo(*args, **kwargs):
+            self.assertEqual(kwargs['family'], socket.AF_INET)
+            return infos
+
+        with mock.patch('asyncio.BaseEventLoop.getaddrinfo', getaddrinfo):
+            self.assertEqual(
+                run(resolve('server1', 9000, 'IPV4ONLY', cache=self.cache)),
+                ['10.0.0.1', '10.0.0.2'])
+        self.assertEqual(self.cache.get('IPV4ONLY/server1'),
+                         ['10.0.0.1', '10.0.0.2'])
+        self.assertIsNone(self.cache.get('ALL/server1'))
+
+    def test_timeout(self):
+        async def getaddrinfo(*args, **kwargs):
+            await asyncio.sleep(1)
+
+        with mock.patch('asyncio.BaseEventLoop.getaddrinfo', getaddrinfo):
+            with self.assertRaises(asyncio.TimeoutError):
+                run(resolve('server1', 9000, timeout=0.01, cache=self.cache))
+        self.assertIsNone(self.cache.get('ALL/server1'))
+
+    def test_no_address(self):
+        async def getaddrinfo(*args, **kwargs):
+            return []
+
+        with mock.patch('asyncio.BaseEventLoop.getaddrinfo', getaddrinfo):
+            with self.assertRaises(socket.gaierror):
+                run(resolve('server1', 9000))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import asyncio
+import unittest
+from retry import RetryPolicy
+from constants import RETRY_MAX_DELAY
+
+
+class TestRetryPolicy(unittest.TestCase):
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            RetryPolicy(attempts=0)
+        with self.assertRaises(ValueError):
+            RetryPolicy(jitter=1.5)
+
+    def test_backoff(self):
+        retry = RetryPolicy(delay=0.1, jitter=0)
+        self.assertEqual(retry.backoff(1), 0.1)
+        self.assertEqual(retry.backoff(3), 0.4)
+        self.assertEqual(retry.backoff(100), RETRY_MAX_DELAY)
+
+    def call(self, retry, func, **kwargs):
+        return asyncio.run(retry.call('test', func, **kwargs))
+
+    def test_retries_until_success(self):
+        calls = []
+        retries = []
+
+        async def func():
+            calls.append(None)
+            if len(calls) < 3:
+                raise ConnectionError()
+            return 'ok'
+
+        retry = RetryPolicy(attempts=5, delay=0.001)
+        self.assertEqual(
+            self.call(retry, func, on_retry=lambda: retries.append(None)),
+            'ok')
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(len(retries), 2)
+
+    def test_gives_up(self):
+        calls = []
+
+        async def func():
+            calls.append(None)
+            raise ConnectionError()
+
+        with self.assertRaises(ConnectionError):
+            self.call(RetryPolicy(attempts=2, delay=0.001), func)
+        self.assertEqual(len(calls), 2)
+
+    def test_fatal(self):
+        calls = []
+
+        async def func():
+            calls.append(None)
+            raise PermissionError()
+
+        with self.assertRaises(PermissionError):
+            self.call(RetryPolicy(delay=0.001), func, fatal=(PermissionError,))
+        self.assertEqual(len(calls), 1)
+
+    def test_deadline(self):
+        async def func():
+            await asyncio.sleep(1)
+
+        with self.assertRaises(asyncio.TimeoutError):
+            self.call(RetryPolicy(deadline=0.05), func)
+
+    def test_before_retry(self):
+        calls = []
+
+        async def before_retry():
+            calls.append('before_retry')
+
+        async def func():
+            calls.append('func')
+            if len(calls) < 2:
+                raise ConnectionError()
+
+        self.call(RetryPolicy(delay=0.001), func, before_retry=before_retry)
+        self.assertEqual(calls, ['func', 'before_retry', 'func'])
+
+
+if __name__ == '__main__':
+    unittest.main()
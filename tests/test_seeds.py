@@ -0,0 +1,34 @@
+import unittest
+from manage import parse_seeds
+from constants import DEFAULT_CLIENT_PORT
+
+
+class TestParseSeeds(unittest.TestCase):
+
+    def test_host_and_port(self):
+        self.assertEqual(
+            parse_seeds('server1:9001, server2'),
+            [('server1', 9001), ('server2', DEFAULT_CLIENT_PORT)])
+
+    def test_ipv6(self):
+        self.assertEqual(
+            parse_seeds('[::1]:9001,[fe80::1],::2'),
+            [('::1', 9001), ('fe80::1', DEFAULT_CLIENT_PORT),
+             ('::2', DEFAULT_CLIENT_PORT)])
+
+    def test_default_port(self):
+        self.assertEqual(parse_seeds('server1', 9010), [('server1', 9010)])
+
+    def test_skip_empty(self):
+        self.assertEqual(parse_seeds('server1,,'),
+                         [('server1', DEFAULT_CLIENT_PORT)])
+
+    def test_invalid(self):
+        for seeds in ('', ' , ', 'server1:port', 'server1:0',
+                      'server1:65536', '[::1]:x'):
+            with self.assertRaises(ValueError):
+                parse_seeds(seeds)
+
+
+if __name__ == '__main__':
+    unittest.main()
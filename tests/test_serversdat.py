@@ -0,0 +1,76 @@
+import os
+import uuid
+import qpack
+import tempfile
+import unittest
+import serversdat
+
+
+def server(pool=0, port=9010):
+    return [uuid.uuid1().bytes, 'server{}'.format(port).encode(), port, pool]
+
+
+class TestServersDat(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.fn = os.path.join(self.tmp.name, 'servers.dat')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, data):
+        with open(self.fn, 'wb') as f:
+            f.write(data)
+
+    def read(self):
+        with open(self.fn, 'rb') as f:
+            return qpack.unpackb(f.read())
+
+    def test_append_to_fixed_array(self):
+        first = server()
+        self.write(qpack.packb([1, first]))
+        second = server(pool=1, port=9011)
+        self.assertFalse(serversdat.set_server(self.fn, second))
+        self.assertEqual(self.read(), [1, first, second])
+        self.assertEqual(serversdat.validate(self.fn), 2)
+
+    def test_replace_existing(self):
+        first, second = server(), server(pool=1, port=9011)
+        self.write(qpack.packb([1, first, second]))
+        replaced = [first[0], b'other', 9020, 0]
+        self.assertTrue(serversdat.set_server(self.fn, replaced))
+        self.assertEqual(self.read(), [1, replaced, second])
+
+    def test_grow_into_open_array(self):
+        servers = [server(port=9010 + i) for i in range(4)]
+        self.write(qpack.packb([1] + servers))
+        extra = server(port=9020)
+        serversdat.set_server(self.fn, extra)
+        self.assertEqual(self.read(), [1] + servers + [extra])
+        more = server(port=9021)
+        serversdat.set_server(self.fn, more)
+        self.assertEqual(self.read(), [1] + servers + [extra, more])
+        self.assertEqual(serversdat.validate(self.fn), 6)
+
+    def test_iter_servers(self):
+        servers = [server(port=9010 + i) for i in range(3)]
+        self.write(qpack.packb([1] + servers))
+        self.assertEqual(
+            [s[2] for s in serversdat.iter_servers(self.fn)],
+            [9010, 9011, 9012])
+
+    def test_invalid_files(self):
+        for data in (b'', qpack.packb({'a': 1}), qpack.packb([1, 2])):
+            self.write(data)
+            with self.assertRaises(ValueError):
+                serversdat.validate(self.fn)
+
+    def test_truncated(self):
+        self.write(qpack.packb([1, server(), server(port=9011)])[:-3])
+        with self.assertRaises(ValueError):
+            serversdat.validate(self.fn)
+
+
+if __name__ == '__main__':
+    unittest.main()
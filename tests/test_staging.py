@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+from staging import STAGING_DIR
+from staging import commit
+from staging import new_staging
+from staging import staging_path
+from trash import TRASH_DIR
+
+
+class TestStaging(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dbpath = os.path.join(self.tmp.name, 'dbtest')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_staging_path(self):
+        self.assertEqual(
+            staging_path(self.dbpath),
+            os.path.join(self.tmp.name, STAGING_DIR, 'dbtest'))
+
+    def stage(self):
+        staging = new_staging(self.dbpath)
+        with open(os.path.join(staging, 'database.dat'), 'wb') as f:
+            f.write(b'data')
+        return staging
+
+    def test_commit_onto_empty_dbpath(self):
+        os.mkdir(self.dbpath)
+        staging = self.stage()
+        commit(staging, self.dbpath)
+        self.assertFalse(os.path.exists(staging))
+        with open(os.path.join(self.dbpath, 'database.dat'), 'rb') as f:
+            self.assertEqual(f.read(), b'data')
+
+    def test_commit_without_dbpath(self):
+        commit(self.stage(), self.dbpath)
+        self.assertEqual(os.listdir(self.dbpath), ['database.dat'])
+
+    def test_commit_onto_non_empty_dbpath(self):
+        os.mkdir(self.dbpath)
+        open(os.path.join(self.dbpath, 'other'), 'w').close()
+        staging = self.stage()
+        with self.assertRaises(OSError):
+            commit(staging, self.dbpath)
+        self.assertTrue(os.path.exists(staging))
+
+    def test_new_staging_trashes_earlier_run(self):
+        self.stage()
+        staging = new_staging(self.dbpath)
+        self.assertEqual(os.listdir(staging), [])
+        self.assertEqual(
+            len(os.listdir(os.path.join(self.tmp.name, TRASH_DIR))), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
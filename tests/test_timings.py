@@ -0,0 +1,76 @@
+import json
+import asyncio
+import unittest
+from timings import Timings
+
+
+class TestTimings(unittest.TestCase):
+
+    def setUp(self):
+        self.timings = Timings()
+
+    def test_phase(self):
+        with self.timings.phase('first'):
+            pass
+        with self.assertRaises(ValueError):
+            with self.timings.phase('second'):
+                raise ValueError
+        with self.assertRaises(SystemExit):
+            with self.timings.phase('third'):
+                raise SystemExit(1)
+        with self.assertRaises(SystemExit):
+            with self.timings.phase('fourth'):
+                raise SystemExit(0)
+        self.assertEqual(
+            [(p['phase'], p['status']) for p in self.timings.phases],
+            [('first', 'ok'), ('second', 'ValueError'),
+             ('third', 'exit'), ('fourth', 'ok')])
+        for p in self.timings.phases:
+            self.assertGreaterEqual(p['start'], 0)
+            self.assertGreaterEqual(p['duration'], 0)
+
+    def test_timed(self):
+        @self.timings.timed('func')
+        def func(a):
+            return a + 1
+
+        @self.timings.timed('coro')
+        async def coro(a):
+            await asyncio.sleep(0.01)
+            return a + 2
+
+        self.assertEqual(func(1), 2)
+        loop = asyncio.new_event_loop()
+        try:
+            self.assertEqual(loop.run_until_complete(coro(1)), 3)
+        finally:
+            loop.close()
+        self.assertEqual(func.__name__, 'func')
+        self.assertEqual([p['phase'] for p in self.timings.phases],
+                         ['func', 'coro'])
+        self.assertGreaterEqual(self.timings.phases[1]['duration'], 0.01)
+
+    def test_concurrent_phases_sorted(self):
+        self.timings.phases = [
+            {'phase': 'b', 'start': 0.2, 'duration': 0.1, 'status': 'ok'},
+            {'phase': 'a', 'start': 0.1, 'duration': 0.3, 'status': 'ok'}]
+        self.timings.exit_code = 0
+        timings = json.loads(self.timings.as_json())
+        self.assertEqual([p['phase'] for p in timings['phases']], ['a', 'b'])
+        self.assertEqual(timings['exit_code'], 0)
+
+    def test_as_text(self):
+        with self.timings.phase('first'):
+            pass
+        self.timings.exit_code = 2
+        lines = self.timings.as_text().splitlines()
+        self.assertEqual(lines[0].split(),
+                         ['phase', 'start', 'duration', 'status'])
+        self.assertEqual(lines[1].split()[0], 'first')
+        self.assertEqual(lines[1].split()[-1], 'ok')
+        self.assertTrue(lines[-1].startswith('total'))
+        self.assertTrue(lines[-1].endswith('exit code: 2'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import io
+import unittest
+from unittest import mock
+from siridb.connector import SiriDBProtocol
+from siridb.connector.lib.datapackage import DataPackage
+from siridb.connector.lib.protomap import CPROTO_RES_FILE
+from siridb.connector.lib.protomap import CPROTO_RES_QUERY
+from transfer import SiriDBFileProtocol
+
+
+def package(pid, tipe, data=b''):
+    return DataPackage.struct_datapackage.pack(
+        len(data), pid, tipe, tipe ^ 255) + data
+
+
+class TestSiriDBFileProtocol(unittest.TestCase):
+
+    def setUp(self):
+        self.f = io.BytesIO()
+        self.protocol = SiriDBFileProtocol('iris', 'siri', 'dbtest', self.f)
+        self.protocol._file_pid = 1
+        self.future = mock.Mock()
+        self.future.cancelled.return_value = False
+        self.protocol._requests[1] = (self.future, mock.Mock())
+        patcher = mock.patch.object(SiriDBProtocol, 'data_received')
+        self.default = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_file_in_chunks(self):
+        data = package(1, CPROTO_RES_FILE, b'content')
+        self.protocol.data_received(data[:5])
+        self.protocol.data_received(data[5:12])
+        self.protocol.data_received(data[12:])
+        self.assertEqual(self.f.getvalue(), b'content')
+        self.assertEqual(self.protocol.size, 7)
+        self.future.set_result.assert_called_once_with(None)
+        self.default.assert_not_called()
+
+    def test_data_after_file(self):
+        after = package(2, CPROTO_RES_QUERY, b'next')
+        self.protocol.data_received(
+            package(1, CPROTO_RES_FILE, b'content') + after)
+        self.assertEqual(self.f.getvalue(), b'content')
+        self.default.assert_called_once_with(after)
+
+    def test_data_after_empty_file(self):
+        after = package(2, CPROTO_RES_QUERY, b'next')
+        self.protocol.data_received(package(1, CPROTO_RES_FILE) + after)
+        self.assertEqual(self.f.getvalue(), b'')
+        self.future.set_result.assert_called_once_with(None)
+        self.default.assert_called_once_with(after)
+
+
+if __name__ == '__main__':
+    unittest.main()
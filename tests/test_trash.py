@@ -0,0 +1,60 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+import trash
+from trash import TRASH_DIR
+
+
+class TestTrash(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dbpath = os.path.join(self.tmp.name, 'dbtest')
+        os.makedirs(os.path.join(self.dbpath, 'shards'))
+        for fn in ('database.dat', os.path.join('shards', '1.sdb')):
+            with open(os.path.join(self.dbpath, fn), 'wb') as f:
+                f.write(b'data')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_move_and_sweep(self):
+        path = trash.move_to_trash(self.dbpath)
+        self.assertEqual(path, os.path.join(self.tmp.name, TRASH_DIR))
+        self.assertFalse(os.path.exists(self.dbpath))
+        self.assertEqual(len(os.listdir(path)), 1)
+
+        self.assertEqual(trash.sweep(path, workers=2), 2)
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(trash.sweep(path), 0)
+
+    def test_move_twice(self):
+        trash.move_to_trash(self.dbpath)
+        os.mkdir(self.dbpath)
+        path = trash.move_to_trash(self.dbpath)
+        self.assertEqual(len(os.listdir(path)), 2)
+
+    def test_refuse_other_paths(self):
+        for path in (self.dbpath, self.tmp.name, '/'):
+            with self.assertRaises(ValueError):
+                trash.sweep(path)
+            with self.assertRaises(ValueError):
+                trash.spawn_sweep(path)
+        self.assertTrue(os.path.exists(
+            os.path.join(self.dbpath, 'database.dat')))
+
+    def test_gc_command(self):
+        path = os.path.join(self.tmp.name, TRASH_DIR)
+        cmd = trash.gc_command(path)
+        self.assertEqual(cmd[-2:], ['--db-path', self.tmp.name])
+        self.assertTrue(cmd[1].endswith('siridb-manage.py'))
+        with mock.patch.object(sys, 'frozen', True, create=True):
+            cmd = trash.gc_command(path)
+        self.assertEqual(cmd[0], sys.executable)
+        self.assertEqual(cmd[1], '--noroot')
+
+
+if __name__ == '__main__':
+    unittest.main()
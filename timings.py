@@ -0,0 +1,95 @@
+'''Timings for the phases of a siridb-manage command.
+
+Phases are recorded with their start (relative to the start of the process)
+and duration so phases which run concurrently can be recognized. The result
+is written at exit as JSON or as a table when --timings is used.
+'''
+
+import sys
+import time
+import functools
+import contextlib
+
+
+class Timings:
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases = []
+        self.exit_code = None
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        status = 'ok'
+        try:
+            yield
+        except SystemExit as e:
+            status = 'ok' if not e.code else 'exit'
+            raise
+        except BaseException as e:
+            status = type(e).__name__
+            raise
+        finally:
+            self.phases.append({
+                'phase': name,
+                'start': round(start - self.start, 6),
+                'duration': round(time.perf_counter() - start, 6),
+                'status': status})
+
+    def timed(self, name):
+        '''Decorator for recording a function or coroutine function.'''
+        # manage.py imports asyncio (and thus inspect) before this is used
+        import inspect
+
+        def wrap(func):
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def wrapped(*args, **kwargs):
+                    with self.phase(name):
+                        return await func(*args, **kwargs)
+            else:
+                @functools.wraps(func)
+                def wrapped(*args, **kwargs):
+                    with self.phase(name):
+                        return func(*args, **kwargs)
+            return wrapped
+        return wrap
+
+    def as_dict(self):
+        return {
+            'exit_code': self.exit_code,
+            'total': round(time.perf_counter() - self.start, 6),
+            'phases': sorted(self.phases, key=lambda p: p['start'])}
+
+    def as_json(self):
+        import json
+        return json.dumps(self.as_dict())
+
+    def as_text(self):
+        timings = self.as_dict()
+        lines = ['{}{}{}{}'.format('phase'.ljust(40),
+                                   'start'.ljust(10),
+                                   'duration'.ljust(10),
+                                   'status')]
+        for p in timings['phases']:
+            lines.append('{}{}{}{}'.format(
+                p['phase'].ljust(40),
+                '{:.3f}s'.format(p['start']).ljust(10),
+                '{:.3f}s'.format(p['duration']).ljust(10),
+                p['status']))
+        lines.append('{}{}{}exit code: {}'.format(
+            'total'.ljust(40),
+            ''.ljust(10),
+            '{:.3f}s'.format(timings['total']).ljust(10),
+            timings['exit_code']))
+        return '\n'.join(lines)
+
+    def report(self, fmt):
+        '''Write the timings to stderr, registered with atexit.'''
+        sys.stderr.write('{}\n'.format(
+            self.as_json() if fmt == 'json' else self.as_text()))
+
+
+# Shared by all modules, created when siridb-manage.py starts.
+timings = Timings()
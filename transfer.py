@@ -0,0 +1,180 @@
+'''Download SiriDB configuration files.
+
+Each file is requested on its own connection so the transfers can run
+concurrently. The file package is written to a temporary file while it is
+received (instead of buffering the complete package in memory) and is moved
+into place once the transfer is complete and checksummed.
+'''
+
+import os
+import time
+import asyncio
+import hashlib
+import logging
+from timings import timings
+from siridb.connector import SiriDBProtocol
+from siridb.connector.lib.datapackage import DataPackage
+from siridb.connector.lib.protomap import CPROTO_RES_FILE
+from siridb.connector.lib.protomap import FILE_MAP
+from siridb.connector.lib.exceptions import AuthenticationError
+
+CONNECT_TIMEOUT = 10
+FILE_TIMEOUT = 30
+
+
+class SiriDBFileProtocol(SiriDBProtocol):
+
+    def __init__(self, username, password, dbname, f):
+        super().__init__(username, password, dbname)
+        self._f = f
+        self._file_pid = None
+        self._remaining = 0
+        self.size = 0
+        self.checksum = hashlib.sha256()
+
+    def request_file(self, fn, timeout=FILE_TIMEOUT):
+        future = self.send_package(FILE_MAP[fn], timeout=timeout)
+        self._file_pid = self._pid
+        return future
+
+    def data_received(self, data):
+        '''
+        override _SiriDBProtocol
+        '''
+        if self._remaining:
+            self._write(data)
+            return
+
+        if self._file_pid is None:
+            return super().data_received(data)
+
+        self._buffered_data.extend(data)
+        size = DataPackage.struct_datapackage.size
+        if len(self._buffered_data) < size:
+            return
+
+        length, pid, tipe, _checkbit = \
+            DataPackage.struct_datapackage.unpack_from(self._buffered_data)
+
+        if pid != self._file_pid or tipe != CPROTO_RES_FILE:
+            # error responses are small, let the default handler deal with it
+            return super().data_received(b'')
+
+        data = bytes(self._buffered_data[size:])
+        self._buffered_data.clear()
+        self._remaining = length
+        if not length:
+            self._finish()
+            if data:
+                # the start of a next package, see _write()
+                super().data_received(data)
+        elif data:
+            self._write(data)
+
+    def _write(self, data):
+        chunk = data[:self._remaining]
+        self._f.write(chunk)
+        self.checksum.update(chunk)
+        self.size += len(chunk)
+        self._remaining -= len(chunk)
+        if not self._remaining:
+            self._finish()
+            if len(data) > len(chunk):
+                super().data_received(data[len(chunk):])
+
+    def _finish(self):
+        future, task = self._requests.pop(self._file_pid)
+        self._file_pid = None
+        task.cancel()
+        if not future.cancelled():
+            future.set_result(None)
+
+
+async def fetch_file(fn,
+                     dbpath,
+                     username,
+                     password,
+                     dbname,
+                     host,
+                     port,
+                     timeout=FILE_TIMEOUT):
+    '''Download a file to dbpath.
+
+    Returns the number of bytes received and the sha256 hex digest.
+    '''
+    if fn not in FILE_MAP:
+        raise FileNotFoundError('Cannot get file {!r}. Available file '
+                                'requests are: {}'
+                                .format(fn, ', '.join(FILE_MAP.keys())))
+    start = time.monotonic()
+    loop = asyncio.get_event_loop()
+    # Unlike mkstemp() this respects the umask, the SiriDB server might run
+    # as another user and needs read access to the file.
+    tmp = os.path.join(dbpath, '.{}.tmp'.format(fn))
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    transport = None
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            transport, protocol = await asyncio.wait_for(
+                loop.create_connection(
+                    lambda: SiriDBFileProtocol(
+                        username, password, dbname, f),
+                    host=host,
+                    port=port),
+                timeout=CONNECT_TIMEOUT)
+            await protocol.auth_future
+            await protocol.request_file(fn, timeout=timeout)
+        os.replace(tmp, os.path.join(dbpath, fn))
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    finally:
+        if transport is not None:
+            transport.close()
+
+    logging.info('Received {!r} ({} bytes, sha256: {}) in {:.3f} seconds'
+                 .format(fn,
+                         protocol.size,
+                         protocol.checksum.hexdigest(),
+                         time.monotonic() - start))
+    return protocol.size, protocol.checksum.hexdigest()
+
+
+async def fetch_files(fns,
+                      dbpath,
+                      *args,
+                      fetched=None,
+                      retry=None,
+                      on_retry=None,
+                      **kwargs):
+    '''Download files concurrently, raises the first error if any.
+
+    Returns a dictionary with the size and sha256 digest for each file.
+    When given, fetched(fn, size, checksum) is called as soon as a file is
+    received, also when another file fails. Each file is retried according
+    to the RetryPolicy retry, when given.
+    '''
+    async def fetch(fn):
+        with timings.phase('fetch {}'.format(fn)):
+            if retry is None:
+                size, checksum = await fetch_file(
+                    fn, dbpath, *args, **kwargs)
+            else:
+                size, checksum = await retry.call(
+                    'fetch {}'.format(fn),
+                    lambda: fetch_file(fn, dbpath, *args, **kwargs),
+                    fatal=(FileNotFoundError, AuthenticationError),
+                    on_retry=on_retry)
+        if fetched is not None:
+            fetched(fn, size, checksum)
+        return size, checksum
+
+    results = await asyncio.gather(
+        *[fetch(fn) for fn in fns],
+        return_exceptions=True)
+
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+
+    return dict(zip(fns, results))
@@ -0,0 +1,138 @@
+'''Remove database paths without waiting for the removal.
+
+A path is renamed into a trash directory next to it, which is atomic and
+frees the name right away since the trash is on the same file system. The
+trash is emptied by the gc command, which runs as a detached process after
+a path is moved to the trash and at the start of each run. Files are
+removed with a pool of threads since removing a large database is mostly
+waiting for the file system.
+'''
+
+import os
+import sys
+import time
+import uuid
+import shutil
+import logging
+import subprocess
+from constants import DEFAULT_GC_WORKERS
+
+TRASH_DIR = '.siridb-manage-trash'
+
+
+def trash_path(path):
+    '''Returns the trash directory for path.'''
+    return os.path.join(os.path.dirname(os.path.abspath(path)), TRASH_DIR)
+
+
+def move_to_trash(path, trash=None):
+    '''Move path into the trash and returns the trash directory.
+
+    The trash is next to path unless another trash on the same file system
+    is given. Falls back to removing path when it cannot be renamed, for
+    example when path is a mount point.
+    '''
+    trash = trash or trash_path(path)
+    target = os.path.join(trash, '{}.{}.{}'.format(
+        os.path.basename(os.path.abspath(path)),
+        int(time.time()),
+        uuid.uuid4().hex[:8]))
+    try:
+        os.makedirs(trash, exist_ok=True)
+        os.rename(path, target)
+    except OSError as e:
+        logging.debug('Cannot move {!r} to the trash: {}'.format(path, e))
+        shutil.rmtree(path)
+    return trash
+
+
+def gc_command(trash):
+    '''Returns the command which runs the gc command of this tool for trash.
+
+    The gc command gets the database path which holds the trash, it never
+    empties another directory than TRASH_DIR.
+
+    A frozen build (PyInstaller) is the executable itself, otherwise the
+    script runs next to this module.
+    '''
+    if getattr(sys, 'frozen', False):
+        cmd = [sys.executable]
+    else:
+        cmd = [sys.executable, os.path.join(
+            os.path.dirname(os.path.abspath(__file__)),
+            'siridb-manage.py')]
+    return cmd + ['--noroot', 'gc', '--db-path', os.path.dirname(trash)]
+
+
+def check_trash(trash):
+    '''Raises ValueError when trash is not a trash directory.'''
+    if os.path.basename(os.path.normpath(trash)) != TRASH_DIR:
+        raise ValueError('Refusing to empty {!r}, expecting a {!r} '
+                         'directory'.format(trash, TRASH_DIR))
+
+
+def spawn_sweep(trash):
+    '''Start a detached process which empties the trash.'''
+    check_trash(trash)
+    if not os.path.isdir(trash):
+        return
+    try:
+        subprocess.Popen(
+            gc_command(trash),
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True)
+    except OSError as e:
+        logging.warning('Cannot start emptying the trash {!r}: {}'.format(
+            trash, e))
+
+
+def _scan(path, files, dirs):
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                _scan(entry.path, files, dirs)
+            else:
+                files.append(entry.path)
+    dirs.append(path)
+
+
+def _unlink(fn):
+    try:
+        os.unlink(fn)
+    except FileNotFoundError:
+        # another sweep was faster
+        return False
+    return True
+
+
+def sweep(trash, workers=DEFAULT_GC_WORKERS):
+    '''Empty the trash, returns the number of removed files.
+
+    More than one sweep can run at the same time, each removes what it
+    finds and ignores what is already removed by another. Raises ValueError
+    when trash is not a TRASH_DIR directory.
+    '''
+    from concurrent.futures import ThreadPoolExecutor
+
+    check_trash(trash)
+    files = []
+    dirs = []
+    try:
+        _scan(trash, files, dirs)
+    except FileNotFoundError:
+        return 0
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        removed = sum(executor.map(_unlink, files, chunksize=64))
+
+    # _scan() adds the directories after their content
+    for path in dirs:
+        try:
+            os.rmdir(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logging.debug('Cannot remove {!r}: {}'.format(path, e))
+    return removed